@@ -1,9 +1,12 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, g
 from .utils.errors import APIError
+from .utils.records import RecordJSONProvider
+from .utils.metrics import start_request, current_request, finish_request, prometheus_text
 import os
 from flask_cors import CORS
 from .functions.commands.playlistCommands import PlaylistCommands
 from .functions.spotifymanager import SpotifyManager
+from .functions.usersessions import SESSION_COOKIE, active_context
 from .functions.commands.albumCommands import AlbumCommands
 from .functions.commands.artistCommands import ArtistCommands
 from .functions.commands.currentuserCommands import CurrentUserCommands
@@ -24,6 +27,8 @@ from .functions.routes.userRoutes import user_bp
 def create_app():
 
     app = Flask(__name__)
+    # Models return compact TrackRecords; they become JSON only here
+    app.json = RecordJSONProvider(app)
 
     @app.errorhandler(APIError)
     def handle_api_error(error):
@@ -44,6 +49,55 @@ def create_app():
     # single SpotifyManager instance
     spotify_manager = SpotifyManager()
 
+    # Count the Spotify calls each request makes (Server-Timing header)
+    @app.before_request
+    def start_request_timing():
+        g.request_timing_token = start_request()
+
+    @app.after_request
+    def send_server_timing(response):
+        timing = current_request()
+        if timing is not None:
+            response.headers["Server-Timing"] = timing.server_timing()
+        return response
+
+    @app.teardown_request
+    def finish_request_timing(error=None):
+        token = g.pop("request_timing_token", None)
+        if token is not None:
+            finish_request(token)
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        """Prometheus metrics of this worker process"""
+        return Response(prometheus_text(spotify_manager),
+                        mimetype="text/plain; version=0.0.4")
+
+    # Each request runs with the Spotify client and CurrentUser of its own session
+    @app.before_request
+    def open_user_session():
+        g.user_session_token = spotify_manager.sessions.activate(
+            request.cookies.get(SESSION_COOKIE))
+
+    @app.after_request
+    def send_session_cookie(response):
+        context = active_context()
+        if context is not None and context.ended:
+            response.delete_cookie(SESSION_COOKIE)
+        elif context is not None and context.issued:
+            response.set_cookie(SESSION_COOKIE, context.session_id,
+                                max_age=spotify_manager.sessions.ttl, httponly=True,
+                                samesite="Lax",
+                                secure=os.getenv("SESSION_COOKIE_SECURE", "").lower() in ("1", "true"))
+            context.issued = False
+        return response
+
+    @app.teardown_request
+    def close_user_session(error=None):
+        token = g.pop("user_session_token", None)
+        if token is not None:
+            spotify_manager.sessions.deactivate(token)
+
     # commands layer (shared across routes)
     playlist_commands = PlaylistCommands(spotify_manager)
     album_commands = AlbumCommands(spotify_manager)
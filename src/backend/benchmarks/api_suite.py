@@ -0,0 +1,330 @@
+"""
+End-to-end benchmark of the Flask API against the local fake Spotify API
+(fake_api.py) with synthetic libraries of several sizes.
+
+Each library size runs in its own process: a fake API process serves the
+library and create_app() is driven through its test client, logged in as
+the fake user. Every scenario runs --warmup untimed times (first-call
+costs, e.g. noticing Redis is down), then --repeat times with the command
+caches cleared and the fake library restored first, so each run takes the
+full upstream path against the same playlists. Recorded per scenario: wall
+time, p50/p95/p99 latency, upstream calls per request and this process's
+peak RSS.
+
+Results are compared with the stored baseline (api_baseline.json); the run
+exits with status 1 if any metric regressed beyond the tolerance. Timings
+depend on the machine, so re-record the baseline (--save-baseline) on the
+machine that runs the comparison.
+
+Run from the repository root:
+    python -m src.backend.benchmarks.api_suite
+    python -m src.backend.benchmarks.api_suite --sizes 100 1000 --save-baseline
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import resource
+import tempfile
+import threading
+import time
+from pathlib import Path
+from queue import Empty
+from urllib.request import Request, urlopen
+
+DEFAULT_SIZES = [100, 1000, 10000, 50000]
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "api_baseline.json"
+USER_ID = "benchuser"
+# Relative slack per metric before a result counts as a regression, and the
+# absolute difference below which it is noise (ms, ms, calls, MB)
+TOLERANCES = {
+    "p95_ms": (0.25, 20),
+    "wall_s": (0.25, 0.05),
+    "upstream_calls": (0.0, 0),
+    "peak_rss_mb": (0.25, 20),
+}
+
+
+def library(size):
+    """
+    Fake API options for a library of `size` items: a playlist of `size`
+    tracks, one holding its first half, an empty output playlist, `size`
+    saved tracks, and albums, artists and extra playlists in proportion
+    """
+    playlists = {"full": size, "half": size // 2, "out": 0}
+    playlists.update({f"extra{i}": 100 for i in range(size // 1000)})
+    return {
+        "user_id": USER_ID,
+        "playlist_sizes": playlists,
+        "saved_tracks": size,
+        "saved_albums": max(1, size // 10),
+        "followed_artists": max(1, size // 100),
+    }
+
+
+def scenarios(size):
+    """(name, method, path, JSON body) of every benchmarked request"""
+    middle = f"track{size // 2}"
+    return [
+        ("me_library", "get", "/me/library", None),
+        ("playlist_tracks", "get", "/playlist/tracks/full", None),
+        ("intersect", "post", "/playlist/intersect", {"p1": "full", "p2": "half", "p3": "out"}),
+        ("union", "post", "/playlist/union", {"p1": "full", "p2": "half", "p3": "out"}),
+        ("differentiate", "post", "/playlist/differentiate",
+         {"p1": "full", "p2": "half", "p3": "out"}),
+        ("move_tracks", "put", "/playlist/move_tracks/full",
+         {"fromPositions": list(range(1, min(size, 20), 2)), "toPosition": size // 2}),
+        ("search", "get", "/search/track?search_type=track&limit=50", None),
+        ("check_playlist", "get", f"/song/check_playlist/{middle}/full", None),
+        ("check_playlist_batch", "post", "/song/check_playlist/full",
+         {"ids": [f"track{i}" for i in range(0, size, max(1, size // 100))]}),
+    ]
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class PeakRSS:
+    """Peak resident memory of this process while the block runs, in MB"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = 0
+        self._done = threading.Event()
+
+    @staticmethod
+    def current():
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+        except OSError:
+            # No /proc: fall back to the lifetime peak (KB on Linux, bytes on macOS)
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak / 2**20 if platform.system() == "Darwin" else peak / 2**10
+
+    def _sample(self):
+        while not self._done.is_set():
+            self.peak = max(self.peak, self.current())
+            self._done.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = self.current()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._done.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+
+def _fake_api(url, action):
+    method = "GET" if action == "stats" else "POST"
+    with urlopen(Request(f"{url}/__fake__/{action}", method=method)) as response:
+        return json.load(response)
+
+
+def _serve_fake_api(options, queue):
+    from .fake_api import FakeSpotifyAPI, FakeSpotifyServer
+
+    server = FakeSpotifyServer(FakeSpotifyAPI(**options)).start()
+    queue.put(server.url)
+    threading.Event().wait()
+
+
+def _clear_caches(app):
+    for name in ("playlist_commands", "album_commands", "artist_commands",
+                 "song_commands", "user_commands"):
+        app.config[name].clear_cache()
+    app.config["spotify_manager"].cache.clear()
+
+
+def _fresh_run(app, url):
+    """Undo the previous run's playlist edits and forget everything cached"""
+    _fake_api(url, "restore")
+    _clear_caches(app)
+
+
+def _login(app):
+    """Log the cookie-less default client in as the fake user (no Redis needed)"""
+    from ..functions.models.currentuser import CurrentUser
+
+    spotify_manager = app.config["spotify_manager"]
+    spotify_manager.sp = spotify_manager.create_client(auth="benchmark-token")
+    spotify_manager.current_user_id = USER_ID
+    app.config["currentuser_commands"].current_user = CurrentUser(
+        spotify_manager=spotify_manager)
+
+
+def run_size(size, options):
+    """Benchmark every scenario against a library of `size` items"""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    fake = context.Process(target=_serve_fake_api, daemon=True, args=(
+        dict(library(size), latency=options["latency"]), queue))
+    fake.start()
+    # CurrentUser writes its settings file under the working directory
+    previous_dir = os.getcwd()
+    workdir = tempfile.TemporaryDirectory()
+    os.chdir(workdir.name)
+    try:
+        url = queue.get(timeout=60 + size / 1000)
+        os.environ.update({
+            "SPOTIFY_API_URL": f"{url}/v1/",
+            "SPOTIFY_ACCOUNTS_URL": url,
+            "SPOTIFY_RATE_LIMIT": str(options["rate_limit"]),
+            "SPOTIFY_RATE_BURST": str(options["rate_limit"]),
+        })
+        for name in ("SPOTIFY_CLIENT_ID", "SPOTIFY_CLIENT_SECRET"):
+            os.environ.setdefault(name, "benchmark")
+        os.environ.setdefault("SPOTIFY_REDIRECT_URI", "http://localhost:3000/callback")
+
+        from ..app import create_app
+
+        app = create_app()
+        _login(app)
+        client = app.test_client()
+
+        results = {}
+        for name, method, path, body in scenarios(size):
+            latencies = []
+            calls = 0
+            for _ in range(options["warmup"]):
+                _fresh_run(app, url)
+                getattr(client, method)(path, json=body)
+            with PeakRSS() as rss:
+                for _ in range(options["repeat"]):
+                    _fresh_run(app, url)
+                    _fake_api(url, "reset")
+                    start = time.perf_counter()
+                    response = getattr(client, method)(path, json=body)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    calls += _fake_api(url, "stats")["requests"]
+                    if response.status_code != 200:
+                        raise RuntimeError(
+                            f"{name} ({size}): {response.status_code} {response.get_data(as_text=True)[:300]}")
+            results[name] = {
+                "wall_s": round(sum(latencies) / 1000, 4),
+                "p50_ms": round(percentile(latencies, 50), 2),
+                "p95_ms": round(percentile(latencies, 95), 2),
+                "p99_ms": round(percentile(latencies, 99), 2),
+                "upstream_calls": round(calls / options["repeat"], 1),
+                "peak_rss_mb": round(rss.peak, 1),
+            }
+        return results
+    finally:
+        fake.terminate()
+        os.chdir(previous_dir)
+        workdir.cleanup()
+
+
+def _run_size_in_child(size, options, queue):
+    try:
+        queue.put(("ok", run_size(size, options)))
+    except Exception as e:
+        queue.put(("error", f"{type(e).__name__}: {e}"))
+
+
+def run(sizes, options):
+    """{size: {scenario: metrics}}, each size in a fresh process so RSS is its own"""
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for size in sizes:
+        queue = context.Queue()
+        worker = context.Process(target=_run_size_in_child, args=(size, options, queue))
+        worker.start()
+        while True:
+            try:
+                status, value = queue.get(timeout=1)
+                break
+            except Empty:
+                if not worker.is_alive():
+                    raise RuntimeError(f"benchmark process for {size} items died "
+                                       f"(exit code {worker.exitcode})")
+        worker.join()
+        if status == "error":
+            raise RuntimeError(value)
+        results[str(size)] = value
+        print_results({str(size): value})
+    return results
+
+
+def compare(results, baseline):
+    """Descriptions of every metric worse than the baseline beyond TOLERANCES"""
+    regressions = []
+    for size, by_scenario in results.items():
+        for scenario, metrics in by_scenario.items():
+            expected = baseline.get(size, {}).get(scenario)
+            if not expected:
+                continue
+            for metric, (slack, floor) in TOLERANCES.items():
+                if metric not in expected:
+                    continue
+                was, now = expected[metric], metrics[metric]
+                if now > was * (1 + slack) and now - was > floor:
+                    regressions.append(
+                        f"{scenario} @ {size}: {metric} {was} -> {now}")
+    return regressions
+
+
+def print_results(results):
+    columns = ("wall_s", "p50_ms", "p95_ms", "p99_ms", "upstream_calls", "peak_rss_mb")
+    for size, by_scenario in results.items():
+        print(f"\n{size} items")
+        print(f"  {'scenario':22s}" + "".join(f"{c:>16s}" for c in columns))
+        for scenario, metrics in by_scenario.items():
+            print(f"  {scenario:22s}" + "".join(f"{metrics[c]:>16}" for c in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.01,
+                        help="seconds the fake API sleeps per request")
+    parser.add_argument("--rate-limit", type=float, default=1000,
+                        help="SPOTIFY_RATE_LIMIT for the run (requests/s)")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store these results as the baseline instead of comparing")
+    parser.add_argument("--output", type=Path, help="also write the results here as JSON")
+    args = parser.parse_args()
+
+    options = {"repeat": args.repeat, "warmup": args.warmup, "latency": args.latency,
+               "rate_limit": args.rate_limit}
+    results = run(args.sizes, options)
+    report = {"options": options, "results": results}
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+    if not args.baseline.exists():
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to record one")
+        return 0
+    stored = json.loads(args.baseline.read_text())
+    if stored.get("options") != options:
+        print(f"\nWARNING. Baseline was recorded with {stored.get('options')}, "
+              f"this run used {options}")
+    regressions = compare(results, stored.get("results", {}))
+    if regressions:
+        print("\nRegressions against the baseline:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print("\nNo regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,721 @@
+"""
+Local stand-in for the Spotify Web API and the accounts service, serving
+generated fixtures (see fake_spotify.py) over HTTP so the whole backend can
+run offline. Point the backend at it with:
+
+    SPOTIFY_API_URL=http://127.0.0.1:8888/v1/
+    SPOTIFY_ACCOUNTS_URL=http://127.0.0.1:8888
+
+Run from the repository root:
+    python -m src.backend.benchmarks.fake_api --port 8888 --playlists 20 --playlist-size 1000
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from ..utils.reorder import apply_move
+from .fake_spotify import (make_album, album_track, make_artist, make_playlist_item,
+                           make_track, make_user, _image_set)
+
+# Largest `limit` each paged endpoint accepts, as documented by Spotify
+MAX_LIMITS = {
+    "playlist_items": 100,
+    "album_tracks": 50,
+    "saved_tracks": 50,
+    "saved_albums": 50,
+    "playlists": 50,
+    "followed_artists": 50,
+    "top": 50,
+    "artist_albums": 50,
+    "search": 50,
+}
+MAX_IDS = {"tracks": 50, "albums": 20, "artists": 50}
+# Items the catalog search pretends to have per type
+SEARCH_TOTAL = 1000
+TOP_TOTAL = 50
+SEARCH_TYPES = {"album", "artist", "playlist", "track", "show", "episode", "audiobook"}
+
+
+class FakeAPIError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+def _track_for(track_id):
+    """Track object for an ID: make_track's own tracks keep their fixture data"""
+    match = re.fullmatch(r"track(\d+)", track_id)
+    if match:
+        return make_track(int(match.group(1)))
+    return dict(make_track(0), id=track_id, name=f"Track {track_id}",
+                uri=f"spotify:track:{track_id}",
+                external_urls={"spotify": f"https://open.spotify.com/track/{track_id}"})
+
+
+def _number(item_id, kind):
+    match = re.fullmatch(kind + r"(\d+)", item_id)
+    if not match:
+        raise FakeAPIError(404, "Resource not found")
+    return int(match.group(1))
+
+
+def _parse_fields(text):
+    """
+    Spotify `fields` filter ("snapshot_id,tracks.total", "items(track(id))")
+    as a tree {key: subtree, or None for the whole value}
+    """
+    def parse(i):
+        tree = {}
+        while i < len(text) and text[i] != ")":
+            j = i
+            while j < len(text) and text[j] not in ",()":
+                j += 1
+            keys = [k.strip() for k in text[i:j].split(".")]
+            node = tree
+            for key in keys[:-1]:
+                if node.get(key) is None:
+                    node[key] = {}
+                node = node[key]
+            sub = None
+            if j < len(text) and text[j] == "(":
+                sub, j = parse(j + 1)
+                j += 1  # closing parenthesis
+            node[keys[-1]] = sub
+            i = j + 1 if j < len(text) and text[j] == "," else j
+        return tree, i
+    return parse(0)[0]
+
+
+def _select(obj, tree):
+    """obj reduced to the fields in a _parse_fields tree (applied to each item of lists)"""
+    if isinstance(obj, list):
+        return [_select(item, tree) for item in obj]
+    if not isinstance(obj, dict):
+        return obj
+    return {key: obj[key] if sub is None else _select(obj[key], sub)
+            for key, sub in tree.items() if key in obj}
+
+
+class FakeSpotifyAPI:
+    """
+    State and request handling of the fake API: one user's library
+    (playlists, saved tracks and albums, followed artists) plus a generated
+    catalog. Playlist edits behave like Spotify's: every edit bumps the
+    playlist's snapshot_id.
+
+    Knobs for exercising the backend:
+      - latency (+ random jitter) seconds slept per request
+      - page_size caps items per page below what was asked for
+      - throttle_every / throttle_rate answer every Nth / a random share of
+        requests with 429 and a Retry-After of retry_after seconds
+    `calls` counts requests per endpoint (reset with reset_stats); a server
+    in another process exposes them at /__fake__/stats and /__fake__/reset.
+    reset_library (/__fake__/restore) undoes every playlist edit and follow.
+    """
+
+    def __init__(self, user_id="fakeuser", playlist_sizes=None, saved_tracks=0,
+                 saved_albums=0, followed_artists=0, album_size=12,
+                 latency=0.0, jitter=0.0, page_size=None,
+                 throttle_every=0, throttle_rate=0.0, retry_after=1, seed=0):
+        self.user_id = user_id
+        self.album_size = album_size
+        self.latency = latency
+        self.jitter = jitter
+        self.page_size = page_size
+        self.throttle_every = throttle_every
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        self.playlists = {}
+        self.versions = {}
+        self.owners = {}
+        self.library_playlists = []
+        self._playlist_sizes = dict(playlist_sizes or {})
+        for playlist_id, size in self._playlist_sizes.items():
+            self.playlists[playlist_id] = [make_playlist_item(i) for i in range(size)]
+            self.versions[playlist_id] = 0
+            self.owners[playlist_id] = user_id
+            self.library_playlists.append(playlist_id)
+        # snapshot version of each playlist as built
+        self._pristine = dict(self.versions)
+        self.saved_tracks = [f"track{i}" for i in range(saved_tracks)]
+        self.saved_albums = [f"album{i}" for i in range(saved_albums)]
+        self.followed_artists = [f"artist{i}" for i in range(followed_artists)]
+        self.followed_users = set()
+        self.requests = 0
+        self.calls = {}
+        self._routes = self._build_routes()
+
+    def reset_stats(self):
+        with self._lock:
+            self.requests = 0
+            self.calls = {}
+
+    def stats(self):
+        with self._lock:
+            return {"requests": self.requests, "calls": dict(self.calls)}
+
+    def reset_library(self):
+        """
+        Put every edited playlist back as it was built, drop created ones
+        and restore the followed playlists. A restored playlist gets a new snapshot_id, like any edit;
+        untouched playlists keep theirs.
+
+        Returns:
+            IDs of the playlists restored
+        """
+        with self._lock:
+            for playlist_id in [p for p in self.playlists if p not in self._pristine]:
+                del self.playlists[playlist_id], self.versions[playlist_id], \
+                    self.owners[playlist_id]
+            self.library_playlists = list(self._pristine)
+            restored = []
+            for playlist_id, version in self._pristine.items():
+                if self.versions[playlist_id] == version:
+                    continue
+                size = self._playlist_sizes[playlist_id]
+                self.playlists[playlist_id] = [make_playlist_item(i) for i in range(size)]
+                self.versions[playlist_id] += 1
+                self._pristine[playlist_id] = self.versions[playlist_id]
+                restored.append(playlist_id)
+            return restored
+
+    # ---- dispatch ----
+
+    def _build_routes(self):
+        routes = [
+            ("POST", r"/api/token", self.token),
+            ("GET", r"/authorize", self.authorize),
+            ("GET", r"/v1/me/?", self.current_user),
+            ("GET", r"/v1/me/playlists", self.current_user_playlists),
+            ("GET", r"/v1/me/tracks", self.current_user_saved_tracks),
+            ("GET", r"/v1/me/albums", self.current_user_saved_albums),
+            ("GET", r"/v1/me/following", self.current_user_followed_artists),
+            ("GET", r"/v1/me/top/(tracks|artists)", self.current_user_top),
+            ("GET", r"/v1/me/player/devices", self.devices),
+            ("GET", r"/v1/me/library/contains", self.library_contains),
+            ("PUT", r"/v1/me/library", self.library_add),
+            ("DELETE", r"/v1/me/library", self.library_remove),
+            ("GET", r"/v1/users/([^/]+)", self.user),
+            ("GET", r"/v1/users/([^/]+)/playlists", self.user_playlists),
+            ("POST", r"/v1/users/([^/]+)/playlists", self.user_playlist_create),
+            ("GET", r"/v1/playlists/([^/]+)", self.playlist),
+            ("GET", r"/v1/playlists/([^/]+)/(?:items|tracks)", self.playlist_items),
+            ("POST", r"/v1/playlists/([^/]+)/(?:items|tracks)", self.playlist_add_items),
+            ("PUT", r"/v1/playlists/([^/]+)/(?:items|tracks)", self.playlist_update_items),
+            ("DELETE", r"/v1/playlists/([^/]+)/(?:items|tracks)", self.playlist_remove_items),
+            ("DELETE", r"/v1/playlists/([^/]+)/followers", self.playlist_unfollow),
+            ("PUT", r"/v1/playlists/([^/]+)/followers", self.playlist_follow),
+            ("PUT", r"/v1/playlists/([^/]+)/images", self.playlist_upload_cover_image),
+            ("GET", r"/v1/tracks/?", self.tracks),
+            ("GET", r"/v1/tracks/([^/]+)", self.track),
+            ("GET", r"/v1/albums/?", self.albums),
+            ("GET", r"/v1/albums/([^/]+)", self.album),
+            ("GET", r"/v1/albums/([^/]+)/tracks/?", self.album_tracks),
+            ("GET", r"/v1/artists/?", self.artists),
+            ("GET", r"/v1/artists/([^/]+)", self.artist),
+            ("GET", r"/v1/artists/([^/]+)/top-tracks", self.artist_top_tracks),
+            ("GET", r"/v1/artists/([^/]+)/albums", self.artist_albums),
+            ("GET", r"/v1/search", self.search),
+        ]
+        return [(method, re.compile(pattern), handler) for method, pattern, handler in routes]
+
+    def _throttled(self):
+        if self.throttle_every and self.requests % self.throttle_every == 0:
+            return True
+        return self.throttle_rate and self._random.random() < self.throttle_rate
+
+    def handle(self, method, path, query, body, headers):
+        """Answer one request: (status, body or None, extra headers)"""
+        # Control endpoints for a server in another process; never counted or throttled
+        if path == "/__fake__/stats" and method == "GET":
+            return 200, self.stats(), {}
+        if path == "/__fake__/reset" and method == "POST":
+            self.reset_stats()
+            return 200, self.stats(), {}
+        if path == "/__fake__/restore" and method == "POST":
+            return 200, {"restored": self.reset_library()}, {}
+
+        for route_method, pattern, handler in self._routes:
+            match = pattern.fullmatch(path)
+            if match and route_method == method:
+                break
+        else:
+            return 404, {"error": {"status": 404, "message": "Service not found"}}, {}
+
+        with self._lock:
+            self.requests += 1
+            self.calls[handler.__name__] = self.calls.get(handler.__name__, 0) + 1
+            throttled = self._throttled()
+        if self.latency or self.jitter:
+            time.sleep(self.latency + self._random.random() * self.jitter)
+        if throttled:
+            return 429, {"error": {"status": 429, "message": "API rate limit exceeded"}}, {
+                "Retry-After": str(self.retry_after)}
+        if path.startswith("/v1/") and not headers.get("Authorization", "").startswith("Bearer "):
+            return 401, {"error": {"status": 401, "message": "No token provided"}}, {}
+
+        try:
+            result = handler(*match.groups(), query=query, body=body)
+        except FakeAPIError as e:
+            return e.status, {"error": {"status": e.status, "message": e.message}}, e.headers
+        if isinstance(result, tuple):
+            return result
+        return 200, result, {}
+
+    # ---- helpers ----
+
+    def _limit(self, query, endpoint, default=20):
+        limit = int(query.get("limit", default))
+        if not 0 < limit <= MAX_LIMITS[endpoint]:
+            raise FakeAPIError(400, "Invalid limit")
+        return limit
+
+    def _page(self, items, query, endpoint, total=None, wrap=None):
+        """Paging object over `items` (a list, or a callable(offset, limit) with total)"""
+        limit = self._limit(query, endpoint)
+        offset = int(query.get("offset", 0))
+        served = min(limit, self.page_size) if self.page_size else limit
+        if callable(items):
+            total = total or 0
+            page = items(offset, max(0, min(served, total - offset)))
+        else:
+            total = len(items)
+            page = items[offset:offset + served]
+        if wrap:
+            page = [wrap(item) for item in page]
+        return {
+            "items": page,
+            "limit": limit,
+            "offset": offset,
+            "total": total,
+            "next": f"?{urlencode({'offset': offset + limit, 'limit': limit})}"
+                    if offset + limit < total else None,
+            "previous": None,
+        }
+
+    def _ids(self, query, kind):
+        ids = [i for i in query.get("ids", "").split(",") if i]
+        if not ids or len(ids) > MAX_IDS[kind]:
+            raise FakeAPIError(400, "Too many ids requested" if ids else "Missing ids")
+        return ids
+
+    def _playlist_tracks(self, playlist_id):
+        if playlist_id not in self.playlists:
+            raise FakeAPIError(404, "Resource not found")
+        return self.playlists[playlist_id]
+
+    def _snapshot_id(self, playlist_id):
+        return f"{playlist_id}-snapshot-{self.versions[playlist_id]}"
+
+    def _edited(self, playlist_id):
+        self.versions[playlist_id] += 1
+        return 200, {"snapshot_id": self._snapshot_id(playlist_id)}, {}
+
+    def _simple_playlist(self, playlist_id):
+        owner = self.owners[playlist_id]
+        return {
+            "collaborative": False,
+            "description": f"Description of {playlist_id}",
+            "external_urls": {"spotify": f"https://open.spotify.com/playlist/{playlist_id}"},
+            "id": playlist_id,
+            "images": _image_set(playlist_id),
+            "name": f"Playlist {playlist_id}",
+            "owner": {"display_name": f"User {owner}", "id": owner, "type": "user",
+                      "uri": f"spotify:user:{owner}"},
+            "public": True,
+            "snapshot_id": self._snapshot_id(playlist_id),
+            "tracks": {"total": len(self.playlists[playlist_id])},
+            "type": "playlist",
+            "uri": f"spotify:playlist:{playlist_id}",
+        }
+
+    @staticmethod
+    def _uris(query, body):
+        uris = query.get("uris") or (body or {}).get("uris") or []
+        if isinstance(uris, str):
+            uris = uris.split(",")
+        return [uri.split(":") for uri in uris]
+
+    # ---- accounts service ----
+
+    def token(self, query, body):
+        return {"access_token": f"fake-access-{self.user_id}", "token_type": "Bearer",
+                "expires_in": 3600, "refresh_token": f"fake-refresh-{self.user_id}",
+                "scope": (body or {}).get("scope", "")}
+
+    def authorize(self, query, body):
+        location = f"{query.get('redirect_uri', '/')}?{urlencode({'code': 'fake-code', 'state': query.get('state', '')})}"
+        return 302, None, {"Location": location}
+
+    # ---- current user ----
+
+    def current_user(self, query, body):
+        return make_user(self.user_id)
+
+    def current_user_playlists(self, query, body):
+        with self._lock:
+            return self._page(self.library_playlists, query, "playlists",
+                              wrap=self._simple_playlist)
+
+    def current_user_saved_tracks(self, query, body):
+        with self._lock:
+            return self._page(self.saved_tracks, query, "saved_tracks", wrap=lambda track_id: {
+                "added_at": "2021-01-12T01:11:18Z", "track": _track_for(track_id)})
+
+    def current_user_saved_albums(self, query, body):
+        with self._lock:
+            return self._page(self.saved_albums, query, "saved_albums", wrap=lambda album_id: {
+                "added_at": "2021-01-12T01:11:18Z",
+                "album": make_album(_number(album_id, "album"), self.album_size)})
+
+    def current_user_followed_artists(self, query, body):
+        limit = self._limit(query, "followed_artists")
+        with self._lock:
+            artists = self.followed_artists
+            start = artists.index(query["after"]) + 1 if query.get("after") in artists else 0
+            page = artists[start:start + (min(limit, self.page_size) if self.page_size else limit)]
+            return {"artists": {
+                "items": [make_artist(_number(a, "artist")) for a in page],
+                "limit": limit,
+                "total": len(artists),
+                "cursors": {"after": page[-1] if page and start + len(page) < len(artists) else None},
+                "next": None,
+            }}
+
+    def current_user_top(self, kind, query, body):
+        make = make_track if kind == "tracks" else make_artist
+        return self._page(lambda offset, limit: [make(offset + i) for i in range(limit)],
+                          query, "top", total=TOP_TOTAL)
+
+    def devices(self, query, body):
+        return {"devices": []}
+
+    def _library_lists(self):
+        return {"track": self.saved_tracks, "album": self.saved_albums,
+                "artist": self.followed_artists, "playlist": self.library_playlists}
+
+    def library_contains(self, query, body):
+        with self._lock:
+            lists = self._library_lists()
+            return [(kind == "user" and item_id in self.followed_users)
+                    or item_id in lists.get(kind, ())
+                    for _, kind, item_id in self._uris(query, body)]
+
+    def library_add(self, query, body):
+        with self._lock:
+            lists = self._library_lists()
+            for _, kind, item_id in self._uris(query, body):
+                if kind == "user":
+                    self.followed_users.add(item_id)
+                elif item_id not in lists[kind]:
+                    if kind == "playlist":
+                        self._playlist_tracks(item_id)
+                    lists[kind].insert(0, item_id)
+        return 200, None, {}
+
+    def library_remove(self, query, body):
+        with self._lock:
+            lists = self._library_lists()
+            for _, kind, item_id in self._uris(query, body):
+                if kind == "user":
+                    self.followed_users.discard(item_id)
+                elif item_id in lists[kind]:
+                    lists[kind].remove(item_id)
+        return 200, None, {}
+
+    # ---- users ----
+
+    def user(self, user_id, query, body):
+        return make_user(user_id)
+
+    def user_playlists(self, user_id, query, body):
+        with self._lock:
+            owned = [p for p in self.library_playlists if self.owners[p] == user_id]
+            return self._page(owned, query, "playlists", wrap=self._simple_playlist)
+
+    def user_playlist_create(self, user_id, query, body):
+        with self._lock:
+            playlist_id = f"created{len(self.playlists)}"
+            self.playlists[playlist_id] = []
+            self.versions[playlist_id] = 0
+            self.owners[playlist_id] = user_id
+            self.library_playlists.insert(0, playlist_id)
+            playlist = dict(self._simple_playlist(playlist_id), **{
+                key: body[key] for key in ("name", "public", "collaborative", "description")
+                if key in (body or {})})
+        return 201, playlist, {}
+
+    # ---- playlists ----
+
+    def playlist(self, playlist_id, query, body):
+        with self._lock:
+            tracks = self._playlist_tracks(playlist_id)
+            playlist = dict(self._simple_playlist(playlist_id),
+                            followers={"href": None, "total": 0},
+                            tracks=self._page(tracks, dict(query, limit=100), "playlist_items"))
+        if query.get("fields"):
+            return _select(playlist, _parse_fields(query["fields"]))
+        return playlist
+
+    def playlist_items(self, playlist_id, query, body):
+        with self._lock:
+            page = self._page(self._playlist_tracks(playlist_id), query, "playlist_items")
+        if query.get("fields"):
+            return _select(page, _parse_fields(query["fields"]))
+        return page
+
+    def playlist_add_items(self, playlist_id, query, body):
+        # spotipy sends the URIs as the body and the position as a parameter
+        uris = body if isinstance(body, list) else (body or {}).get("uris")
+        if not uris or len(uris) > 100:
+            raise FakeAPIError(400, "You can add a maximum of 100 tracks per request.")
+        new_items = [dict(make_playlist_item(0), track=_track_for(uri.split(":")[-1]))
+                     for uri in uris]
+        position = query.get("position")
+        with self._lock:
+            tracks = self._playlist_tracks(playlist_id)
+            at = len(tracks) if position is None else int(position)
+            self.playlists[playlist_id] = tracks[:at] + new_items + tracks[at:]
+            status, result, headers = self._edited(playlist_id)
+        return 201, result, headers
+
+    def playlist_update_items(self, playlist_id, query, body):
+        body = body or {}
+        with self._lock:
+            tracks = self._playlist_tracks(playlist_id)
+            if "range_start" in body:
+                start, length = body["range_start"], body.get("range_length", 1)
+                if not (0 <= start and start + length <= len(tracks)
+                        and 0 <= body["insert_before"] <= len(tracks)):
+                    raise FakeAPIError(400, "Index out of bounds")
+                self.playlists[playlist_id] = apply_move(
+                    tracks, start, length, body["insert_before"])
+            else:
+                uris = body.get("uris") or []
+                if len(uris) > 100:
+                    raise FakeAPIError(400, "You can add a maximum of 100 tracks per request.")
+                self.playlists[playlist_id] = [
+                    dict(make_playlist_item(0), track=_track_for(uri.split(":")[-1]))
+                    for uri in uris]
+            return self._edited(playlist_id)
+
+    def playlist_remove_items(self, playlist_id, query, body):
+        items = (body or {}).get("items") or (body or {}).get("tracks") or []
+        if not items or len(items) > 100:
+            raise FakeAPIError(400, "You can remove a maximum of 100 tracks per request.")
+        with self._lock:
+            tracks = self._playlist_tracks(playlist_id)
+            drop = set()
+            for item in items:
+                if "positions" in item:
+                    for position in item["positions"]:
+                        if position >= len(tracks) or tracks[position]["track"]["uri"] != item["uri"]:
+                            raise FakeAPIError(400, "Could not remove tracks, please check parameters.")
+                        drop.add(position)
+                else:
+                    drop.update(i for i, t in enumerate(tracks)
+                                if t["track"]["uri"] == item["uri"])
+            self.playlists[playlist_id] = [t for i, t in enumerate(tracks) if i not in drop]
+            return self._edited(playlist_id)
+
+    def playlist_unfollow(self, playlist_id, query, body):
+        with self._lock:
+            if playlist_id in self.library_playlists:
+                self.library_playlists.remove(playlist_id)
+        return 200, None, {}
+
+    def playlist_follow(self, playlist_id, query, body):
+        with self._lock:
+            self._playlist_tracks(playlist_id)
+            if playlist_id not in self.library_playlists:
+                self.library_playlists.insert(0, playlist_id)
+        return 200, None, {}
+
+    def playlist_upload_cover_image(self, playlist_id, query, body):
+        with self._lock:
+            self._playlist_tracks(playlist_id)
+        return 202, None, {}
+
+    # ---- catalog ----
+
+    def track(self, track_id, query, body):
+        return _track_for(track_id)
+
+    def tracks(self, query, body):
+        return {"tracks": [_track_for(t) for t in self._ids(query, "tracks")]}
+
+    def album(self, album_id, query, body):
+        return make_album(_number(album_id, "album"), self.album_size)
+
+    def albums(self, query, body):
+        return {"albums": [make_album(_number(a, "album"), self.album_size)
+                           for a in self._ids(query, "albums")]}
+
+    def album_tracks(self, album_id, query, body):
+        n = _number(album_id, "album")
+        return self._page(lambda offset, limit: [album_track(n, offset + k) for k in range(limit)],
+                          query, "album_tracks", total=self.album_size)
+
+    def artist(self, artist_id, query, body):
+        return make_artist(_number(artist_id, "artist"))
+
+    def artists(self, query, body):
+        return {"artists": [make_artist(_number(a, "artist")) for a in self._ids(query, "artists")]}
+
+    def artist_top_tracks(self, artist_id, query, body):
+        n = _number(artist_id, "artist")
+        return {"tracks": [make_track(n + 97 * k) for k in range(10)]}
+
+    def artist_albums(self, artist_id, query, body):
+        n = _number(artist_id, "artist")
+        return self._page(lambda offset, limit: [
+            dict(make_album(n + 97 * (offset + k), self.album_size), tracks=None)
+            for k in range(limit)], query, "artist_albums", total=10)
+
+    def search(self, query, body):
+        types = [t for t in query.get("type", "").split(",") if t]
+        if not query.get("q") or not types or not set(types) <= SEARCH_TYPES:
+            raise FakeAPIError(400, "Bad search type field" if query.get("q") else "No search query")
+        makers = {
+            "track": make_track,
+            "artist": make_artist,
+            "album": lambda n: dict(make_album(n, self.album_size), tracks=None),
+            "playlist": lambda n: dict(self._simple_playlist(self.library_playlists[0]),
+                                       id=f"searched{n}", name=f"{query['q']} {n}")
+            if self.library_playlists else None,
+        }
+        results = {}
+        for kind in types:
+            make = makers.get(kind, lambda n: None)
+            results[kind + "s"] = self._page(
+                lambda offset, limit: [make(offset + i) for i in range(limit)],
+                query, "search", total=SEARCH_TOTAL)
+        return results
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; with Nagle on, keep-alive
+    # clients wait out a delayed ACK (~40ms) on every response
+    disable_nagle_algorithm = True
+    api = None  # set per server in FakeSpotifyServer
+
+    def _serve(self):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        if "x-www-form-urlencoded" in (self.headers.get("Content-Type") or ""):
+            body = {key: values[0] for key, values in parse_qs(raw.decode()).items()}
+        else:
+            try:
+                body = json.loads(raw) if raw else None
+            except ValueError:
+                body = raw.decode(errors="replace")  # e.g. a base64 cover image
+
+        status, result, headers = self.api.handle(
+            self.command, url.path, query, body, self.headers)
+        data = json.dumps(result).encode() if result is not None else b""
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if data:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _serve
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeSpotifyServer:
+    """Serves a FakeSpotifyAPI on a background thread (port 0 picks a free port)"""
+
+    def __init__(self, api, host="127.0.0.1", port=0):
+        self.api = api
+        handler = type("Handler", (_Handler,), {"api": api})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_url(self):
+        return f"{self.url}/v1/"
+
+    def env(self):
+        """Environment variables pointing a SpotifyManager at this server"""
+        return {"SPOTIFY_API_URL": self.api_url, "SPOTIFY_ACCOUNTS_URL": self.url}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name="fake-spotify-api", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument("--user", default="fakeuser")
+    parser.add_argument("--playlists", type=int, default=10)
+    parser.add_argument("--playlist-size", type=int, default=1000)
+    parser.add_argument("--saved-tracks", type=int, default=1000)
+    parser.add_argument("--saved-albums", type=int, default=100)
+    parser.add_argument("--followed-artists", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--page-size", type=int, default=None)
+    parser.add_argument("--throttle-every", type=int, default=0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    args = parser.parse_args()
+
+    api = FakeSpotifyAPI(
+        user_id=args.user,
+        playlist_sizes={f"playlist{i}": args.playlist_size for i in range(args.playlists)},
+        saved_tracks=args.saved_tracks, saved_albums=args.saved_albums,
+        followed_artists=args.followed_artists, latency=args.latency, jitter=args.jitter,
+        page_size=args.page_size, throttle_every=args.throttle_every,
+        throttle_rate=args.throttle_rate, retry_after=args.retry_after)
+    server = FakeSpotifyServer(api, args.host, args.port).start()
+    print(f"Fake Spotify API on {server.url}")
+    for name, value in server.env().items():
+        print(f"  {name}={value}")
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
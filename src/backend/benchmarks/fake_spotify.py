@@ -0,0 +1,218 @@
+import threading
+import time
+
+from spotipy import SpotifyException
+
+from ..utils.reorder import apply_move
+
+
+def _image_set(seed):
+    return [
+        {"url": f"https://i.scdn.co/image/{seed}-640", "height": 640, "width": 640},
+        {"url": f"https://i.scdn.co/image/{seed}-300", "height": 300, "width": 300},
+        {"url": f"https://i.scdn.co/image/{seed}-64", "height": 64, "width": 64},
+    ]
+
+
+def make_track(n):
+    """Track object shaped like the sample in models/song.py"""
+    artist = {"id": f"artist{n % 97}", "name": f"Artist {n % 97}",
+              "type": "artist", "uri": f"spotify:artist:artist{n % 97}",
+              "external_urls": {"spotify": f"https://open.spotify.com/artist/artist{n % 97}"}}
+    return {
+        "album": {
+            "album_type": "album",
+            "total_tracks": 12,
+            "id": f"album{n % 211}",
+            "name": f"Album {n % 211}",
+            "images": _image_set(f"album{n % 211}"),
+            "release_date": "2021-03-26",
+            "artists": [artist],
+            "external_urls": {"spotify": f"https://open.spotify.com/album/album{n % 211}"},
+        },
+        "artists": [artist],
+        "disc_number": 1,
+        "duration_ms": 180000 + n,
+        "explicit": n % 5 == 0,
+        "id": f"track{n}",
+        "name": f"Track {n}",
+        "popularity": n % 100,
+        "track_number": n % 12 + 1,
+        "type": "track",
+        "uri": f"spotify:track:track{n}",
+        "is_local": False,
+        "external_urls": {"spotify": f"https://open.spotify.com/track/track{n}"},
+    }
+
+
+def make_playlist_item(n):
+    """Playlist track item shaped like the sample in models/playlist.py"""
+    return {
+        "added_at": "2021-01-12T01:11:18Z",
+        "added_by": {"id": "fakeuser", "type": "user"},
+        "is_local": False,
+        "track": make_track(n),
+    }
+
+
+def make_artist(n):
+    """Artist object shaped like the sample in models/artist.py"""
+    return {
+        "external_urls": {"spotify": f"https://open.spotify.com/artist/artist{n}"},
+        "followers": {"href": None, "total": 1000 * (n + 1)},
+        "genres": [f"genre {n % 13}"],
+        "id": f"artist{n}",
+        "images": _image_set(f"artist{n}"),
+        "name": f"Artist {n}",
+        "popularity": n % 100,
+        "type": "artist",
+        "uri": f"spotify:artist:artist{n}",
+    }
+
+
+def make_album(n, size=12):
+    """
+    Album object shaped like the sample in models/album.py. Its tracks are
+    the make_track tracks that belong to it (n, n + 211, ...), with the
+    first 50 embedded like the real endpoint.
+    """
+    album = make_track(n)["album"]
+    tracks = [album_track(n, k) for k in range(size)]
+    return dict(album, total_tracks=size, release_date_precision="day",
+                type="album", uri=f"spotify:album:album{n}", label=f"Label {n % 7}",
+                genres=[], popularity=n % 100,
+                tracks={"items": tracks[:50], "limit": 50, "offset": 0,
+                        "total": size})
+
+
+def album_track(n, k):
+    """Track k of album n without its album, as the album tracks endpoint returns it"""
+    track = make_track(n + 211 * k)
+    del track["album"]
+    return dict(track, track_number=k + 1)
+
+
+def make_user(user_id):
+    """User object shaped like the sample in models/user.py"""
+    return {
+        "display_name": f"User {user_id}",
+        "external_urls": {"spotify": f"https://open.spotify.com/user/{user_id}"},
+        "followers": {"href": None, "total": 10},
+        "id": user_id,
+        "images": _image_set(user_id)[:2],
+        "type": "user",
+        "uri": f"spotify:user:{user_id}",
+        "country": "US",
+        "product": "premium",
+    }
+
+
+class FakeSpotify:
+    """
+    In-process stand-in for a spotipy.Spotify client.
+    Every call sleeps for `latency` seconds to model one upstream round trip.
+    """
+
+    def __init__(self, playlist_sizes=None, latency=0.05):
+        self.latency = latency
+        self.playlists = {
+            playlist_id: [make_playlist_item(i) for i in range(size)]
+            for playlist_id, size in (playlist_sizes or {}).items()
+        }
+        self.versions = {playlist_id: 0 for playlist_id in self.playlists}
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _request(self):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+
+    def playlist(self, playlist_id, fields=None, market=None):
+        self._request()
+        items = self.playlists[playlist_id]
+        return {
+            "id": playlist_id,
+            "name": f"Playlist {playlist_id}",
+            "snapshot_id": self._snapshot_id(playlist_id),
+            "tracks": {"total": len(items), "items": items[:100]},
+        }
+
+    def playlist_tracks(self, playlist_id, fields=None, limit=100, offset=0, market=None):
+        if limit > 100:
+            raise ValueError("limit must be <= 100")
+        self._request()
+        items = self.playlists[playlist_id]
+        return {
+            "items": items[offset:offset + limit],
+            "limit": limit,
+            "offset": offset,
+            "total": len(items),
+        }
+
+    def _snapshot_id(self, playlist_id):
+        version = self.versions[playlist_id]
+        return f"{playlist_id}-snapshot" + (f"-{version}" if version else "")
+
+    def _edited(self, playlist_id):
+        self.versions[playlist_id] += 1
+        return {"snapshot_id": self._snapshot_id(playlist_id)}
+
+    def playlist_reorder_items(self, playlist_id, range_start, insert_before,
+                               range_length=1, snapshot_id=None):
+        self._request()
+        with self._lock:
+            self.playlists[playlist_id] = apply_move(
+                self.playlists[playlist_id], range_start, range_length, insert_before)
+            return self._edited(playlist_id)
+
+    def _new_items(self, track_ids):
+        return [dict(make_playlist_item(0), track=dict(make_track(0), id=track_id,
+                                                      uri=f"spotify:track:{track_id}"))
+                for track_id in track_ids]
+
+    def playlist_replace_items(self, playlist_id, items):
+        if len(items) > 100:
+            raise SpotifyException(400, -1, "You can add a maximum of 100 tracks per request.")
+        self._request()
+        with self._lock:
+            self.playlists[playlist_id] = self._new_items(items)
+            return self._edited(playlist_id)
+
+    def playlist_remove_specific_occurrences_of_items(self, playlist_id, items, snapshot_id=None):
+        if len(items) > 100:
+            raise SpotifyException(400, -1, "You can remove a maximum of 100 tracks per request.")
+        self._request()
+        with self._lock:
+            tracks = self.playlists[playlist_id]
+            drop = set()
+            for item in items:
+                for position in item["positions"]:
+                    if tracks[position]["track"]["uri"] != item["uri"]:
+                        raise SpotifyException(400, -1, "Could not remove tracks, please check parameters.")
+                    drop.add(position)
+            self.playlists[playlist_id] = [t for i, t in enumerate(tracks)
+                                           if i not in drop]
+            return self._edited(playlist_id)
+
+    def playlist_add_items(self, playlist_id, items, position=None):
+        if len(items) > 100:
+            raise SpotifyException(400, -1, "You can add a maximum of 100 tracks per request.")
+        self._request()
+        new_items = self._new_items(items)
+        with self._lock:
+            tracks = self.playlists[playlist_id]
+            at = len(tracks) if position is None else position
+            self.playlists[playlist_id] = tracks[:at] + new_items + tracks[at:]
+            return self._edited(playlist_id)
+
+
+class FakeSpotifyManager:
+    """Just enough of SpotifyManager for the models to run against FakeSpotify"""
+
+    def __init__(self, sp, page_workers=8):
+        self.sp = sp
+        self.page_workers = page_workers
+
+    def get_spotify_client(self):
+        return self.sp
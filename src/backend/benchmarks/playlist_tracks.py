@@ -0,0 +1,47 @@
+"""
+Benchmark Playlist.get_playlist_tracks, sequential vs concurrent page fetching.
+
+Run from the repository root:
+    python -m src.backend.benchmarks.playlist_tracks --size 5000 --latency 0.05
+"""
+import argparse
+import time
+
+from ..functions.models.playlist import Playlist
+from .fake_spotify import FakeSpotify, FakeSpotifyManager
+
+
+def run(size, latency, workers, concurrent):
+    sp = FakeSpotify(playlist_sizes={"bench": size}, latency=latency)
+    manager = FakeSpotifyManager(sp, page_workers=workers)
+    playlist = Playlist(manager, "bench")
+    playlist.get_playlist()
+    sp.calls = 0
+
+    start = time.perf_counter()
+    tracks = playlist.get_playlist_tracks(
+        playlist.get_playlist_length(), concurrent=concurrent)
+    elapsed = time.perf_counter() - start
+
+    assert [t["track"]["id"] for t in tracks] == [
+        f"track{i}" for i in range(size)], "tracks returned out of order"
+    return elapsed, sp.calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--workers", type=int, nargs="+", default=[4, 8, 16])
+    args = parser.parse_args()
+
+    elapsed, calls = run(args.size, args.latency, 1, concurrent=False)
+    print(f"sequential       {elapsed:7.2f}s  {calls:4d} calls")
+    for workers in args.workers:
+        elapsed, calls = run(args.size, args.latency,
+                             workers, concurrent=True)
+        print(f"concurrent x{workers:<3d} {elapsed:7.2f}s  {calls:4d} calls")
+
+
+if __name__ == "__main__":
+    main()
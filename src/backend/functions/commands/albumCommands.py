@@ -1,11 +1,17 @@
 from ..models.album import Album
 from ...utils.errors import *
+from ...utils.batching import resolve_batch, MAX_BATCH_IDS
+from ...utils.singleflight import SingleFlight
+
+# Max IDs per sp.albums call
+ALBUMS_BATCH_LIMIT = 20
 
 
 class AlbumCommands:
     def __init__(self, spotify_manager):
         self.spotify_manager = spotify_manager
-        self.album_cache = {}
+        self.album_cache = spotify_manager.cache.namespace("album")
+        self._inflight = SingleFlight()
 
     def _validate_album_id(self, album_id):
         """Centralized input validation"""
@@ -28,25 +34,67 @@ class AlbumCommands:
     def check_album(self, album_id=None):
         """Check if album exists and return album object"""
         def operation(album_id):
-            if album_id in self.album_cache:
-                return self.album_cache[album_id]
+            album_obj = self.album_cache.get(album_id)
+            if album_obj is not None and album_obj.data is not None:
+                return album_obj
 
-            album_obj = Album(self.spotify_manager, album_id)
-            self.album_cache[album_id] = album_obj
-            return album_obj
+            # Concurrent misses for the same album share one upstream fetch
+            return self._inflight.do(album_id, lambda: self._load_album(album_id))
 
         return self._handle_album_operation(album_id, operation)
 
+    def _load_album(self, album_id):
+        album_obj = self.album_cache.get(album_id)
+        if album_obj is None:
+            # Another worker may already have fetched it
+            data = self.spotify_manager.catalog_cache.get("album", album_id)
+            album_obj = Album(self.spotify_manager, album_id, data=data)
+        album_obj.get_album()
+        return self.album_cache.set(album_id, album_obj)
+
+    def _validate_album_ids(self, album_ids):
+        """Validation for batch requests: a non-empty list of IDs"""
+        if not isinstance(album_ids, list) or not album_ids:
+            raise BadRequestError("A non-empty list of album IDs is required")
+        if len(album_ids) > MAX_BATCH_IDS:
+            raise BadRequestError(f"At most {MAX_BATCH_IDS} album IDs per request")
+        return [self._validate_album_id(album_id) for album_id in album_ids]
+
+    def check_albums(self, album_ids=None):
+        """
+        Album objects for many IDs. Cached IDs are served from the caches;
+        misses are fetched with sp.albums (20 per call), chunks in parallel.
+        Returns (dict of id -> Album, list of IDs not found on Spotify).
+        """
+        album_ids = self._validate_album_ids(album_ids)
+        try:
+            return resolve_batch(
+                album_ids, "album", self.album_cache, self.spotify_manager,
+                build=lambda album_id, data: Album(self.spotify_manager, album_id, data=data),
+                fetch_chunk=lambda chunk: self.spotify_manager.sp.albums(chunk)["albums"],
+                chunk_size=ALBUMS_BATCH_LIMIT,
+            )
+        except SpotifyException as e:
+            raise map_spotify_error(e, "album")
+        except APIError:
+            raise
+        except Exception as e:
+            raise AlbumOperationError(
+                f"Unexpected error in batch album operation: {str(e)}")
+
     def check_exists(self, album_id=None):
         """Check if album exists without full initialization"""
         def operation(album_id):
-            if album_id in self.album_cache:
+            if self.album_cache.get(album_id) is not None:
                 return True
 
             try:
-                data = self.spotify_manager.sp.album(album_id)
+                data = self.spotify_manager.catalog_cache.get("album", album_id)
+                if data is None:
+                    data = self.spotify_manager.sp.album(album_id)
+                    self.spotify_manager.catalog_cache.set("album", album_id, data)
                 album_obj = Album(self.spotify_manager, album_id, data=data)
-                self.album_cache[album_id] = album_obj
+                self.album_cache.set(album_id, album_obj)
                 return True
             except SpotifyException as e:
 
@@ -56,10 +104,21 @@ class AlbumCommands:
 
         return self._handle_album_operation(album_id, operation)
 
+    def get_album_info_batch(self, album_ids=None, raw=False):
+        """Album info for many albums in as few upstream calls as possible"""
+        albums, not_found = self.check_albums(album_ids)
+        data = [album.get_album() if raw else album.get_album_info()
+                for album in albums.values()]
+        return {"albums": data, "not_found": not_found}
+
     def get_album_track_list(self, album_id=None, positions=False):
         """Get album tracks"""
         def operation(album_id):
             album_obj = self.check_album(album_id)
+            if album_obj.tracks is None:
+                # Concurrent requests for a large album share one page crawl
+                self._inflight.do(("tracks", album_id),
+                                  album_obj.get_album_tracks)
             return album_obj.get_album_tracks(positions)
 
         return self._handle_album_operation(album_id, operation)
@@ -105,6 +164,7 @@ class AlbumCommands:
         if album_id:
             album_id = self._validate_album_id(album_id)
             self.album_cache.pop(album_id, None)
+            self.spotify_manager.catalog_cache.delete("album", album_id)
             return f"Cache cleared for album {album_id}"
         else:
             self.album_cache.clear()
@@ -113,3 +173,7 @@ class AlbumCommands:
     def get_cached_albums_count(self):
         """Get number of albums in cache"""
         return len(self.album_cache)
+
+    def get_cache_stats(self):
+        """Hit/miss/eviction counters for the album cache"""
+        return self.album_cache.stats()
@@ -1,12 +1,18 @@
 from ..models.artist import Artist
 from ..models.search import Search
 from ...utils.errors import *
+from ...utils.batching import resolve_batch, MAX_BATCH_IDS
+from ...utils.singleflight import SingleFlight
+
+# Max IDs per sp.artists call
+ARTISTS_BATCH_LIMIT = 50
 
 
 class ArtistCommands:
     def __init__(self, spotify_manager):
         self.spotify_manager = spotify_manager
-        self.artist_cache = {}
+        self.artist_cache = spotify_manager.cache.namespace("artist")
+        self._inflight = SingleFlight()
         self.search_obj = None
 
     def _validate_artist_id(self, artist_id):
@@ -31,24 +37,68 @@ class ArtistCommands:
     def check_artist(self, artist_id=None):
         """Check if artist exists and return artist object"""
         def operation(artist_id):
-            if artist_id in self.artist_cache:
-                return self.artist_cache[artist_id]
+            artist_obj = self.artist_cache.get(artist_id)
+            if artist_obj is not None and artist_obj.data is not None:
+                return artist_obj
 
-            artist_obj = Artist(self.spotify_manager, artist_id=artist_id)
-            self.artist_cache[artist_id] = artist_obj
-            return artist_obj
+            # Concurrent misses for the same artist share one upstream fetch
+            return self._inflight.do(artist_id, lambda: self._load_artist(artist_id))
 
         return self._handle_artist_operation(artist_id, operation)
 
+    def _load_artist(self, artist_id):
+        artist_obj = self.artist_cache.get(artist_id)
+        if artist_obj is None:
+            # Another worker may already have fetched it
+            data = self.spotify_manager.catalog_cache.get("artist", artist_id)
+            artist_obj = Artist(self.spotify_manager,
+                                artist_id=artist_id, data=data)
+        artist_obj.get_artist()
+        return self.artist_cache.set(artist_id, artist_obj)
+
+    def _validate_artist_ids(self, artist_ids):
+        """Validation for batch requests: a non-empty list of IDs"""
+        if not isinstance(artist_ids, list) or not artist_ids:
+            raise BadRequestError("A non-empty list of artist IDs is required")
+        if len(artist_ids) > MAX_BATCH_IDS:
+            raise BadRequestError(f"At most {MAX_BATCH_IDS} artist IDs per request")
+        return [self._validate_artist_id(artist_id) for artist_id in artist_ids]
+
+    def check_artists(self, artist_ids=None):
+        """
+        Artist objects for many IDs. Cached IDs are served from the caches;
+        misses are fetched with sp.artists (50 per call), chunks in parallel.
+        Returns (dict of id -> Artist, list of IDs not found on Spotify).
+        """
+        artist_ids = self._validate_artist_ids(artist_ids)
+        try:
+            return resolve_batch(
+                artist_ids, "artist", self.artist_cache, self.spotify_manager,
+                build=lambda artist_id, data: Artist(self.spotify_manager, artist_id, data=data),
+                fetch_chunk=lambda chunk: self.spotify_manager.sp.artists(chunk)["artists"],
+                chunk_size=ARTISTS_BATCH_LIMIT,
+            )
+        except SpotifyException as e:
+            raise map_spotify_error(e, "artist")
+        except APIError:
+            raise
+        except Exception as e:
+            raise ArtistOperationError(
+                f"Unexpected error in batch artist operation: {str(e)}")
+
     def check_exists(self, artist_id=None):
         """Check if artist exists without full initialization"""
         def operation(artist_id):
-            if artist_id in self.artist_cache:
+            if self.artist_cache.get(artist_id) is not None:
                 return True
             try:
-                data = self.spotify_manager.sp.artist(artist_id)
+                data = self.spotify_manager.catalog_cache.get("artist", artist_id)
+                if data is None:
+                    data = self.spotify_manager.sp.artist(artist_id)
+                    self.spotify_manager.catalog_cache.set(
+                        "artist", artist_id, data)
                 artist_obj = Artist(self.spotify_manager, artist_id, data=data)
-                self.artist_cache[artist_id] = artist_obj
+                self.artist_cache.set(artist_id, artist_obj)
                 return True
             except SpotifyException as e:
                 if e.http_status in (400, 404):
@@ -64,6 +114,13 @@ class ArtistCommands:
 
         return self._handle_artist_operation(artist_id, operation)
 
+    def get_artist_info_batch(self, artist_ids=None, raw=False):
+        """Artist info for many artists in as few upstream calls as possible"""
+        artists, not_found = self.check_artists(artist_ids)
+        data = [artist.get_artist() if raw else artist.get_artist_info()
+                for artist in artists.values()]
+        return {"artists": data, "not_found": not_found}
+
     def top_tracks(self, artist_id=None, country="US", raw=False):
         """Get artist's top tracks"""
         def operation(artist_id):
@@ -120,6 +177,7 @@ class ArtistCommands:
         if artist_id:
             artist_id = self._validate_artist_id(artist_id)
             self.artist_cache.pop(artist_id, None)
+            self.spotify_manager.catalog_cache.delete("artist", artist_id)
             return f"Cache cleared for artist {artist_id}"
         else:
             self.artist_cache.clear()
@@ -128,3 +186,7 @@ class ArtistCommands:
     def get_cached_artists_count(self):
         """Get number of artists in cache"""
         return len(self.artist_cache)
+
+    def get_cache_stats(self):
+        """Hit/miss/eviction counters for the artist cache"""
+        return self.artist_cache.stats()
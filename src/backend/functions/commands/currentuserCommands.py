@@ -1,14 +1,32 @@
 from ..models.currentuser import CurrentUser
 from ...utils.errors import *
 from ...utils.utils import missing_file_url
+from ...utils.context import in_caller_context
+from ..usersessions import active_context
 import spotipy
+from concurrent.futures import ThreadPoolExecutor
 
 
 
 class CurrentUserCommands:
     def __init__(self, spotify_manager):
         self.spotify_manager = spotify_manager
-        self.current_user = None
+        # CurrentUser when no browser session is active (scripts, CLI)
+        self._current_user = None
+
+    @property
+    def current_user(self):
+        """CurrentUser of the session making this request"""
+        context = active_context()
+        return self._current_user if context is None else context.current_user
+
+    @current_user.setter
+    def current_user(self, user):
+        context = active_context()
+        if context is None:
+            self._current_user = user
+        else:
+            context.current_user = user
 
     def _get_or_restore_current_user(self):
         """Return current_user; attempt to restore from Redis if None"""
@@ -16,28 +34,11 @@ class CurrentUserCommands:
             return self.current_user
 
         try:
-            # Scan Redis for user refresh tokens
-            user_keys = self.spotify_manager.redis_client.keys("spotify_user:*")
-            if not user_keys:
+            # Logged-in user and their token, by direct key
+            user_id = self.spotify_manager.restore_user()
+            if not user_id:
                 return None  # No user logged in
 
-            # For simplicity, restore the first user found
-            user_key = user_keys[0]
-            user_id = user_key.split(":")[1]
-
-            refresh_token = self.spotify_manager.redis_client.get(user_key)
-            if not refresh_token:
-                return None
-
-            # Refresh access token
-            token_info = self.spotify_manager.sp_oauth.refresh_access_token(refresh_token)
-            access_token = token_info["access_token"]
-
-            if self.spotify_manager.sp:
-                self.spotify_manager.sp.__del__()
-            self.spotify_manager.sp = spotipy.Spotify(auth=access_token)
-            self.spotify_manager.current_user_id = user_id
-
             # Create CurrentUser object
             from ..models.currentuser import CurrentUser
             self.current_user = CurrentUser(self.spotify_manager)
@@ -359,13 +360,16 @@ class CurrentUserCommands:
         def operation():
             if not self.current_user:
                 raise UnauthorizedError("You must login first")
-            playlists = self.current_user.get_user_playlists()
-            albums = self.current_user.get_user_albums()
-            tracks = self.current_user.get_user_tracks()
-            artists = self.current_user.get_user_artists()
-            data = {"playlists": playlists,
-                    "albums": albums,
-                    "tracks": tracks,
-                    "artists": artists}
+            collections = {"playlists": self.current_user.get_user_playlists,
+                           "albums": self.current_user.get_user_albums,
+                           "tracks": self.current_user.get_user_tracks,
+                           "artists": self.current_user.get_user_artists}
+            # The four crawls are independent, so the library takes as long
+            # as its largest collection rather than the sum of all four
+            with ThreadPoolExecutor(max_workers=len(collections)) as pool:
+                futures = {name: pool.submit(in_caller_context(fetch))
+                           for name, fetch in collections.items()}
+                data = {name: future.result()
+                        for name, future in futures.items()}
             return data
         return self._handle_currentuser_operation(operation)
@@ -1,11 +1,42 @@
 from ..models.playlist import Playlist
 from ...utils.errors import *
+from ...utils.context import in_caller_context
+from ...utils.scheduler import lane, BACKGROUND
+from ...utils.singleflight import SingleFlight
+from ...utils.sync import plan_sync
+from ...utils.track_index import build_positions, build_artist_index, ReverseTrackIndex
+from ...utils.setexpr import parse_set_expression, referenced_playlists, evaluate_set_expression
+from concurrent.futures import ThreadPoolExecutor
+import os
+import time
 
 
 class PlaylistCommands:
     def __init__(self, spotify_manager):
         self.spotify_manager = spotify_manager
-        self.playlist_cache = {}
+        # Every playlist namespace is keyed by (user_id, playlist_id), see _scoped
+        self.playlist_cache = spotify_manager.cache.namespace("playlist")
+        # -> (snapshot_id, raw track items for that snapshot)
+        self.playlist_tracks_cache = spotify_manager.cache.namespace(
+            "playlist_tracks")
+        # -> (snapshot_id, {track_id: [positions]} or None if only the Redis
+        # index in spotify_manager.track_index has them, time the snapshot
+        # was checked or 0)
+        self.playlist_index_cache = spotify_manager.cache.namespace(
+            "playlist_index")
+        # -> (snapshot_id, artist index, time the snapshot was checked)
+        self.playlist_artists_cache = spotify_manager.cache.namespace(
+            "playlist_artists")
+        # Seconds a checked snapshot_id is trusted before asking Spotify again
+        self.snapshot_max_age = float(
+            os.getenv("PLAYLIST_SNAPSHOT_MAX_AGE", 30))
+        # user_id -> ReverseTrackIndex over that user's playlists
+        self.reverse_index_cache = spotify_manager.cache.namespace(
+            "reverse_index")
+        # user_id -> that user's playlist listing, for get_track_locations
+        self.playlist_listing_cache = spotify_manager.cache.namespace(
+            "playlist_listing")
+        self._inflight = SingleFlight()
 
     # ---------- Validation ----------
     def _validate_playlist_id(self, playlist_id):
@@ -20,31 +51,65 @@ class PlaylistCommands:
             return operation(playlist_id)
         except SpotifyException as e:
             raise map_spotify_error(e, "playlist", playlist_id)
+        except APIError:
+            raise
         except Exception as e:
             raise PlaylistOperationError(
                 f"Unexpected error in playlist operation: {str(e)}"
             )
 
+    def _handle_playlist_write(self, playlist_id, operation):
+        """
+        _handle_playlist_operation for edits: the playlist's snapshot checks
+        are expired afterwards (even after a partial write), so the
+        snapshot_max_age window never serves what was there before
+        """
+        try:
+            return self._handle_playlist_operation(playlist_id, operation)
+        finally:
+            key = self._scoped(playlist_id)
+            self.playlist_index_cache.pop(key)
+            self.playlist_artists_cache.pop(key)
+
+    # ---------- Cache Scoping ----------
+    def _scoped(self, playlist_id):
+        """
+        Cache key of playlist_id for the user making the request. Playlists
+        can be private, so what one user loaded is never served to another;
+        requests outside a session (public client) share the None scope.
+        """
+        return (self.spotify_manager.current_user_id, playlist_id)
+
     # ---------- Playlist Management ----------
     def check_playlist(self, playlist_id):
         def operation(playlist_id):
-            if playlist_id in self.playlist_cache:
-                return self.playlist_cache[playlist_id]
-            playlist_obj = Playlist(
-                self.spotify_manager, playlist_id=playlist_id)
-            self.playlist_cache[playlist_id] = playlist_obj
-            return playlist_obj
+            key = self._scoped(playlist_id)
+            playlist_obj = self.playlist_cache.get(key)
+            if playlist_obj is not None and playlist_obj.data is not None:
+                return playlist_obj
+            # Concurrent misses for the same playlist share one upstream fetch
+            return self._inflight.do(("playlist", key),
+                                     lambda: self._load_playlist(key))
         return self._handle_playlist_operation(playlist_id, operation)
 
+    def _load_playlist(self, key):
+        playlist_obj = self.playlist_cache.get(key)
+        if playlist_obj is None:
+            playlist_obj = Playlist(
+                self.spotify_manager, playlist_id=key[1])
+        playlist_obj.get_playlist()
+        return self.playlist_cache.set(key, playlist_obj)
+
     def check_exists(self, playlist_id):
         def operation(playlist_id):
-            if playlist_id in self.playlist_cache:
+            key = self._scoped(playlist_id)
+            if self.playlist_cache.get(key) is not None:
                 return True
             try:
                 data = self.spotify_manager.sp.playlist(playlist_id)
                 playlist_obj = Playlist(
                     self.spotify_manager, playlist_id, data=data)
-                self.playlist_cache[playlist_id] = playlist_obj
+                self.playlist_cache.set(key, playlist_obj)
                 return True
             except SpotifyException as e:
                 if e.http_status in (400, 404):
@@ -57,6 +122,46 @@ class PlaylistCommands:
             return self.check_playlist(playlist_id)
         return self._handle_playlist_operation(playlist_id, operation)
 
+    def _get_playlist_track_items(self, playlist, meta=None):
+        """
+        Raw track items for the playlist's current snapshot. Costs one small
+        metadata request when cached; the full page crawl only runs after the
+        playlist changed. Pass meta if the caller already looked the snapshot up.
+        """
+        if meta is None:
+            meta = self._get_playlist_snapshot(playlist)
+        cached = self._get_cached_track_items(
+            playlist.playlist_id, meta["snapshot_id"])
+        if cached is not None:
+            return cached
+
+        # Concurrent loads of the same snapshot share one page crawl
+        return self._inflight.do(
+            ("tracks", self._scoped(playlist.playlist_id), meta["snapshot_id"]),
+            lambda: self._crawl_track_items(playlist, meta))
+
+    def _get_playlist_snapshot(self, playlist):
+        """Callers arriving while a snapshot check is in flight share its answer"""
+        return self._inflight.do(("snapshot", self._scoped(playlist.playlist_id)),
+                                 playlist.get_playlist_snapshot)
+
+    def _crawl_track_items(self, playlist, meta):
+        cached = self._get_cached_track_items(
+            playlist.playlist_id, meta["snapshot_id"])
+        if cached is not None:
+            return cached
+        items = playlist.get_playlist_tracks(meta["tracks"]["total"])
+        # Replaces any older snapshot of this playlist, which can never match again
+        self.playlist_tracks_cache.set(
+            self._scoped(playlist.playlist_id), (meta["snapshot_id"], items))
+        return items
+
+    def _get_cached_track_items(self, playlist_id, snapshot_id):
+        cached = self.playlist_tracks_cache.get(self._scoped(playlist_id))
+        if cached is not None and cached[0] == snapshot_id:
+            return cached[1]
+        return None
+
     # ---------- Track Operations ----------
     def get_playlist_info(self, playlist_id, raw):
         def operation(playlist_id):
@@ -80,41 +185,243 @@ class PlaylistCommands:
         return self._handle_playlist_operation(playlist_id, operation)
 
     def get_playlist_track_ids(self, playlist_id):
+        """
+        Track IDs of the playlist, by position. Served from the cached track
+        list when it is current, otherwise fetched with an ID-only projection
+        (no full playlist load).
+        """
         def operation(playlist_id):
-            playlist = self.check_playlist(playlist_id)
-            return playlist.get_playlist_track_ids(playlist.get_playlist_length())
+            playlist = self._get_playlist_stub(playlist_id)
+            meta = self._get_playlist_snapshot(playlist)
+            return self._get_track_ids(playlist, meta)
+        return self._handle_playlist_operation(playlist_id, operation)
+
+    def _get_playlist_stub(self, playlist_id):
+        """Cached Playlist object, without loading its full metadata"""
+        key = self._scoped(playlist_id)
+        playlist = self.playlist_cache.get(key)
+        if playlist is None:
+            playlist = self.playlist_cache.set(
+                key, Playlist(self.spotify_manager, playlist_id=playlist_id))
+        return playlist
+
+    def _get_track_ids(self, playlist, meta):
+        cached = self._get_cached_track_items(
+            playlist.playlist_id, meta["snapshot_id"])
+        if cached is not None:
+            return [(item["track"] or {}).get("id") for item in cached]
+        return self._inflight.do(
+            ("track_ids", self._scoped(playlist.playlist_id), meta["snapshot_id"]),
+            lambda: playlist.fetch_track_ids(meta["tracks"]["total"]))
+
+    def get_track_positions(self, playlist_id, track_ids):
+        """
+        Where each of track_ids sits in the playlist: {track_id: [0-based
+        positions]}, empty if absent. Answered from the track index for the
+        current snapshot (in-process, then Redis); only a changed playlist
+        is fetched again to rebuild it. Like _get_artist_index, a snapshot
+        checked within snapshot_max_age is trusted without a request.
+
+        Returns:
+            (snapshot_id, positions dict)
+        """
+        def operation(playlist_id):
+            key = self._scoped(playlist_id)
+            playlist = self._get_playlist_stub(playlist_id)
+            local = self.playlist_index_cache.get(key)
+            meta = None
+            if local is None or time.monotonic() - local[2] >= self.snapshot_max_age:
+                meta = self._get_playlist_snapshot(playlist)
+                if local is None or not meta["snapshot_id"] or local[0] != meta["snapshot_id"]:
+                    local = (meta["snapshot_id"], None)
+                local = self.playlist_index_cache.set(
+                    key, (local[0], local[1], time.monotonic()))
+            snapshot_id, positions = local[0], local[1]
+
+            if positions is None:
+                # Shared by all users, but only reachable with a snapshot_id
+                # the caller's own client read
+                found = self.spotify_manager.track_index.lookup(
+                    playlist_id, snapshot_id, track_ids)
+                if found is not None:
+                    return snapshot_id, found
+                if meta is None:
+                    # Checked recently, but Redis no longer has the index
+                    meta = self._get_playlist_snapshot(playlist)
+                    snapshot_id = meta["snapshot_id"]
+                positions = self._inflight.do(
+                    ("index", key, snapshot_id),
+                    lambda: self._build_track_index(playlist, meta, time.monotonic()))[1]
+            return snapshot_id, {t: positions.get(t, []) for t in track_ids}
         return self._handle_playlist_operation(playlist_id, operation)
 
+    def get_track_index(self, playlist_id, snapshot_id, length):
+        """
+        Complete {track_id: positions} index of one playlist at a snapshot
+        already known to the caller (e.g. from a playlist listing), so no
+        metadata lookup is needed.
+        """
+        def operation(playlist_id):
+            key = self._scoped(playlist_id)
+            local = self.playlist_index_cache.get(key)
+            if (local is not None and local[1] is not None
+                    and snapshot_id and local[0] == snapshot_id):
+                return local[1]
+            positions = self.spotify_manager.track_index.load(
+                playlist_id, snapshot_id)
+            if positions is not None:
+                # A listing's snapshot_id does not count as a fresh check
+                return self.playlist_index_cache.set(
+                    key, (snapshot_id, positions, 0))[1]
+            meta = {"snapshot_id": snapshot_id, "tracks": {"total": length}}
+            return self._inflight.do(
+                ("index", key, snapshot_id),
+                lambda: self._build_track_index(self._get_playlist_stub(playlist_id), meta))[1]
+        return self._handle_playlist_operation(playlist_id, operation)
+
+    def get_playlist_listing(self, user_id, fetch):
+        """
+        The user's playlist listing as fetch() returns it, reused for
+        CACHE_TTL_PLAYLIST_LISTING seconds so back-to-back track lookups do
+        not re-crawl every page of it.
+        """
+        listing = self.playlist_listing_cache.get(user_id)
+        if listing is None:
+            listing = self._inflight.do(
+                ("listing", user_id),
+                lambda: self.playlist_listing_cache.set(user_id, fetch()))
+        return listing
+
+    def get_track_locations(self, user_id, playlists, track_id):
+        """
+        Which of the user's playlists contain track_id, and where.
+
+        playlists: the user's playlist listing (dicts with "id",
+        "snapshot_id" and "length", as CurrentUser.get_user_playlists returns)
+        Only playlists whose snapshot changed since the last call are read
+        again, concurrently. A playlist Spotify refuses to list (403/404) is
+        left out and reported instead of failing the lookup.
+
+        Returns:
+            (dict of playlist_id -> positions, number of playlists re-indexed,
+             dict of playlist_id -> reason for each playlist left out)
+        """
+        listing = {p["id"]: p for p in playlists if p.get("id")}
+
+        def refresh():
+            index = self.reverse_index_cache.get(user_id)
+            if index is None:
+                index = ReverseTrackIndex()
+            index.retain(listing)
+            stale = [p for pid, p in listing.items()
+                     if not p.get("snapshot_id") or index.snapshot(pid) != p["snapshot_id"]]
+
+            def reindex(p):
+                # A library-wide crawl must not hold up interactive requests
+                with lane(BACKGROUND):
+                    try:
+                        positions = self.get_track_index(
+                            p["id"], p.get("snapshot_id"), p.get("length", 0))
+                    except (ForbiddenError, NotFoundError) as e:
+                        index.fail(p["id"], p.get("snapshot_id"), e.message)
+                        return
+                index.update(p["id"], p.get("snapshot_id"), positions)
+
+            workers = max(1, min(len(stale), self.spotify_manager.page_workers))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(in_caller_context(reindex), stale))
+            # Stored again so its size and TTL follow the refresh
+            self.reverse_index_cache.set(user_id, index)
+            return index, len(stale)
+
+        index, refreshed = self._inflight.do(("locations", user_id), refresh)
+        return index.locations(track_id), refreshed, index.failures()
+
+    def _build_track_index(self, playlist, meta, checked_at=0):
+        positions = build_positions(self._get_track_ids(playlist, meta))
+        self.spotify_manager.track_index.store(
+            playlist.playlist_id, meta["snapshot_id"], positions)
+        return self.playlist_index_cache.set(
+            self._scoped(playlist.playlist_id),
+            (meta["snapshot_id"], positions, checked_at))
+
+    def _get_first_track_items(self, playlist, limit):
+        """
+        The first `limit` raw track items. Served from the cached track list
+        if it holds the current snapshot; otherwise only those pages are read,
+        and not cached, since a partial list must never stand for a snapshot.
+        """
+        if self.playlist_tracks_cache.get(self._scoped(playlist.playlist_id)) is None:
+            # Nothing cached to validate, so skip the snapshot lookup
+            total = playlist.get_playlist_length()
+        else:
+            meta = self._get_playlist_snapshot(playlist)
+            cached = self._get_cached_track_items(
+                playlist.playlist_id, meta["snapshot_id"])
+            if cached is not None:
+                return cached[:limit]
+            total = meta["tracks"]["total"]
+        return playlist.get_playlist_tracks(min(limit, total))
+
     def get_playlist_tracks(self, playlist_id, limit=None, raw=False):
         def operation(playlist_id):
             playlist = self.check_playlist(playlist_id)
-            if not limit:
-                total = playlist.get_playlist_length()
-            elif limit > playlist.get_playlist_length():
-                total = playlist.get_playlist_length()
+            if limit:
+                items = self._get_first_track_items(playlist, limit)
             else:
-                total = limit
+                items = self._get_playlist_track_items(playlist)
             if raw:
-                return playlist.get_playlist_tracks(total)
+                return items
             else:
-                data = playlist.get_playlist_tracks_info(total)
+                data = playlist.format_playlist_tracks(items)
             return data
         return self._handle_playlist_operation(playlist_id, operation)
 
-    def move_tracks(self, playlist_id, from_positions, to_position):
+    def stream_playlist_tracks(self, playlist_id, limit=None, raw=False):
+        """Return a generator of tracks; only the metadata lookup happens up front"""
         def operation(playlist_id):
             playlist = self.check_playlist(playlist_id)
-            return playlist.move_tracks(from_positions, to_position)
+            meta = self._get_playlist_snapshot(playlist)
+            length = meta["tracks"]["total"]
+            total = min(limit, length) if limit else length
 
+            cached = self._get_cached_track_items(
+                playlist_id, meta["snapshot_id"])
+            if cached is not None:
+                items = iter(cached[:total])
+            else:
+                items = playlist.iter_playlist_tracks(total)
+            if raw:
+                return items
+            return playlist.iter_formatted_tracks(items)
         return self._handle_playlist_operation(playlist_id, operation)
 
+    def move_tracks(self, playlist_id, from_positions, to_position):
+        def operation(playlist_id):
+            playlist = self.check_playlist(playlist_id)
+            meta = self._get_playlist_snapshot(playlist)
+            cached = self._get_cached_track_items(
+                playlist_id, meta["snapshot_id"])
+
+            result = playlist.move_tracks(
+                from_positions, to_position, snapshot_id=meta["snapshot_id"])
+            order = result.pop("order")
+            if cached is not None and result["executed"] == result["planned"]:
+                # Apply the same reorder locally instead of re-crawling the playlist
+                self.playlist_tracks_cache.set(
+                    self._scoped(playlist_id),
+                    (result["snapshot_id"], [cached[i] for i in order]))
+            return result
+
+        return self._handle_playlist_write(playlist_id, operation)
+
     def replace_track_exchange(self, playlist_id, track_R_id, track_A_id, position):
         def operation(playlist_id):
             playlist = self.check_playlist(playlist_id)
             if playlist.remove_specific_track(track_R_id, position):
                 return playlist.add_specific_track(track_A_id, position)
             return False
-        return self._handle_playlist_operation(playlist_id, operation)
+        return self._handle_playlist_write(playlist_id, operation)
 
     def upload_playlist_cover(self, playlist_id, image_b64):
         """Upload playlist cover image (Base64)"""
@@ -123,43 +430,93 @@ class PlaylistCommands:
             return playlist.upload_cover_image_raw(image_b64)
         return self._handle_playlist_operation(playlist_id, operation)
 
-    # ---------- Playlist Set Operations ----------
-    def intersect_playlists(self, p1_tracks, p2_tracks, p3_id):
-        ids1 = set(p1_tracks)
-        ids2 = set(p2_tracks)
-        shared_ids = ids1 & ids2
+    def sync_playlist(self, playlist_id, track_ids, dry_run=False):
+        """
+        Make the playlist contain exactly track_ids, in order, with the fewest
+        calls plan_sync finds. With dry_run the plan is returned unexecuted.
+        """
+        def operation(playlist_id):
+            playlist = self.check_playlist(playlist_id)
+            # One lookup for both: the plan's positions are only valid for
+            # the snapshot the items were read at
+            meta = self._get_playlist_snapshot(playlist)
+            items = self._get_playlist_track_items(playlist, meta)
+            snapshot_id = meta["snapshot_id"]
+            tracks = [item["track"] or {} for item in items]
+            current = [track.get("id") for track in tracks]
+            plan = plan_sync(current, track_ids)
+            if dry_run:
+                return {"plan": plan}
 
+            uris = [track.get("uri") or f"spotify:track:{track.get('id')}"
+                    for track in tracks]
+            result = playlist.sync_tracks(
+                plan["steps"], uris, snapshot_id=snapshot_id)
+            if "error" in result:
+                raise PlaylistOperationError(
+                    f"Sync stopped after {result['executed']} of {plan['calls']} calls: {result['error']}",
+                    payload={"plan": plan, **result})
+            return {"plan": plan, **result}
+        return self._handle_playlist_write(playlist_id, operation)
+
+    # ---------- Playlist Set Operations ----------
+    def _write_tracks(self, p3_id, track_ids):
+        """Append track_ids to p3 in order; raises with the progress if a chunk fails"""
         def operation(p3_id):
             playlist = self.check_playlist(p3_id)
-            playlist.add_tracks(list(shared_ids))
-            return list(shared_ids)
-        result = self._handle_playlist_operation(p3_id, operation)
+            result = playlist.append_tracks(track_ids)
+            if "error" in result:
+                raise PlaylistOperationError(
+                    f"Wrote {result['written']} of {len(track_ids)} tracks before failing: {result['error']}",
+                    payload=result)
+            return dict(result, tracks=track_ids)
+        return self._handle_playlist_write(p3_id, operation)
+
+    def combine_playlists(self, expression, target_id=None):
+        """
+        Evaluate a set expression over playlists, e.g. "(A | B | C) - D & E"
+        (see utils.setexpr), and append the result to target_id if given.
+        Every referenced playlist is fetched concurrently, IDs only.
+        """
+        try:
+            tree = parse_set_expression(expression)
+        except ValueError as e:
+            raise BadRequestError(f"Invalid playlist expression: {e}")
+        playlist_ids = referenced_playlists(tree)
+
+        workers = max(1, min(len(playlist_ids), self.spotify_manager.page_workers))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            track_ids = dict(zip(playlist_ids, pool.map(
+                in_caller_context(self.get_playlist_track_ids), playlist_ids)))
+
+        tracks = evaluate_set_expression(tree, track_ids)
+        result = {"sources": {pid: len(ids) for pid, ids in track_ids.items()},
+                  "tracks": tracks}
+        if target_id:
+            result.update(self._write_tracks(target_id, tracks))
         return result
 
-    def union_playlists(self, p1_tracks, p2_tracks, p3_id):
-        ids1 = set(p1_tracks)
+    @staticmethod
+    def _unique_ids(track_ids):
+        """Track IDs in order without repeats; local files (no ID) cannot be added"""
+        return dict.fromkeys(t for t in track_ids if t)
+
+    def intersect_playlists(self, p1_tracks, p2_tracks, p3_id):
+        """Add to p3 the tracks in both p1 and p2, in p1 order"""
         ids2 = set(p2_tracks)
-        shared_ids = ids1 | ids2
+        shared_ids = [t for t in self._unique_ids(p1_tracks) if t in ids2]
+        return self._write_tracks(p3_id, shared_ids)
 
-        def operation(p3_id):
-            playlist = self.check_playlist(p3_id)
-            playlist.add_tracks(list(shared_ids))
-            return list(shared_ids)
-        result = self._handle_playlist_operation(p3_id, operation)
-        return result
+    def union_playlists(self, p1_tracks, p2_tracks, p3_id):
+        """Add to p3 every track of p1, then the tracks only in p2"""
+        shared_ids = list(self._unique_ids(list(p1_tracks) + list(p2_tracks)))
+        return self._write_tracks(p3_id, shared_ids)
 
     def differentiate_playlists(self, p1_tracks, p2_tracks, p3_id):
         """Add to p3 the tracks in p1 but not in p2"""
-        ids1 = set(p1_tracks)
         ids2 = set(p2_tracks)
-        shared_ids = ids1 - ids2
-
-        def operation(p3_id):
-            playlist = self.check_playlist(p3_id)
-            playlist.add_tracks(list(shared_ids))
-            return list(shared_ids)
-        result = self._handle_playlist_operation(p3_id, operation)
-        return result
+        shared_ids = [t for t in self._unique_ids(p1_tracks) if t not in ids2]
+        return self._write_tracks(p3_id, shared_ids)
 
     def add_tracks(self, playlist_id, track_id, position=None):
         def operation(playlist_id):
@@ -169,43 +526,76 @@ class PlaylistCommands:
                 return playlist.add_specific_tracks(track_id=track_id, position=position-1)
             else:
                 return playlist.add_tracks(track_ids=track_id)
-        return self._handle_playlist_operation(playlist_id, operation)
+        return self._handle_playlist_write(playlist_id, operation)
+
+    def _get_artist_index(self, playlist_id):
+        """
+        Artist index of the playlist's current snapshot (see
+        build_artist_index). Within snapshot_max_age of the last check it is
+        served without any request; after that one metadata lookup decides
+        whether the tracks have to be read again.
+        """
+        key = self._scoped(playlist_id)
+        cached = self.playlist_artists_cache.get(key)
+        if cached is not None and time.monotonic() - cached[2] < self.snapshot_max_age:
+            return cached[1]
+
+        playlist = self._get_playlist_stub(playlist_id)
+        meta = self._get_playlist_snapshot(playlist)
+        snapshot_id = meta["snapshot_id"]
+        if cached is not None and cached[0] == snapshot_id:
+            index = cached[1]
+        else:
+            index = self._inflight.do(
+                ("artists", key, snapshot_id),
+                lambda: build_artist_index(self._crawl_track_items(playlist, meta)))
+        self.playlist_artists_cache.set(
+            key, (snapshot_id, index, time.monotonic()))
+        return index
 
     def get_artist_tracks_on_playlists(self, playlist_id, artists):
         def operation(playlist_id):
-            playlist = self.check_playlist(playlist_id)
-            total = playlist.get_playlist_length()
+            index = self._get_artist_index(playlist_id)
             # Map artist_id -> {artist_name: [(track_name, track_id), ...]}
-            artist_set = {artist_id: {} for artist_id in artists}
-
-            track_data = playlist.get_playlist_tracks_info(total)
-            for track in track_data:
-
-                track_name = track.get("name")
-                track_id = track.get("id")
-
-                for artist in track.get("artist_data", []):
-                    artist_id = artist.get("id")
-                    artist_name = artist.get("name")
-                    if artist_id in artist_set:
-                        if artist_name not in artist_set[artist_id]:
-                            artist_set[artist_id][artist_name] = []
-                        artist_set[artist_id][artist_name].append(
-                            (track_name, track_id))
-
-            return artist_set
+            return {artist_id: index.get(artist_id, {}) for artist_id in artists}
         return self._handle_playlist_operation(playlist_id, operation)
 
+    def get_artist_tracks_on_many_playlists(self, playlist_ids, artists):
+        """get_artist_tracks_on_playlists for several playlists, queried concurrently"""
+        playlist_ids = list(dict.fromkeys(playlist_ids))
+        if not playlist_ids:
+            raise BadRequestError("At least one playlist ID is required")
+        workers = min(len(playlist_ids), self.spotify_manager.page_workers)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(
+                in_caller_context(
+                    lambda pid: self.get_artist_tracks_on_playlists(pid, artists)),
+                playlist_ids)
+            return dict(zip(playlist_ids, results))
+
     # ---------- Cache Management ----------
 
     def clear_cache(self, playlist_id=None):
         if playlist_id:
             playlist_id = self._validate_playlist_id(playlist_id)
-            self.playlist_cache.pop(playlist_id, None)
+            # Every user's copy of the playlist
+            for cache in (self.playlist_cache, self.playlist_tracks_cache,
+                          self.playlist_index_cache, self.playlist_artists_cache):
+                cache.discard(lambda key: key[1] == playlist_id)
+            self.spotify_manager.track_index.delete(playlist_id)
             return f"Cache cleared for playlist {playlist_id}"
         else:
             self.playlist_cache.clear()
+            self.playlist_tracks_cache.clear()
+            self.playlist_index_cache.clear()
+            self.playlist_artists_cache.clear()
+            self.reverse_index_cache.clear()
+            self.playlist_listing_cache.clear()
             return "All playlist cache cleared"
 
     def get_cached_playlists_count(self):
         return len(self.playlist_cache)
+
+    def get_cache_stats(self):
+        return {"playlist": self.playlist_cache.stats(),
+                "playlist_tracks": self.playlist_tracks_cache.stats()}
@@ -1,5 +1,6 @@
 from ...utils.errors import *
 from ...utils.utils import missing_file_url
+from ...utils.records import TrackRecord, SEARCH_TRACK
 
 
 class SearchCommands:
@@ -26,15 +27,7 @@ class SearchCommands:
                 case "track":
 
                     data["tracks"] = [
-                        {
-                            "id": t["id"],
-                            "name": t.get("name", "Unknown Name"),
-                            "artists": [{a.get("name", "Unknown Artist"): a.get("id", "Unknown Artist ID")} for a in t.get("artists", [])],
-                            "album": t.get("album", {}).get("name", "Unknown Album"),
-                            "images": {"large": t["album"]["images"][0]["url"] if len(t["album"]["images"]) > 0 else missing_file_url, "medium": t["album"]["images"][1]["url"] if len(t["album"]["images"]) > 1 else missing_file_url, "small": t["album"]["images"][2]["url"] if len(t["album"]["images"]) > 2 else missing_file_url},
-                            "duration_ms": t.get("duration_ms"),
-                            "href": t.get("external_urls", {}).get("spotify"),
-                        }
+                        TrackRecord(t, SEARCH_TRACK)
                         for t in response["tracks"]["items"] if t is not None
                     ]
 
@@ -1,10 +1,16 @@
 from ..models.song import Song
 from ...utils.errors import *
+from ...utils.batching import resolve_batch, MAX_BATCH_IDS
+from ...utils.singleflight import SingleFlight
+
+# Max IDs per sp.tracks call
+TRACKS_BATCH_LIMIT = 50
 
 class SongCommands:
     def __init__(self, spotify_manager):
         self.spotify_manager = spotify_manager
-        self.song_cache = {}
+        self.song_cache = spotify_manager.cache.namespace("song")
+        self._inflight = SingleFlight()
 
     # ---------- Validation ----------
     def _validate_song_id(self, song_id):
@@ -25,21 +31,63 @@ class SongCommands:
     # ---------- Song Management ----------
     def check_song(self, song_id):
         def operation(song_id):
-            if song_id in self.song_cache:
-                return self.song_cache[song_id]
-            song_obj = Song(self.spotify_manager, track_id=song_id)
-            self.song_cache[song_id] = song_obj
-            return song_obj
+            song_obj = self.song_cache.get(song_id)
+            if song_obj is not None and song_obj.data is not None:
+                return song_obj
+            # Concurrent misses for the same song share one upstream fetch
+            return self._inflight.do(song_id, lambda: self._load_song(song_id))
         return self._handle_song_operation(song_id, operation)
 
+    def _load_song(self, song_id):
+        song_obj = self.song_cache.get(song_id)
+        if song_obj is None:
+            # Another worker may already have fetched it
+            data = self.spotify_manager.catalog_cache.get("song", song_id)
+            song_obj = Song(self.spotify_manager, track_id=song_id, data=data)
+        song_obj.get_track()
+        return self.song_cache.set(song_id, song_obj)
+
+    def _validate_song_ids(self, song_ids):
+        """Validation for batch requests: a non-empty list of IDs"""
+        if not isinstance(song_ids, list) or not song_ids:
+            raise BadRequestError("A non-empty list of song IDs is required")
+        if len(song_ids) > MAX_BATCH_IDS:
+            raise BadRequestError(f"At most {MAX_BATCH_IDS} song IDs per request")
+        return [self._validate_song_id(song_id) for song_id in song_ids]
+
+    def check_songs(self, song_ids=None):
+        """
+        Song objects for many IDs. Cached IDs are served from the caches;
+        misses are fetched with sp.tracks (50 per call), chunks in parallel.
+        Returns (dict of id -> Song, list of IDs not found on Spotify).
+        """
+        song_ids = self._validate_song_ids(song_ids)
+        try:
+            return resolve_batch(
+                song_ids, "song", self.song_cache, self.spotify_manager,
+                build=lambda song_id, data: Song(self.spotify_manager, song_id, data=data),
+                fetch_chunk=lambda chunk: self.spotify_manager.sp.tracks(chunk)["tracks"],
+                chunk_size=TRACKS_BATCH_LIMIT,
+            )
+        except SpotifyException as e:
+            raise map_spotify_error(e, "song")
+        except APIError:
+            raise
+        except Exception as e:
+            raise TrackOperationError(
+                f"Unexpected error in batch song operation: {str(e)}")
+
     def check_exists(self, song_id):
         def operation(song_id):
-            if song_id in self.song_cache:
+            if self.song_cache.get(song_id) is not None:
                 return True
             try:
-                data = self.spotify_manager.sp.track(song_id)
+                data = self.spotify_manager.catalog_cache.get("song", song_id)
+                if data is None:
+                    data = self.spotify_manager.sp.track(song_id)
+                    self.spotify_manager.catalog_cache.set("song", song_id, data)
                 song_obj = Song(self.spotify_manager, song_id, data=data)
-                self.song_cache[song_id] = song_obj
+                self.song_cache.set(song_id, song_obj)
                 return True
             except SpotifyException as e:
                 if e.http_status in (400, 404):
@@ -58,22 +106,31 @@ class SongCommands:
         def operation(song_id):
             songObj = self.check_song(song_id)
             if raw: return songObj.get_track()
-            data = {
-                "name": songObj.get_track_name(),
-                "id": songObj.get_track_id(),
-                "artists": songObj.get_track_artists(),
-                "album": songObj.get_track_album(),
-                "imgs": songObj.get_track_image(),
-                "length": songObj.get_track_length(),
-                "explicit": songObj.is_track_explicit(),
-                "href": songObj.get_track_url(),
-                "track_number": songObj.get_track_number(),
-                "popularity": songObj.get_track_popularity()
-
-            }
-            return data
+            return self._format_song_info(songObj)
         return self._handle_song_operation(song_id, operation)
 
+    def _format_song_info(self, songObj):
+        return {
+            "name": songObj.get_track_name(),
+            "id": songObj.get_track_id(),
+            "artists": songObj.get_track_artists(),
+            "album": songObj.get_track_album(),
+            "imgs": songObj.get_track_image(),
+            "length": songObj.get_track_length(),
+            "explicit": songObj.is_track_explicit(),
+            "href": songObj.get_track_url(),
+            "track_number": songObj.get_track_number(),
+            "popularity": songObj.get_track_popularity()
+
+        }
+
+    def get_song_info_batch(self, song_ids, raw=False):
+        """Song info for many tracks in as few upstream calls as possible"""
+        songs, not_found = self.check_songs(song_ids)
+        data = [songObj.get_track() if raw else self._format_song_info(songObj)
+                for songObj in songs.values()]
+        return {"songs": data, "not_found": not_found}
+
     def save_song(self, song_id, current_user):
         def operation(song_id):
             if not current_user:
@@ -110,3 +167,20 @@ class SongCommands:
         def operation(song_id):
             return playlist_tracks.get(song_id, "")
         return self._handle_song_operation(song_id, operation)
+
+    # ---------- Cache Management ----------
+    def clear_cache(self, song_id=None):
+        if song_id:
+            song_id = self._validate_song_id(song_id)
+            self.song_cache.pop(song_id, None)
+            self.spotify_manager.catalog_cache.delete("song", song_id)
+            return f"Cache cleared for song {song_id}"
+        else:
+            self.song_cache.clear()
+            return "All song cache cleared"
+
+    def get_cached_songs_count(self):
+        return len(self.song_cache)
+
+    def get_cache_stats(self):
+        return self.song_cache.stats()
@@ -2,12 +2,14 @@ from ..models.user import User
 from ...utils.errors import *
 from spotipy import SpotifyException
 from ...utils.utils import missing_file_url
+from ...utils.singleflight import SingleFlight
 
 
 class UserCommands:
     def __init__(self, spotify_manager):
         self.spotify_manager = spotify_manager
-        self.user_cache = {}
+        self.user_cache = spotify_manager.cache.namespace("user")
+        self._inflight = SingleFlight()
 
     # ---------- Validation ----------
     def _validate_user_id(self, user_id):
@@ -27,18 +29,29 @@ class UserCommands:
                 f"Unexpected error in user operation: {str(e)}")
 
     # ---------- Core ----------
-    def check_user(self, user_id=None):
+    def check_user(self, user_id=None, load=True):
         """
         Retrieve a User object, either from cache or by creating a new one.
+        With load=True the profile is fetched too; concurrent callers for
+        the same user share that one upstream request.
         """
         user_id = self._validate_user_id(user_id)
 
-        if user_id in self.user_cache:
-            return self.user_cache[user_id]
+        user_obj = self.user_cache.get(user_id)
+        if user_obj is not None and (user_obj.data is not None or not load):
+            return user_obj
 
-        user_obj = User(self.spotify_manager, user_id=user_id)
-        self.user_cache[user_id] = user_obj
-        return user_obj
+        return self._inflight.do((user_id, load), lambda: self._load_user(user_id, load))
+
+    def _load_user(self, user_id, load):
+        user_obj = self.user_cache.get(user_id)
+        if user_obj is None:
+            # Another worker may already have fetched it
+            data = self.spotify_manager.catalog_cache.get("user", user_id)
+            user_obj = User(self.spotify_manager, user_id=user_id, data=data)
+        if load:
+            user_obj.get_user()
+        return self.user_cache.set(user_id, user_obj)
 
     def check_exists(self, user_id):
         """
@@ -47,14 +60,17 @@ class UserCommands:
         """
         user_id = self._validate_user_id(user_id)
 
-        if user_id in self.user_cache:
+        if self.user_cache.get(user_id) is not None:
             return True
 
         def _operation(uid):
             try:
-                data = self.spotify_manager.sp.user(uid)
+                data = self.spotify_manager.catalog_cache.get("user", uid)
+                if data is None:
+                    data = self.spotify_manager.sp.user(uid)
+                    self.spotify_manager.catalog_cache.set("user", uid, data)
                 user_obj = User(self.spotify_manager, uid, data=data)
-                self.user_cache[uid] = user_obj
+                self.user_cache.set(uid, user_obj)
                 return True
             except SpotifyException as e:
                 return e.http_status not in [400, 404]
@@ -87,8 +103,24 @@ class UserCommands:
         Retrieve playlists owned or followed by the user.
         """
         def _operation(uid):
-            user_obj = self.check_user(uid)
+            user_obj = self.check_user(uid, load=False)
             return user_obj.get_user_playlists()
 
         return self._handle_user_operation(user_id, _operation)
 
+    # ---------- Cache Management ----------
+    def clear_cache(self, user_id=None):
+        if user_id:
+            user_id = self._validate_user_id(user_id)
+            self.user_cache.pop(user_id, None)
+            self.spotify_manager.catalog_cache.delete("user", user_id)
+            return f"Cache cleared for user {user_id}"
+        else:
+            self.user_cache.clear()
+            return "All user cache cleared"
+
+    def get_cached_users_count(self):
+        return len(self.user_cache)
+
+    def get_cache_stats(self):
+        return self.user_cache.stats()
@@ -1,16 +1,24 @@
-from ...utils.utils import missing_file_url
+from ...utils.utils import missing_file_url, strip_available_markets
+from ...utils.paging import fetch_pages, afetch_pages
+from ...utils.records import TrackRecord, album_records, ALBUM_TRACK
+
+# Max items per request for the album tracks endpoint
+ALBUM_TRACKS_PAGE_LIMIT = 50
 
 
 class Album:
     def __init__(self, spotify_manager, album_id, data=None):
         self.sp = spotify_manager.get_spotify_client()
-        self.data = data
+        self.data = strip_available_markets(data)
         self.album_id = album_id
         self.spotify_manager = spotify_manager
+        self.tracks = None  # complete formatted track list, see get_album_tracks
 
     def get_album(self):
         if self.data is None:
-            self.data = self.sp.album(self.album_id)
+            self.data = strip_available_markets(self.sp.album(self.album_id))
+            self.spotify_manager.catalog_cache.set(
+                "album", self.album_id, self.data)
         return self.data
 
     def get_album_info(self):
@@ -69,49 +77,48 @@ class Album:
             for artist in artists if "id" in artist
         ]
 
+    def _fetch_tracks_page(self, offset, limit):
+        result = self.sp.album_tracks(
+            self.album_id, limit=limit, offset=offset)
+        return strip_available_markets(result.get("items", []))
+
+    async def _afetch_tracks_page(self, sp, offset, limit):
+        result = await sp.album_tracks(self.album_id, limit=limit, offset=offset)
+        return strip_available_markets(result.get("items", []))
+
+    def _fetch_remaining_tracks(self, total, start):
+        aio = getattr(self.spotify_manager, "aio", None)
+        if aio is not None:
+            sp = aio.bind(self.sp)
+            return aio.run(afetch_pages(
+                lambda offset, limit: self._afetch_tracks_page(sp, offset, limit),
+                total, ALBUM_TRACKS_PAGE_LIMIT, start=start))
+        return fetch_pages(
+            self._fetch_tracks_page, total, ALBUM_TRACKS_PAGE_LIMIT,
+            max_workers=self.spotify_manager.page_workers, start=start)
+
     def get_album_tracks(self, positions=False):
-        self.get_album()  # ensures self.data is populated
-        album = self.data
-        tracks_data = album.get("tracks", {}).get("items", [])
+        if self.tracks is None:
+            self.get_album()  # ensures self.data is populated
+            album = self.data
+            embedded = album.get("tracks") or {}
+            tracks_data = list(embedded.get("items") or [])
 
-        album_data = {
-            "id": album.get("id"),
-            "name": album.get("name"),
-            "images": {
-                "large": album.get("images", [{}])[0].get("url") if album.get("images") else "",
-                "medium": album.get("images", [{}])[1].get("url") if len(album.get("images", [])) > 1 else "",
-                "small": album.get("images", [{}])[2].get("url") if len(album.get("images", [])) > 2 else "",
-            },
-        }
+            # sp.album embeds only the first 50 tracks; fetch the rest of box
+            # sets and compilations from the album tracks endpoint
+            total = embedded.get("total", len(tracks_data))
+            tracks_data.extend(
+                self._fetch_remaining_tracks(total, start=len(tracks_data)))
 
-        formatted_tracks = []
-        for t in tracks_data:
-            track = {
-                "id": t.get("id"),
-                "name": t.get("name", "Unknown Track"),
-                "artist_data": [
-                    {"id": a.get("id"), "name": a.get(
-                        "name", "Unknown Artist")}
-                    for a in t.get("artists", [])
-                ],
-                "album_data": album_data,
-                "duration": t.get("duration_ms"),
-                "position": t.get("track_number"),
-                "explicit": t.get("explicit", False),
-                "popularity": None,  # not in album data
-                "added_at": None,
-                "added_by": None,
-                "is_local": t.get("is_local", False),
-                "url": t.get("external_urls", {}).get("spotify"),
-                "isSelected": False,
-            }
-            formatted_tracks.append(track)
+            album_record = album_records.get(album)
+            self.tracks = [TrackRecord(t, ALBUM_TRACK, album=album_record,
+                                       position=t.get("track_number"))
+                           for t in tracks_data]
 
         if positions:
+            return {t["position"]: t for t in self.tracks}
 
-            return {t["position"]: t for t in formatted_tracks}
-
-        return formatted_tracks
+        return self.tracks
 
 
 '''
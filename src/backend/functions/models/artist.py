@@ -1,4 +1,5 @@
 from ...utils.utils import missing_file_url
+from ...utils.records import TrackRecord, TOP_TRACK
 
 
 class Artist:
@@ -11,6 +12,8 @@ class Artist:
     def get_artist(self):
         if self.data == None:
             self.data = self.sp.artist(self.artist_id)
+            self.spotify_manager.catalog_cache.set(
+                "artist", self.artist_id, self.data)
         return self.data
 
     def get_artist_info(self):
@@ -31,17 +34,6 @@ class Artist:
 
         return self.data["name"]
 
-    def get_artists(self, artist_ids):
-        self.get_artist()
-
-        if artist_ids == None or len(artist_ids) == 0:
-            return []
-        if len(artist_ids) > 50:
-            raise ValueError("Maximum of 50 artist IDs allowed")
-        if len(artist_ids) == 1:
-            return [self.sp.artist(artist_ids[0])]
-        return self.sp.artists(artist_ids)["artists"]
-
     def get_artist_url(self):
         self.get_artist()
         return self.data["external_urls"].get("spotify", "https://www.open.spotify.com/artist/" + self.artist_id)
@@ -78,19 +70,7 @@ class Artist:
             self.artist_id, country=country)["tracks"]
         if raw:
             return tracks
-        track_list = []
-        for t in tracks:
-            track_list.append({
-                "id": t["id"],
-                "name": t["name"],
-                "artist_data": [{"name": artist["name"], "id": artist["id"]} for artist in t["artists"]],
-                "album_data": {"name": t["album"]["name"], "id": t["album"]["id"], "images": {"large": t["album"]["images"][0]["url"] if len(t["album"]["images"]) > 0 else missing_file_url, "medium": t["album"]["images"][1]["url"] if len(t["album"]["images"]) > 1 else missing_file_url, "small": t["album"]["images"][2]["url"] if len(t["album"]["images"]) > 2 else missing_file_url}},
-                "duration_ms": t["duration_ms"],
-                "explicit": t["explicit"],
-                "popularity": t["popularity"],
-                "url": t["external_urls"].get("spotify", "")
-            })
-        return track_list
+        return [TrackRecord(t, TOP_TRACK) for t in tracks]
 
     def get_artist_albums(self, include_groups=None, limit=20, offset=0):
         self.get_artist()
@@ -1,6 +1,8 @@
 from .user import User
 from ....database.currentUserManager import SettingsManager
 from ...utils.utils import missing_file_url
+from ...utils.paging import fetch_collection, afetch_collection
+from ...utils.records import TrackRecord, SAVED_TRACK
 
 
 class CurrentUser(User):
@@ -246,6 +248,19 @@ class CurrentUser(User):
             print(f"Unable to get user devices: {e}")
             return []
 
+    def _fetch_collection(self, endpoint, total=None):
+        """All items of a paged /me collection; pages after the first are fetched in parallel"""
+        aio = getattr(self.spotify_manager, "aio", None)
+        if aio is not None:
+            aendpoint = getattr(aio.bind(self.sp), endpoint.__name__)
+            return aio.run(afetch_collection(
+                lambda offset, limit: aendpoint(limit=limit, offset=offset),
+                page_size=50, total=total))
+        return fetch_collection(
+            lambda offset, limit: endpoint(limit=limit, offset=offset),
+            page_size=50, max_workers=self.spotify_manager.page_workers,
+            total=total)
+
     def get_user_playlists(self, total=None):
         """Fetch current user's playlists from Spotify"""
         # Ensure self.playlists always exists
@@ -254,26 +269,16 @@ class CurrentUser(User):
 
         playlists = []  # local variable
 
-        offset = 0
-        fetched = 0
-
-        # Fetch total if not provided
-        if total is None:
-            first_batch = self.sp.current_user_playlists(limit=50)
-            total = first_batch.get("total", 0)
-
-        while fetched < total:
-            limit = min(50, total - fetched)
-            user_playlists = self.sp.current_user_playlists(
-                limit=limit, offset=offset)
-
-            items = user_playlists.get("items", [])
-            for playlist in items:
+        items = self._fetch_collection(
+            self.sp.current_user_playlists, total)
+        for playlist in items:
+            if playlist is not None:
                 playlists.append({
                     "name": playlist.get("name", "Unknown Name"),
                     "ownerName": playlist.get("owner", {}).get("display_name", "Unknown Owner"),
                     "ownerID": playlist.get("owner", {}).get("id", "Unknown Id"),
                     "id": playlist.get("id", "Unknown Id"),
+                    "snapshot_id": playlist.get("snapshot_id"),
                     "public": playlist.get("public", True),
                     "collaborative": playlist.get("collaborative", False),
                     "length": playlist.get("tracks", {}).get("total", 0),
@@ -282,11 +287,6 @@ class CurrentUser(User):
                     "coverURL": playlist.get("images")[0]["url"] if playlist.get("images") else missing_file_url
                 })
 
-            fetched += len(items)
-            offset += limit
-            if len(items) < limit:
-                break
-
         # Save playlists to instance for caching
         self.playlists = playlists
 
@@ -298,38 +298,22 @@ class CurrentUser(User):
             self.albums = []
 
         albums = []
-        offset = 0
-        fetched = 0
 
-        # Fetch total if not provided
-        if total is None:
-            first_batch = self.sp.current_user_saved_albums(limit=50)
-            total = first_batch.get("total", 0)
-
-        while fetched < total:
-            limit = min(50, total - fetched)
-            user_albums = self.sp.current_user_saved_albums(
-                limit=limit, offset=offset)
-
-            items = user_albums.get("items", [])
-            for item in items:
-                if item is not None:
-                    album = item.get("album", {})
-                    albums.append({
-                        "id": album.get("id", "Unknown Id"),
-                        "name": album.get("name", "Unknown Album"),
-                        "artists": [{"id": a.get("id", ""), "name": a.get("name", "")} for a in album.get("artists", [])],
-                        "genres": album.get("genres", []),
-                        "release_date": album.get("release_date", ""),
-                        "total_tracks": album.get("total_tracks", 0),
-                        "url": album.get("external_urls", {}).get("spotify", ""),
-                        "images": {"small": album["images"][2].get("url", "") if album["images"] else missing_file_url, "medium": album["images"][1].get("url", "") if album["images"] else missing_file_url, "large": album["images"][0].get("url", "") if album["images"] else missing_file_url}
-                    })
-
-            fetched += len(items)
-            offset += limit
-            if len(items) < limit:
-                break
+        items = self._fetch_collection(
+            self.sp.current_user_saved_albums, total)
+        for item in items:
+            if item is not None:
+                album = item.get("album", {})
+                albums.append({
+                    "id": album.get("id", "Unknown Id"),
+                    "name": album.get("name", "Unknown Album"),
+                    "artists": [{"id": a.get("id", ""), "name": a.get("name", "")} for a in album.get("artists", [])],
+                    "genres": album.get("genres", []),
+                    "release_date": album.get("release_date", ""),
+                    "total_tracks": album.get("total_tracks", 0),
+                    "url": album.get("external_urls", {}).get("spotify", ""),
+                    "images": {"small": album["images"][2].get("url", "") if album["images"] else missing_file_url, "medium": album["images"][1].get("url", "") if album["images"] else missing_file_url, "large": album["images"][0].get("url", "") if album["images"] else missing_file_url}
+                })
 
         self.albums = albums
         return self.albums
@@ -340,38 +324,13 @@ class CurrentUser(User):
             self.tracks = []
 
         tracks = []
-        offset = 0
-        fetched = 0
 
-        if total is None:
-            first_batch = self.sp.current_user_saved_tracks(limit=50)
-            total = first_batch.get("total", 0)
-
-        while fetched < total:
-            limit = min(50, total - fetched)
-            user_tracks = self.sp.current_user_saved_tracks(
-                limit=limit, offset=offset)
-
-            items = user_tracks.get("items", [])
-            for item in items:
-                if item is not None:
-                    track = item.get("track", {})
-                    tracks.append({
-                        "id": track["id"],
-                        "name": track["name"],
-                        "artist_data": [{"name": artist["name"], "id": artist["id"]} for artist in track["artists"]],
-                        "album_data": {"name": track["album"]["name"], "id": track["album"]["id"], "images": {"large": track["album"]["images"][0]["url"] if len(track["album"]["images"]) > 0 else missing_file_url, "medium": track["album"]["images"][1]["url"] if len(track["album"]["images"]) > 1 else missing_file_url, "small": track["album"]["images"][2]["url"] if len(track["album"]["images"]) > 2 else missing_file_url}},
-                        "duration_ms": track["duration_ms"],
-                        "explicit": track["explicit"],
-                        "popularity": track["popularity"],
-                        "added_at": item["added_at"],
-                        "url": track["external_urls"].get("spotify", "")
-                    })
-
-            fetched += len(items)
-            offset += limit
-            if len(items) < limit:
-                break
+        items = self._fetch_collection(
+            self.sp.current_user_saved_tracks, total)
+        for item in items:
+            if item is not None:
+                tracks.append(TrackRecord(item.get("track", {}), SAVED_TRACK,
+                                          added_at=item["added_at"]))
 
         self.tracks = tracks
         return self.tracks
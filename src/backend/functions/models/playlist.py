@@ -1,18 +1,39 @@
-from ...utils.utils import missing_file_url
+from ...utils.utils import missing_file_url, strip_available_markets
+from ...utils.paging import fetch_pages, iter_pages, afetch_pages
+from ...utils.records import TrackRecord, PLAYLIST_TRACK
+from ...utils.reorder import block_move_target, plan_moves
+from ...utils.batching import chunked
+
+# Spotify's maximum page size for /playlists/{id}/tracks
+PLAYLIST_TRACKS_PAGE_LIMIT = 100
+# Max items per add-items request
+PLAYLIST_ADD_LIMIT = 100
 
 
 class Playlist:
     def __init__(self, spotify_manager, playlist_id, data=None):
         self.sp = spotify_manager.get_spotify_client()
-        self.data = data
+        self.data = strip_available_markets(data)
         self.playlist_id = playlist_id
         self.spotify_manager = spotify_manager
 
     def get_playlist(self):
         if self.data is None:
-            self.data = self.sp.playlist(self.playlist_id)
+            self.data = strip_available_markets(
+                self.sp.playlist(self.playlist_id))
         return self.data
 
+    def get_playlist_snapshot(self):
+        """
+        Metadata-only lookup of the playlist's current snapshot_id and track total.
+        Drops cached playlist data if the playlist changed since it was fetched.
+        """
+        meta = self.sp.playlist(
+            self.playlist_id, fields="snapshot_id,tracks.total")
+        if self.data is not None and self.data.get("snapshot_id") != meta["snapshot_id"]:
+            self.data = None
+        return meta
+
     def get_playlist_length(self):
         self.get_playlist()
         return self.data["tracks"]["total"]
@@ -61,53 +82,121 @@ class Playlist:
 
         return self.data["collaborative"]
 
-    def get_playlist_tracks(self, total, positions=False):
-        self.get_playlist()
+    def _fetch_tracks_page(self, offset, limit):
+        result = self.sp.playlist_tracks(
+            self.playlist_id, limit=limit, offset=offset)
+        return strip_available_markets(result["items"])
+
+    def _fetch_track_ids_page(self, offset, limit):
+        result = self.sp.playlist_tracks(
+            self.playlist_id, fields="items(track(id))", limit=limit, offset=offset)
+        return [(item.get("track") or {}).get("id") for item in result["items"]]
+
+    async def _afetch_tracks_page(self, sp, offset, limit):
+        result = await sp.playlist_tracks(
+            self.playlist_id, limit=limit, offset=offset)
+        return strip_available_markets(result["items"])
+
+    async def _afetch_track_ids_page(self, sp, offset, limit):
+        result = await sp.playlist_tracks(
+            self.playlist_id, fields="items(track(id))", limit=limit, offset=offset)
+        return [(item.get("track") or {}).get("id") for item in result["items"]]
+
+    def _crawl_async(self, afetch_page, total):
+        """All pages on the SpotifyManager's event loop (SPOTIFY_ASYNC), None without one"""
+        aio = getattr(self.spotify_manager, "aio", None)
+        if aio is None:
+            return None
+        sp = aio.bind(self.sp)
+        return aio.run(afetch_pages(
+            lambda offset, limit: afetch_page(sp, offset, limit),
+            total, PLAYLIST_TRACKS_PAGE_LIMIT))
+
+    def fetch_track_ids(self, total):
+        """
+        Track IDs only, by position (None for local files). The fields
+        projection makes each page a small fraction of the full payload.
+        """
+        track_ids = self._crawl_async(self._afetch_track_ids_page, total)
+        if track_ids is not None:
+            return track_ids
+        return fetch_pages(
+            self._fetch_track_ids_page,
+            total,
+            page_size=PLAYLIST_TRACKS_PAGE_LIMIT,
+            max_workers=self.spotify_manager.page_workers,
+        )
+
+    def get_playlist_tracks(self, total, positions=False, concurrent=True):
+        # The full playlist (with 100 embedded tracks) is only needed for its length
+        if total is None:
+            total = self.get_playlist_length()
+
+        if concurrent:
+            # Total is known up front, so every page offset can be requested at once
+            items = self._crawl_async(self._afetch_tracks_page, total)
+            if items is not None:
+                return items
+            return fetch_pages(
+                self._fetch_tracks_page,
+                total,
+                page_size=PLAYLIST_TRACKS_PAGE_LIMIT,
+                max_workers=self.spotify_manager.page_workers,
+            )
 
         songs = []
         limit = 50
         offset = 0
 
-        if total is None:
-            self.get_playlist_length()
-
-        else:
-            while len(songs) < total:
-                result = self.sp.playlist_tracks(self.playlist_id,
-                                                 limit=min(limit, total - offset), offset=offset)
-                items = result["items"]
-                if not items:
-                    break
-                else:
-                    songs.extend(items)
-                offset += len(items)
+        while len(songs) < total:
+            result = self.sp.playlist_tracks(self.playlist_id,
+                                             limit=min(limit, total - offset), offset=offset)
+            items = strip_available_markets(result["items"])
+            if not items:
+                break
+            else:
+                songs.extend(items)
+            offset += len(items)
 
         return songs
 
-    def get_playlist_tracks_info(self, total):
-        tracks = self.get_playlist_tracks(total)
-        track_list = []
-        for i, item in enumerate(tracks):
-            track = item["track"]
-            if track is not None:
-              track_info = {
-                  "id": track["id"],
-                  "name": track["name"],
-                  "artist_data": [{"name": artist["name"], "id": artist["id"]} for artist in track["artists"]],
-                  "album_data": {"name": track["album"]["name"], "id": track["album"]["id"], "images": {"large": track["album"]["images"][0]["url"] if len(track["album"]["images"]) > 0 else missing_file_url, "medium": track["album"]["images"][1]["url"] if len(track["album"]["images"]) > 1 else missing_file_url, "small": track["album"]["images"][2]["url"] if len(track["album"]["images"]) > 2 else missing_file_url}},
-                  "duration_ms": track["duration_ms"],
-                  "position": i+1,
-                  "explicit": track["explicit"],
-                  "popularity": track["popularity"],
-                  "added_at": item["added_at"],
-                  "added_by": item["added_by"]["id"] if item["added_by"] else None,
-                  "is_local": item["is_local"],
-                  "url": track["external_urls"].get("spotify", "")
-              }
-              track_list.append(track_info)
+    def iter_playlist_tracks(self, total):
+        """Yield raw playlist items in order, page by page as they arrive"""
+        if total is None:
+            total = self.get_playlist_length()
+
+        for page in iter_pages(
+            self._fetch_tracks_page,
+            total,
+            page_size=PLAYLIST_TRACKS_PAGE_LIMIT,
+            max_workers=self.spotify_manager.page_workers,
+        ):
+            yield from page
+
+    def _format_playlist_track(self, item, position):
+        return TrackRecord(
+            item["track"], PLAYLIST_TRACK,
+            position=position,
+            added_at=item["added_at"],
+            added_by=item["added_by"]["id"] if item["added_by"] else None,
+            is_local=item["is_local"])
+
+    def iter_formatted_tracks(self, items):
+        for i, item in enumerate(items):
+            if item["track"] is not None:
+                yield self._format_playlist_track(item, i+1)
             else:
                 print(item)
-        return track_list
+
+    def iter_playlist_tracks_info(self, total):
+        """Yield formatted tracks one at a time without holding the whole playlist"""
+        return self.iter_formatted_tracks(self.iter_playlist_tracks(total))
+
+    def format_playlist_tracks(self, items):
+        return list(self.iter_formatted_tracks(items))
+
+    def get_playlist_tracks_info(self, total):
+        return self.format_playlist_tracks(self.get_playlist_tracks(total))
 
     def get_playlist_track_ids(self, total):
         tracks = self.get_playlist_tracks(total)
@@ -118,6 +207,7 @@ class Playlist:
         self.get_playlist()
         try:
             self.sp.playlist_upload_cover_image(self.playlist_id, image_b64)
+            self.data = None  # refetch metadata on next access
             return True
         except Exception as e:
             print(f"WARNING. Upload_cover_image FAILED: {e}")
@@ -135,6 +225,7 @@ class Playlist:
                     # If the removed track is lower than the position, this prevents OutOfBounds err
                     x = 1 if p - 1 < position else 2
                     self.add_specific_tracks(track_id=track_id, position=p-x)
+            self.data = None  # snapshot changed
             return True
         except Exception as e:
             print(f"WARNING. Adding track FAILED: {e}")
@@ -146,6 +237,7 @@ class Playlist:
         try:
             self.sp.playlist_remove_all_occurrences_of_items(
                 self.playlist_id, items=[track_id])
+            self.data = None  # snapshot changed
             return True
         except Exception as e:
             print(f"WARNING. Adding track FAILED: {e}")
@@ -159,6 +251,7 @@ class Playlist:
         try:
 
             self.sp.playlist_add_items(self.playlist_id, track_id, position)
+            self.data = None  # snapshot changed
             return True
         except Exception as e:
             print(f"WARNING. Adding track FAILED: {e}")
@@ -169,51 +262,139 @@ class Playlist:
 
         try:
             self.sp.playlist_add_items(self.playlist_id, items=track_ids)
+            self.data = None  # snapshot changed
             return True
         except Exception as e:
             print(f"WARNING. Failed to add tracks: {e}")
             raise e
 
-    def move_tracks(self, from_positions, to_position):
+    def append_tracks(self, track_ids):
+        """
+        Append any number of tracks, in order, in chunks of PLAYLIST_ADD_LIMIT.
+
+        Chunks are sent one after another so the playlist keeps the source
+        order; each chunk is retried on 429 and the snapshot_id returned by
+        the last successful chunk is kept. Stops at the first failed chunk.
+
+        Returns:
+            dict with the "written" track count, the "calls" made, the final
+            "snapshot_id" and, if a chunk failed, its "error"
+        """
+        self.get_playlist()
+        result = {"written": 0, "calls": 0,
+                  "snapshot_id": self.data.get("snapshot_id")}
+        try:
+            for chunk in chunked(list(track_ids), PLAYLIST_ADD_LIMIT):
+                # 429s are waited out and retried by the request scheduler
+                response = self.sp.playlist_add_items(self.playlist_id, items=chunk)
+                result["calls"] += 1
+                result["written"] += len(chunk)
+                result["snapshot_id"] = (response or {}).get(
+                    "snapshot_id", result["snapshot_id"])
+        except Exception as e:
+            print(f"WARNING. Failed to add tracks: {e}")
+            result["error"] = str(e)
+        if result["written"]:
+            self.data = None  # snapshot changed
+        return result
+
+    def _run_sync_step(self, step, uris, snapshot_id):
+        op = step["op"]
+        if op == "remove":
+            positions = {}
+            for position in step["positions"]:
+                positions.setdefault(uris[position], []).append(position)
+            return self.sp.playlist_remove_specific_occurrences_of_items(
+                self.playlist_id,
+                items=[{"uri": uri, "positions": p}
+                       for uri, p in positions.items()],
+                snapshot_id=snapshot_id)
+        if op == "move":
+            return self.sp.playlist_reorder_items(
+                self.playlist_id,
+                range_start=step["range_start"],
+                insert_before=step["insert_before"],
+                range_length=step["range_length"],
+                snapshot_id=snapshot_id)
+        if op == "replace":
+            return self.sp.playlist_replace_items(
+                self.playlist_id, step["track_ids"])
+        return self.sp.playlist_add_items(
+            self.playlist_id, step["track_ids"], step["position"])
+
+    def sync_tracks(self, steps, uris, snapshot_id=None):
+        """
+        Run a plan from utils.sync.plan_sync, step by step.
+        uris: URI of every current track, by position (remove steps refer to
+        tracks by their position before the sync)
+
+        Every step is retried on 429 and sent with the snapshot_id returned by
+        the previous one where the endpoint accepts it. Stops at the first
+        failed step.
+
+        Returns:
+            dict with the "executed" step count, the final "snapshot_id" and,
+            if a step failed, its "error"
+        """
+        self.get_playlist()
+        snapshot_id = snapshot_id or self.data.get("snapshot_id")
+        result = {"executed": 0, "snapshot_id": snapshot_id}
+        try:
+            for step in steps:
+                response = self._run_sync_step(step, uris, result["snapshot_id"])
+                result["executed"] += 1
+                result["snapshot_id"] = (response or {}).get(
+                    "snapshot_id", result["snapshot_id"])
+        except Exception as e:
+            print(f"WARNING. Playlist sync stopped: {e}")
+            result["error"] = str(e)
+        if result["executed"]:
+            self.data = None  # snapshot changed
+        return result
+
+    def move_tracks(self, from_positions, to_position, snapshot_id=None):
         """
-        Move one or more tracks within the playlist.
+        Move one or more tracks within the playlist, as one block.
         from_positions: list of integers (track indices to move)
-        to_position: integer (target insert position)
+        to_position: integer (target insert position, counted once the
+        moved tracks are out of the way)
+
+        The target order is simulated locally and reached with the fewest
+        range moves plan_moves finds; each call passes on the snapshot_id
+        returned by the previous one.
+
+        Returns:
+            dict with "planned" and "executed" call counts, the final
+            "snapshot_id" and the "order" applied (as old positions)
         """
         self.get_playlist()
+        length = self.get_playlist_length()
+        snapshot_id = snapshot_id or self.data.get("snapshot_id")
 
-        # Ensure positions are sorted so you move in a stable order
-        from_positions = sorted(set(from_positions))
+        target = block_move_target(length, from_positions, to_position)
+        moves = plan_moves(target)
+        result = {"planned": len(moves), "executed": 0,
+                  "snapshot_id": snapshot_id, "order": target}
         try:
-            # Since the list shifts after each move, adjust positions to the front, then
-            for offset, pos in enumerate(from_positions):
-                
-                adjusted_from = pos
-                adjusted_to = 0 + offset
+            for range_start, range_length, insert_before in moves:
                 sanity = self.sp.playlist_reorder_items(
                     self.playlist_id,
-                    range_start=adjusted_from,
-                    insert_before=adjusted_to,
-                    range_length=1
+                    range_start=range_start,
+                    insert_before=insert_before,
+                    range_length=range_length,
+                    snapshot_id=snapshot_id
                 )
                 if "snapshot_id" not in sanity:
-                    print(f"WARNING. Failed to move track at pos {pos} to {to_position}")
-                    return False
-            mtl = len(from_positions) #move track length
-
-            sanity = self.sp.playlist_reorder_items(
-                    self.playlist_id,
-                    range_start=0,
-                    insert_before=to_position,
-                    range_length=mtl
-                )
-            if "snapshot_id" not in sanity:
-                print(f"WARNING. Failed to move track at pos {pos} to {to_position}")
-                return False
-            return True
+                    print(f"WARNING. Failed to move tracks {range_start}-{range_start + range_length - 1} to {insert_before}")
+                    break
+                snapshot_id = sanity["snapshot_id"]
+                result["executed"] += 1
+                result["snapshot_id"] = snapshot_id
         except Exception as e:
             print(f"WARNING. Failed to move tracks: {e}")
-            return False
+        if result["executed"]:
+            self.data = None  # snapshot changed
+        return result
 
 
 '''
@@ -1,18 +1,20 @@
 
 
-from ...utils.utils import missing_file_url
+from ...utils.utils import missing_file_url, strip_available_markets
 
 
 class Song:
     def __init__(self, spotify_manager, track_id, data=None):
         self.sp = spotify_manager.get_spotify_client()
-        self.data = data
+        self.data = strip_available_markets(data)
         self.track_id = track_id
         self.spotify_manager = spotify_manager
 
     def get_track(self):
         if self.data is None:
-            self.data = self.sp.track(self.track_id)
+            self.data = strip_available_markets(self.sp.track(self.track_id))
+            self.spotify_manager.catalog_cache.set(
+                "song", self.track_id, self.data)
         return self.data
 
     def get_track_name(self):
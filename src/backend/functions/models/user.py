@@ -13,6 +13,8 @@ class User:
     def get_user(self):
         if self.data is None:
             self.data = self.sp.user(self.user_id)
+            self.spotify_manager.catalog_cache.set(
+                "user", self.user_id, self.data)
         return self.data
 
     def get_user_playlists(self, total=None):
@@ -56,3 +56,19 @@ def get_album_artists(album_id):
         raise e
     except Exception as e:
         raise SpotifyAPIError(f"Error retrieving album: {str(e)}")
+
+
+@album_bp.route("/batch", methods=["POST"])
+def get_album_batch():
+    try:
+        album_commands = current_app.config["album_commands"]
+        raw_data = request.args.get("raw", "false").lower() == "true"
+        data = request.get_json(silent=True) or {}
+        return jsonify(album_commands.get_album_info_batch(data.get("ids"), raw=raw_data))
+    except APIError as e:
+        raise e
+    except SpotifyException as e:
+        raise map_spotify_error(e, "album")
+    except Exception as e:
+        raise AlbumOperationError(
+            f"Unexpected error retrieving albums: {str(e)}")
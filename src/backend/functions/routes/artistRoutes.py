@@ -84,3 +84,19 @@ def get_artist_genres(artist_id):
         raise e
     except Exception as e:
         raise SpotifyAPIError(f"Error retrieving album: {str(e)}")
+
+
+@artist_bp.route("/batch", methods=["POST"])
+def get_artist_batch():
+    try:
+        artist_commands = current_app.config["artist_commands"]
+        raw_data = request.args.get("raw", "false").lower() == "true"
+        data = request.get_json(silent=True) or {}
+        return jsonify(artist_commands.get_artist_info_batch(data.get("ids"), raw=raw_data))
+    except APIError as e:
+        raise e
+    except SpotifyException as e:
+        raise map_spotify_error(e, "artist")
+    except Exception as e:
+        raise ArtistOperationError(
+            f"Unexpected error retrieving artists: {str(e)}")
@@ -393,3 +393,34 @@ def get_user_library():
     except Exception as e:
         raise CurrentUserOperationError(
             f"Unexpected error fetching library: {str(e)}")
+
+
+@currentuser_bp.route("/track_locations/<track_id>", methods=["GET"])
+def get_track_locations(track_id):
+    check_logged_in()
+    try:
+        currentuser_cmds = current_app.config.get("currentuser_commands")
+        playlist_cmds = current_app.config.get("playlist_commands")
+        user_id = currentuser_cmds.current_user.user_id
+        playlists = playlist_cmds.get_playlist_listing(
+            user_id, currentuser_cmds.get_playlists)
+        locations, refreshed, skipped = playlist_cmds.get_track_locations(
+            user_id, playlists, track_id)
+        names = {p["id"]: p["name"] for p in playlists}
+        return jsonify({
+            "track_id": track_id,
+            "playlists": [{"id": pid, "name": names.get(pid), "positions": positions}
+                          for pid, positions in locations.items()],
+            "count": len(locations),
+            "indexed_playlists": len(playlists),
+            "refreshed_playlists": refreshed,
+            "skipped_playlists": [{"id": pid, "name": names.get(pid), "error": reason}
+                                  for pid, reason in skipped.items()],
+        })
+    except SpotifyException as e:
+        raise map_spotify_error(e, "track", track_id)
+    except APIError:
+        raise
+    except Exception as e:
+        raise CurrentUserOperationError(
+            f"Unexpected error locating track: {str(e)}")
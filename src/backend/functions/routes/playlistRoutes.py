@@ -1,7 +1,9 @@
 from .currentUserRoutes import check_logged_in
-from flask import Blueprint, jsonify, current_app, request
+from flask import Blueprint, jsonify, current_app, request, Response, stream_with_context
 from ...utils.errors import *
+from ...utils.records import RecordJSONProvider
 import base64
+import json
 
 playlist_bp = Blueprint("playlist", __name__)
 
@@ -35,6 +37,20 @@ def get_playlist(playlist_id):
             f"Unexpected error retrieving playlist: {str(e)}")
 
 
+def _ndjson_lines(items, playlist_id):
+    """One JSON object per line. Headers are already sent by the time a later
+    page fails, so errors are reported as a final {"error": ...} line."""
+    try:
+        for item in items:
+            yield json.dumps(item, default=RecordJSONProvider.default) + "\n"
+    except SpotifyException as e:
+        yield json.dumps(map_spotify_error(e, "playlist", playlist_id).to_dict()) + "\n"
+    except APIError as e:
+        yield json.dumps(e.to_dict()) + "\n"
+    except Exception as e:
+        yield json.dumps({"error": f"Unexpected error streaming playlist tracks: {str(e)}"}) + "\n"
+
+
 @playlist_bp.route("/tracks/<playlist_id>", methods=["GET"])
 def get_playlist_tracks(playlist_id):
     check_logged_in(PlaylistOperationError)
@@ -47,6 +63,11 @@ def get_playlist_tracks(playlist_id):
                 total = int(total)
         else:
             total = None
+        if request.args.get("stream", "").lower() == "ndjson":
+            tracks = playlist_commands.stream_playlist_tracks(
+                playlist_id, total, raw_data)
+            return Response(stream_with_context(_ndjson_lines(tracks, playlist_id)),
+                            mimetype="application/x-ndjson")
         tracks = playlist_commands.get_playlist_tracks(
             playlist_id, total, raw_data)
         return jsonify({"tracks": tracks})
@@ -132,16 +153,20 @@ def intersect_playlists():
             return jsonify({"error": "All three playlist IDs are required"}), 400
         p1_tracks = playlist_commands.get_playlist_track_ids(p1)
         p2_tracks = playlist_commands.get_playlist_track_ids(p2)
-        shared_ids = playlist_commands.intersect_playlists(
+        result = playlist_commands.intersect_playlists(
             p1_tracks, p2_tracks, p3)
         return jsonify({
             "playlist_id": p3,
-            "shared_track_count": len(shared_ids),
-            "shared_tracks": shared_ids
+            "shared_track_count": len(result["tracks"]),
+            "shared_tracks": result["tracks"],
+            "written_count": result["written"],
+            "snapshot_id": result["snapshot_id"]
         }), 200
 
     except SpotifyException as e:
         raise map_spotify_error(e, "playlist", p1)
+    except APIError:
+        raise
     except Exception as e:
         raise PlaylistOperationError(
             f"Unexpected error intersecting playlists: {str(e)}"
@@ -162,16 +187,20 @@ def union_playlists():
             return jsonify({"error": "All three playlist IDs are required"}), 400
         p1_tracks = playlist_commands.get_playlist_track_ids(p1)
         p2_tracks = playlist_commands.get_playlist_track_ids(p2)
-        shared_ids = playlist_commands.union_playlists(
+        result = playlist_commands.union_playlists(
             p1_tracks, p2_tracks, p3)
         return jsonify({
             "playlist_id": p3,
-            "total_unique_track_count": len(shared_ids),
-            "total_unique_tracks": shared_ids
+            "total_unique_track_count": len(result["tracks"]),
+            "total_unique_tracks": result["tracks"],
+            "written_count": result["written"],
+            "snapshot_id": result["snapshot_id"]
         }), 200
 
     except SpotifyException as e:
         raise map_spotify_error(e, "playlist", p1)
+    except APIError:
+        raise
     except Exception as e:
         raise PlaylistOperationError(
             f"Unexpected error unioning playlists: {str(e)}"
@@ -192,22 +221,95 @@ def differentiate_playlists():
             return jsonify({"error": "All three playlist IDs are required"}), 400
         p1_tracks = playlist_commands.get_playlist_track_ids(p1)
         p2_tracks = playlist_commands.get_playlist_track_ids(p2)
-        diff_ids = playlist_commands.differentiate_playlists(
+        result = playlist_commands.differentiate_playlists(
             p1_tracks, p2_tracks, p3)
         return jsonify({
             "playlist_id": p3,
-            "differentiated_track_count": len(diff_ids),
-            "differentiated_tracks": diff_ids
+            "differentiated_track_count": len(result["tracks"]),
+            "differentiated_tracks": result["tracks"],
+            "written_count": result["written"],
+            "snapshot_id": result["snapshot_id"]
         }), 200
 
     except SpotifyException as e:
         raise map_spotify_error(e, "playlist", p1)
+    except APIError:
+        raise
     except Exception as e:
         raise PlaylistOperationError(
             f"Unexpected error differentiating playlists: {str(e)}"
         )
 
 
+@playlist_bp.route("/sync/<playlist_id>", methods=["PUT"])
+def sync_playlist(playlist_id):
+    """
+    Make the playlist contain exactly the given ordered track list.
+    Body: {"track_ids": [...], "dry_run": false}; ?dry_run=true also works.
+    The response always includes the plan; a dry run only returns it.
+    """
+    check_logged_in(PlaylistOperationError)
+    try:
+        playlist_commands = current_app.config["playlist_commands"]
+        data = request.get_json(silent=True) or {}
+        track_ids = data.get("track_ids")
+        if not isinstance(track_ids, list) or not all(isinstance(t, str) and t for t in track_ids):
+            return jsonify({"error": "track_ids must be a list of track IDs"}), 400
+        track_ids = [t.rsplit(":", 1)[-1] for t in track_ids]  # accept URIs
+        dry_run = bool(data.get("dry_run")) or \
+            request.args.get("dry_run", "false").lower() == "true"
+
+        result = playlist_commands.sync_playlist(
+            playlist_id, track_ids, dry_run=dry_run)
+        return jsonify({"playlist_id": playlist_id, "dry_run": dry_run, **result}), 200
+
+    except SpotifyException as e:
+        raise map_spotify_error(e, "playlist", playlist_id)
+    except APIError:
+        raise
+    except Exception as e:
+        raise PlaylistOperationError(
+            f"Unexpected error syncing playlist: {str(e)}"
+        )
+
+
+@playlist_bp.route("/combine", methods=["POST"])
+def combine_playlists():
+    """
+    Body: {"expression": "(A | B | C) - D & E", "target": "<playlist_id>"}
+    with playlist IDs as operands. Without a target the result is only returned.
+    """
+    try:
+        playlist_commands = current_app.config["playlist_commands"]
+        data = request.get_json(silent=True) or {}
+        expression = data.get("expression")
+        target = data.get("target")
+        if not expression or not isinstance(expression, str):
+            return jsonify({"error": "expression is required"}), 400
+        if target:
+            check_logged_in(PlaylistOperationError)
+
+        result = playlist_commands.combine_playlists(expression, target)
+        return jsonify({
+            "expression": expression,
+            "playlist_id": target,
+            "sources": result["sources"],
+            "track_count": len(result["tracks"]),
+            "tracks": result["tracks"],
+            "written_count": result.get("written", 0),
+            "snapshot_id": result.get("snapshot_id")
+        }), 200
+
+    except SpotifyException as e:
+        raise map_spotify_error(e, "playlist")
+    except APIError:
+        raise
+    except Exception as e:
+        raise PlaylistOperationError(
+            f"Unexpected error combining playlists: {str(e)}"
+        )
+
+
 @playlist_bp.route("/move_tracks/<playlist_id>", methods=["PUT"])
 def move_tracks(playlist_id):
     check_logged_in(PlaylistOperationError)
@@ -238,13 +340,21 @@ def move_tracks(playlist_id):
             len(clean_positions)-1 if to_position + \
             len(clean_positions) < pl else pl
 
-        playlist.move_tracks(clean_positions, placement)
+        result = playlist_commands.move_tracks(
+            playlist_id, clean_positions, placement)
+        if result["executed"] < result["planned"]:
+            raise PlaylistOperationError(
+                f"Moved tracks only partially: {result['executed']} of {result['planned']} reorder calls succeeded",
+                payload=result)
         return jsonify({
-            "message": f"Moved {len(clean_positions)} tracks to start at position {placement} in playlist {playlist_id}"
+            "message": f"Moved {len(clean_positions)} tracks to start at position {placement} in playlist {playlist_id}",
+            **result
         }), 200
 
     except SpotifyException as e:
         raise map_spotify_error(e, "playlist", playlist_id)
+    except APIError:
+        raise
     except Exception as e:
         raise PlaylistOperationError(
             f"Unexpected error moving tracks in playlist: {str(e)}"
@@ -290,12 +400,34 @@ def get_artists_on_playlist(playlist_id):
     try:
         playlist_commands = current_app.config["playlist_commands"]
         artists = request.args.getlist("artists")
-        print(artists)
         data = playlist_commands.get_artist_tracks_on_playlists(playlist_id, artists)   
         return jsonify(data)
     except SpotifyException as e:
         raise map_spotify_error(e, "playlist", playlist_id)
+    except APIError:
+        raise
     except Exception as e:
         raise PlaylistOperationError(
             f"Unexpected error adding tracks in playlist: {str(e)}"
         )
+
+
+@playlist_bp.route("/get/artists_tracks", methods=["GET"])
+def get_artists_on_playlists():
+    """?playlists=ID1,ID2&playlists=ID3&artists=... -> {playlist_id: {artist_id: ...}}"""
+    try:
+        playlist_commands = current_app.config["playlist_commands"]
+        playlist_ids = [pid for value in request.args.getlist("playlists")
+                        for pid in value.split(",") if pid.strip()]
+        artists = request.args.getlist("artists")
+        data = playlist_commands.get_artist_tracks_on_many_playlists(
+            [pid.strip() for pid in playlist_ids], artists)
+        return jsonify(data)
+    except SpotifyException as e:
+        raise map_spotify_error(e, "playlist", ",".join(playlist_ids))
+    except APIError:
+        raise
+    except Exception as e:
+        raise PlaylistOperationError(
+            f"Unexpected error reading artists on playlists: {str(e)}"
+        )
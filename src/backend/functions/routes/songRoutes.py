@@ -1,6 +1,7 @@
 from flask import Blueprint, jsonify, current_app, request
 from .currentUserRoutes import check_logged_in
 from ...utils.errors import *
+from ...utils.batching import MAX_BATCH_IDS
 song_bp = Blueprint("song", __name__)
 
 
@@ -34,15 +35,65 @@ def check_song_on_playlist(song_id, playlist_id):
     try:
         playlist_commands = current_app.config["playlist_commands"]
 
-        playlist = playlist_commands.check_playlist(playlist_id)
-        track_ids = playlist.get_playlist_track_ids(
-            total=playlist.get_playlist_length())
+        _, found = playlist_commands.get_track_positions(
+            playlist_id, [song_id])
 
-        return jsonify({"exists": song_id in track_ids, "playlist_id": playlist_id}), 200
+        return jsonify({"exists": bool(found[song_id]), "positions": found[song_id],
+                        "playlist_id": playlist_id}), 200
 
     except SpotifyException as e:
         raise map_spotify_error(e, "song", song_id)
+    except APIError as e:
+        raise e
     except Exception as e:
         raise TrackOperationError(
             f"Unexpected error checking song on playlist: {str(e)}"
         )
+
+
+@song_bp.route("/check_playlist/<playlist_id>", methods=["POST"])
+def check_songs_on_playlist(playlist_id):
+    """Body: {"ids": [...]}. 0-based positions of every song on the playlist."""
+    try:
+        playlist_commands = current_app.config["playlist_commands"]
+        data = request.get_json(silent=True) or {}
+        song_ids = data.get("ids")
+        if not isinstance(song_ids, list) or not all(isinstance(s, str) and s for s in song_ids):
+            return jsonify({"error": "ids must be a list of song IDs"}), 400
+        if len(song_ids) > MAX_BATCH_IDS:
+            return jsonify({"error": f"At most {MAX_BATCH_IDS} IDs per request"}), 400
+
+        snapshot_id, found = playlist_commands.get_track_positions(
+            playlist_id, list(dict.fromkeys(song_ids)))
+        return jsonify({
+            "playlist_id": playlist_id,
+            "snapshot_id": snapshot_id,
+            "found": sum(1 for positions in found.values() if positions),
+            "results": {song_id: {"exists": bool(positions), "positions": positions}
+                        for song_id, positions in found.items()}
+        }), 200
+
+    except SpotifyException as e:
+        raise map_spotify_error(e, "playlist", playlist_id)
+    except APIError as e:
+        raise e
+    except Exception as e:
+        raise TrackOperationError(
+            f"Unexpected error checking songs on playlist: {str(e)}"
+        )
+
+
+@song_bp.route("/batch", methods=["POST"])
+def get_song_batch():
+    try:
+        song_commands = current_app.config["song_commands"]
+        raw_data = request.args.get("raw", "false").lower() == "true"
+        data = request.get_json(silent=True) or {}
+        return jsonify(song_commands.get_song_info_batch(data.get("ids"), raw=raw_data))
+    except APIError as e:
+        raise e
+    except SpotifyException as e:
+        raise map_spotify_error(e, "track")
+    except Exception as e:
+        raise TrackOperationError(
+            f"Unexpected error retrieving tracks: {str(e)}")
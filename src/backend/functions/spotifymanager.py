@@ -4,10 +4,19 @@ from dotenv import load_dotenv
 import spotipy
 from spotipy.oauth2 import SpotifyOAuth, SpotifyClientCredentials
 from ..utils.redis_client import redis_client
+from ..utils.cache import CommandCache
+from ..utils.catalog_cache import CatalogCache
+from ..utils.track_index import PlaylistTrackIndex
+from ..utils.scheduler import RequestScheduler
+from ..utils.http import build_session
+from ..utils.aio import AsyncSpotify
+from ..utils.metrics import UpstreamMetrics
+from ..utils.tokens import TokenStore, TokenRefresher, StoredTokenAuth
+from .usersessions import UserSessionPool, SessionClient, active_context
 
 
 class SpotifyManager:
-    def __init__(self, client_id=None, client_secret=None, redirect_uri=None, scope=None):
+    def __init__(self, client_id=None, client_secret=None, redirect_uri=None, scope=None, page_workers=None):
         BASE_DIR = Path(__file__).resolve().parent.parent.parent.parent
         load_dotenv(BASE_DIR / "config/.env")
 
@@ -16,30 +25,117 @@ class SpotifyManager:
             "SPOTIFY_CLIENT_SECRET")
         self.redirect_uri = redirect_uri or os.getenv("SPOTIFY_REDIRECT_URI")
         self.scope = scope or os.getenv("SPOTIFY_SCOPE")
+        # Alternative Web API / accounts service base URLs, e.g. the local
+        # stand-in in benchmarks/fake_api.py; unset means the real Spotify
+        self.api_url = os.getenv("SPOTIFY_API_URL")
+        self.accounts_url = os.getenv("SPOTIFY_ACCOUNTS_URL")
+        # Max concurrent page requests when crawling paged endpoints
+        self.page_workers = page_workers or int(
+            os.getenv("SPOTIFY_PAGE_WORKERS", 8))
         self.redis_client = redis_client
-        # Public client (non-user requests)
-        self.sp = spotipy.Spotify(auth_manager=SpotifyClientCredentials(
-            client_id=self.client_id,
-            client_secret=self.client_secret
-        ))
+        # Bounded LRU/TTL cache shared by every *Commands class
+        self.cache = CommandCache.from_env()
+        # Redis tier for public catalog payloads, shared across worker processes
+        self.catalog_cache = CatalogCache.from_env(self.redis_client)
+        # Redis index of track positions per playlist snapshot
+        self.track_index = PlaylistTrackIndex.from_env(self.redis_client)
+        # Every request made through self.sp is rate limited and scheduled here
+        self.scheduler = RequestScheduler.from_env(self.redis_client)
+        # One keep-alive connection pool for every client and OAuth manager,
+        # sized so each concurrent request can hold a connection
+        self.request_timeout = float(os.getenv("SPOTIFY_REQUEST_TIMEOUT", 10))
+        # Every Spotify request (endpoint, status, time, bytes), served at /metrics
+        self.metrics = UpstreamMetrics()
+        self.session = build_session(
+            pool_size=max(self.page_workers, self.scheduler.max_concurrency),
+            retries=int(os.getenv("SPOTIFY_HTTP_RETRIES", 3)),
+            metrics=self.metrics)
+        # Event-loop crawler for paged endpoints (SPOTIFY_ASYNC=1), else None
+        self.aio = AsyncSpotify.from_env(self.scheduler, self.request_timeout,
+                                         self.metrics)
+        # Public client (non-user requests), kept for the whole process so
+        # its client-credentials token survives logins and logouts
+        self.public_client = self.create_client(auth_manager=self._use_accounts_url(
+            SpotifyClientCredentials(
+                client_id=self.client_id,
+                client_secret=self.client_secret,
+                requests_session=self.session,
+                requests_timeout=self.request_timeout
+            )))
+        # Client used outside a user session
+        self.sp = self.public_client
+        self._session_client = SessionClient(self)
 
-        self.sp_oauth = SpotifyOAuth(
-            client_id=self.client_id,
-            client_secret=self.client_secret,
-            redirect_uri=self.redirect_uri,
-            scope=self.scope
-        )
-        self.current_user_id = None
+        self._create_oauth()
+        # User tokens live in Redis and are renewed before they expire
+        self.tokens = TokenStore(self.redis_client)
+        self.token_refresher = TokenRefresher.from_env(
+            self.tokens, lambda refresh_token: self.sp_oauth.refresh_access_token(refresh_token))
+        # One context (client + CurrentUser) per browser session
+        self.sessions = UserSessionPool.from_env(self)
+        self._default_user_id = None
+
+    @property
+    def sp(self):
+        """
+        The Spotify client of whichever session is making the request (see
+        SessionClient), behind the request scheduler
+        """
+        return self._session_client
+
+    @sp.setter
+    def sp(self, client):
+        """Set the client used outside a user session"""
+        self._default_client = self.scheduler.wrap(client)
+
+    def active_client(self):
+        context = active_context()
+        if context is not None and self.sessions.resolve(context):
+            return context.client
+        return self._default_client
+
+    @property
+    def current_user_id(self):
+        context = active_context()
+        if context is None:
+            return self._default_user_id
+        return self.sessions.resolve(context)
+
+    @current_user_id.setter
+    def current_user_id(self, user_id):
+        self._default_user_id = user_id
 
-    def _create_oauth(self,):
+    def create_client(self, **kwargs):
+        """spotipy.Spotify on the shared session (which leaves 429s to the scheduler)"""
+        client = spotipy.Spotify(requests_session=self.session,
+                                 requests_timeout=self.request_timeout, **kwargs)
+        if self.api_url:
+            client.prefix = self.api_url.rstrip("/") + "/"
+        return client
 
-        self.sp_oauth = SpotifyOAuth(
+    def _use_accounts_url(self, auth_manager):
+        """Send the OAuth manager's authorize/token requests to SPOTIFY_ACCOUNTS_URL if set"""
+        if self.accounts_url:
+            base = self.accounts_url.rstrip("/")
+            auth_manager.OAUTH_AUTHORIZE_URL = f"{base}/authorize"
+            auth_manager.OAUTH_TOKEN_URL = f"{base}/api/token"
+        return auth_manager
+
+    def user_client(self, user_id):
+        """Client for user_id that always sends the user's current stored token"""
+        return self.create_client(
+            auth_manager=StoredTokenAuth(self.token_refresher, user_id))
+
+    def _create_oauth(self, user_id=None):
+
+        self.sp_oauth = self._use_accounts_url(SpotifyOAuth(
             client_id=self.client_id,
             client_secret=self.client_secret,
             redirect_uri=self.redirect_uri,
             scope=self.scope,
-
-        )
+            requests_session=self.session,
+            requests_timeout=self.request_timeout,
+        ))
         return
 
     def get_auth_url(self, user_id=None):
@@ -53,40 +149,43 @@ class SpotifyManager:
             raise Exception("OAuth not initialized. Call get_auth_url first.")
         if debug:
             print("accessing Token")
-        token_info = self.sp_oauth.get_access_token(code)
+        # Never answer from the token cache: it may hold another user's token
+        token_info = self.sp_oauth.get_access_token(code, check_cache=False)
         if debug:
             print("Completed ACcess Token")
         access_token = token_info["access_token"]
-        refresh_token = token_info["refresh_token"]
-        if self.sp:
-            self.sp.__del__()
-        # Use user-specific client
+        # Only this request uses the client; other sessions keep theirs
         if debug:
             print("Creating SP")
-        self.sp = spotipy.Spotify(auth=access_token)
+        client = self.scheduler.wrap(self.create_client(auth=access_token))
         if debug:
             print("Getting UID")
-        self.current_user_id = self.get_current_user_id()
+        user_id = client.current_user()["id"]
         if debug:
             print("Setting Redis")
-        self.redis_client.set(
-            f"spotify_user:{self.current_user_id}", refresh_token)
-        return self.current_user_id
+        self.tokens.save(user_id, token_info)
+        self.sessions.start(user_id)
+        return user_id
 
-    def logout(self):
-        """Clear Spotify session and remove cached token from Redis"""
+    def restore_user(self):
+        """
+        User of the active session, restored from Redis (two direct lookups)
+        if this process has not seen the session yet.
 
-        if self.current_user_id:
-            self.redis_client.delete(f"spotify_user:{self.current_user_id}")
-            self.current_user_id = None
+        Returns:
+            the user ID, or None if the session is not logged in
+        """
+        context = active_context()
+        if context is None:
+            return None
+        return self.sessions.resolve(context)
 
-        # Reset Spotify client to public credentials
-        if self.sp:
-            self.sp.__del__()
-        self.sp = spotipy.Spotify(auth_manager=SpotifyClientCredentials(
-            client_id=self.client_id,
-            client_secret=self.client_secret
-        ))
+    def logout(self):
+        """End the active session; other sessions of the same user stay logged in"""
+        context = active_context()
+        if context is not None and self.sessions.resolve(context):
+            self.sessions.end(context)
+        self._default_user_id = None
 
     def get_spotify_client(self):
         return self.sp
@@ -0,0 +1,156 @@
+import contextvars
+import os
+import secrets
+import threading
+from collections import OrderedDict
+
+import redis
+
+# Cookie carrying the session ID
+SESSION_COOKIE = "spotifyhub_session"
+# Idle sessions kept in memory before the least recently used is dropped
+DEFAULT_POOL_SIZE = 1000
+# Seconds a login stays valid without logging in again
+DEFAULT_SESSION_TTL = 30 * 24 * 60 * 60
+
+_active = contextvars.ContextVar("user_context", default=None)
+
+
+def active_context():
+    """UserContext of the request being served, or None outside a session"""
+    return _active.get()
+
+
+class UserContext:
+    """One browser session: its user, that user's Spotify client and CurrentUser"""
+
+    def __init__(self, session_id, user_id=None, client=None):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.client = client
+        self.current_user = None
+        self.resolved = user_id is not None
+        self.issued = False  # cookie still has to be sent
+        self.ended = False  # logged out; cookie has to be cleared
+
+
+class SessionClient:
+    """
+    Stands in for the Spotify client everywhere (models keep a reference to
+    it). Each call goes to the client of the session making the request, or
+    to the app's default client outside a session.
+    """
+
+    def __init__(self, spotify_manager):
+        self._spotify_manager = spotify_manager
+
+    def __getattr__(self, name):
+        return getattr(self._spotify_manager.active_client(), name)
+
+
+class UserSessionPool:
+    """
+    In-memory LRU of UserContexts keyed by session ID. A context unknown to
+    this process is restored lazily from Redis (session -> user, then the
+    user's stored token) the first time it needs a client; evicted contexts
+    are simply restored again on their next request. Only contexts that
+    resolve to a stored user are pooled, so unknown cookies cannot evict
+    real sessions.
+    """
+
+    def __init__(self, spotify_manager, max_size=DEFAULT_POOL_SIZE, ttl=DEFAULT_SESSION_TTL):
+        self.spotify_manager = spotify_manager
+        self.max_size = max_size
+        self.ttl = ttl
+        self._contexts = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, spotify_manager):
+        return cls(spotify_manager,
+                   max_size=int(os.getenv("USER_SESSION_POOL_SIZE", DEFAULT_POOL_SIZE)),
+                   ttl=int(os.getenv("USER_SESSION_TTL", DEFAULT_SESSION_TTL)))
+
+    def __len__(self):
+        return len(self._contexts)
+
+    def activate(self, session_id):
+        """Make session_id's context active for this request; returns a token for deactivate()"""
+        if not session_id:
+            return _active.set(None)
+        with self._lock:
+            context = self._contexts.get(session_id)
+            if context is not None:
+                self._contexts.move_to_end(session_id)
+        if context is None:
+            # Pooled by resolve() once it is known to belong to a user
+            context = UserContext(session_id)
+        return _active.set(context)
+
+    def deactivate(self, token):
+        _active.reset(token)
+
+    def resolve(self, context):
+        """
+        User ID of the context, restoring its client from Redis on first use.
+        With Redis unreachable the request is served as anonymous; the
+        context is not pooled, so its next request tries again.
+        """
+        if not context.resolved:
+            manager = self.spotify_manager
+            try:
+                user_id = manager.tokens.session_user(context.session_id)
+                token = user_id and manager.tokens.get(user_id)
+            except redis.RedisError as e:
+                print(f"WARNING. Session store unavailable, serving anonymously: {e}")
+                user_id = token = None
+            if user_id and token:
+                context.client = manager.scheduler.wrap(manager.user_client(user_id))
+                context.user_id = user_id
+                manager.token_refresher.track(user_id)
+                self._insert(context)
+            context.resolved = True
+        return context.user_id
+
+    def start(self, user_id):
+        """New session for user_id (a fresh ID on every login), active for this request"""
+        manager = self.spotify_manager
+        previous = active_context()
+        if previous is not None:
+            self.end(previous)
+        context = UserContext(secrets.token_urlsafe(32), user_id,
+                              manager.scheduler.wrap(manager.user_client(user_id)))
+        context.issued = True
+        manager.tokens.bind_session(context.session_id, user_id, self.ttl)
+        manager.token_refresher.track(user_id)
+        self._insert(context)
+        _active.set(context)
+        return context
+
+    def end(self, context):
+        """Log one session out; other sessions of the same user stay logged in"""
+        context.ended = True
+        with self._lock:
+            self._contexts.pop(context.session_id, None)
+        self.spotify_manager.tokens.drop_session(context.session_id)
+        user_id, context.user_id, context.client = context.user_id, None, None
+        self._release(user_id)
+
+    def _insert(self, context):
+        evicted = []
+        with self._lock:
+            self._contexts[context.session_id] = context
+            self._contexts.move_to_end(context.session_id)
+            while len(self._contexts) > self.max_size:
+                evicted.append(self._contexts.popitem(last=False)[1])
+        for old in evicted:
+            self._release(old.user_id)
+
+    def _release(self, user_id):
+        # Stop renewing the token once no session in this process uses it
+        if user_id is None:
+            return
+        with self._lock:
+            in_use = any(c.user_id == user_id for c in self._contexts.values())
+        if not in_use:
+            self.spotify_manager.token_refresher.untrack(user_id)
@@ -0,0 +1,182 @@
+import asyncio
+import json
+import os
+import threading
+import time
+
+from spotipy import Spotify, SpotifyException
+
+from .http import SERVER_ERROR_STATUSES
+from .metrics import current_request
+from .scheduler import INTERACTIVE, MAX_RETRY_AFTER, current_lane
+
+try:
+    import httpx
+except ImportError:  # only needed with SPOTIFY_ASYNC enabled
+    httpx = None
+
+# Seconds to wait before retrying a 5xx, times the attempt number
+SERVER_ERROR_BACKOFF = 0.3
+
+
+class _RequestRecorder(Spotify):
+    """spotipy.Spotify whose methods return the request they would send instead of sending it"""
+
+    def __init__(self, prefix, language=None):
+        self.prefix = prefix
+        self.language = language
+
+    def _internal_call(self, method, url, payload, params):
+        if not url.startswith("http"):
+            url = self.prefix + url
+        return method, url, payload, params
+
+
+class AsyncSpotify:
+    """
+    Non-blocking Spotify requests for fan-outs such as page crawls. Requests
+    are coroutines on one event loop thread sharing an httpx connection pool,
+    so a crawl with hundreds of pages in flight holds no threads.
+
+    They obey the same RequestScheduler as the sync client: each request
+    takes one of its in-flight slots (so sync and async requests together
+    stay within its adaptive limit), then a token from its bucket. A 429
+    seen here pauses and shrinks the sync side too, and lanes are honoured
+    both ways. Requests are recorded in `metrics` if given.
+    """
+
+    def __init__(self, scheduler, timeout=10, metrics=None):
+        self.scheduler = scheduler
+        self.metrics = metrics
+        self.timeout = timeout
+        self._loop = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, scheduler, timeout, metrics=None):
+        """An AsyncSpotify if SPOTIFY_ASYNC is set, else None (crawls use threads)"""
+        if os.getenv("SPOTIFY_ASYNC", "").lower() not in ("1", "true", "yes"):
+            return None
+        if httpx is None:
+            print("WARNING. SPOTIFY_ASYNC needs httpx installed; crawling with threads")
+            return None
+        return cls(scheduler, timeout=timeout, metrics=metrics)
+
+    def _start(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                # The scheduler never lets more requests than this be in flight
+                size = self.scheduler.max_concurrency
+                self._http = httpx.AsyncClient(
+                    timeout=self.timeout,
+                    limits=httpx.Limits(max_connections=size,
+                                        max_keepalive_connections=size))
+                threading.Thread(target=loop.run_forever, name="spotify-aio",
+                                 daemon=True).start()
+                self._loop = loop
+        return self._loop
+
+    def run(self, coro):
+        """Run `coro` on the event loop and wait for its result (from sync code)"""
+        return asyncio.run_coroutine_threadsafe(coro, self._start()).result()
+
+    def bind(self, client):
+        """
+        Async twin of a sync client: same method names, awaited, sent with
+        the client's auth headers (resolved now, in the caller's session)
+        """
+        return BoundAsyncSpotify(self, client)
+
+    async def _off_loop(self, fn, *args):
+        """Run fn, which may block on Redis, without stalling every other coroutine"""
+        if not self.scheduler.bucket.blocking:
+            return fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    async def _acquire(self, lane):
+        """Await a scheduler slot, then a bucket token; see RequestScheduler.call"""
+        with self.scheduler.queued(lane):
+            wait = self.scheduler.try_acquire(lane)
+            while wait > 0:
+                await asyncio.sleep(wait)
+                wait = self.scheduler.try_acquire(lane)
+        try:
+            wait = await self._off_loop(self.scheduler.bucket.take)
+            while wait > 0:
+                await asyncio.sleep(wait)
+                wait = await self._off_loop(self.scheduler.bucket.take)
+        except BaseException:
+            self.scheduler.release()
+            raise
+
+    def _record(self, method, url, status, start, size, timing):
+        if self.metrics is not None:
+            self.metrics.record(method, url, status, time.perf_counter() - start,
+                                size, timing)
+
+    async def request(self, method, url, payload, params, headers, lane=INTERACTIVE,
+                      timing=None):
+        params = {k: v for k, v in (params or {}).items() if v is not None}
+        content = json.dumps(payload) if payload else None
+        retries = self.scheduler.retries
+        for attempt in range(retries + 1):
+            await self._acquire(lane)
+            start = time.perf_counter()
+            try:
+                response = await self._http.request(
+                    method, url, params=params, headers=headers, content=content)
+            except httpx.HTTPError:
+                self._record(method, url, "error", start, 0, timing)
+                raise
+            finally:
+                self.scheduler.release()
+            self._record(method, url, response.status_code, start,
+                         len(response.content), timing)
+
+            status = response.status_code
+            if status < 400:
+                self.scheduler.succeeded()
+            if status == 429 and attempt < retries:
+                retry_after = min(int(response.headers.get("Retry-After") or 1),
+                                  MAX_RETRY_AFTER)
+                print(f"WARNING. Rate limited by Spotify, pausing requests for {retry_after}s")
+                await self._off_loop(self.scheduler.throttled, retry_after)
+                continue
+            if status in SERVER_ERROR_STATUSES and attempt < retries:
+                await asyncio.sleep(SERVER_ERROR_BACKOFF * (attempt + 1))
+                continue
+            if status >= 400:
+                try:
+                    error = response.json().get("error", {})
+                    msg, reason = error.get("message"), error.get("reason")
+                except ValueError:
+                    msg, reason = response.text or None, None
+                raise SpotifyException(status, -1, f"{response.url}:\n {msg}",
+                                       reason=reason, headers=dict(response.headers))
+            try:
+                return response.json()
+            except ValueError:
+                return None
+
+
+class BoundAsyncSpotify:
+    """See AsyncSpotify.bind"""
+
+    def __init__(self, aio, client):
+        self._aio = aio
+        self._recorder = _RequestRecorder(client.prefix, getattr(client, "language", None))
+        self._headers = dict(client._auth_headers(), **{"Content-Type": "application/json"})
+        self._lane = current_lane()
+        # The loop thread does not run in the caller's context, so carry its timing over
+        self._timing = current_request()
+
+    def __getattr__(self, name):
+        method = getattr(self._recorder, name)
+
+        async def call(*args, **kwargs):
+            http_method, url, payload, params = method(*args, **kwargs)
+            return await self._aio.request(http_method, url, payload, params,
+                                           self._headers, self._lane, self._timing)
+        return call
+
@@ -0,0 +1,93 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from .context import in_caller_context
+from .utils import strip_available_markets
+
+# Largest ID list accepted by the /batch endpoints
+MAX_BATCH_IDS = 1000
+
+
+def chunked(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def fetch_chunks(fetch_chunk, ids, chunk_size, max_workers=1):
+    """
+    Call a Spotify multi-get endpoint for `ids` in chunks of `chunk_size`,
+    in parallel, and return the results in the same order as `ids`.
+
+    Args:
+        fetch_chunk: callable(list of ids) -> list of payloads (None for unknown IDs)
+    """
+    chunks = chunked(list(ids), chunk_size)
+    if not chunks:
+        return []
+
+    workers = max(1, min(max_workers or 1, len(chunks)))
+    if workers == 1:
+        results = [fetch_chunk(chunk) for chunk in chunks]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(in_caller_context(fetch_chunk), chunks))
+
+    payloads = []
+    for result in results:
+        payloads.extend(result)
+    return payloads
+
+
+def resolve_batch(ids, kind, local_cache, spotify_manager, build, fetch_chunk, chunk_size):
+    """
+    Model objects with loaded data for many IDs of one catalog type.
+
+    Order of lookup per ID: the in-process command cache, then the Redis
+    catalog cache, then one multi-get request per chunk of the remaining
+    misses. Every fetched payload is written back to both cache tiers.
+
+    Args:
+        kind: catalog type ("album", "artist", "song")
+        local_cache: the command's CacheNamespace
+        build: callable(id, data) -> model object
+        fetch_chunk: callable(list of ids) -> list of raw payloads
+
+    Returns:
+        (dict of id -> model object, list of IDs Spotify does not know)
+    """
+    found = {}
+    misses = {}  # id -> cached object without data (or None)
+    for item_id in dict.fromkeys(ids):  # de-duplicate, keep order
+        obj = local_cache.get(item_id)
+        if obj is not None and obj.data is not None:
+            found[item_id] = obj
+            continue
+        data = spotify_manager.catalog_cache.get(kind, item_id)
+        if data is not None:
+            found[item_id] = _store(local_cache, obj, item_id, data, build)
+        else:
+            misses[item_id] = obj
+
+    payloads = fetch_chunks(fetch_chunk, misses, chunk_size,
+                            max_workers=spotify_manager.page_workers)
+    not_found = []
+    for item_id, data in zip(misses, payloads):
+        if data is None:
+            not_found.append(item_id)
+            continue
+        data = strip_available_markets(data)
+        spotify_manager.catalog_cache.set(kind, item_id, data)
+        found[item_id] = _store(local_cache, misses[item_id],
+                                item_id, data, build)
+    # Keep the caller's ID order rather than cache-hits-first
+    found = {item_id: found[item_id] for item_id in dict.fromkeys(ids)
+             if item_id in found}
+    return found, not_found
+
+
+def _store(local_cache, obj, item_id, data, build):
+    if obj is None:
+        obj = build(item_id, data)
+    else:
+        # Reuse the cached (lazy, not yet loaded) object other callers already hold
+        obj.data = data
+    local_cache.set(item_id, obj)
+    return obj
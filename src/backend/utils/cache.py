@@ -0,0 +1,265 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from itertools import islice
+
+# Seconds an entry stays valid, per namespace (0 = no expiry).
+# Override with CACHE_TTL_<NAMESPACE>.
+DEFAULT_TTLS = {
+    "album": 24 * 60 * 60,
+    "artist": 6 * 60 * 60,
+    "song": 24 * 60 * 60,
+    "user": 60 * 60,
+    "playlist": 10 * 60,
+    # validated against snapshot_id on every read, so can live much longer
+    "playlist_tracks": 6 * 60 * 60,
+    "playlist_index": 6 * 60 * 60,
+    "playlist_artists": 6 * 60 * 60,
+    # per user; dropped once the user has been idle this long
+    "reverse_index": 60 * 60,
+    # per user; not validated, so only spares back-to-back track lookups a re-crawl
+    "playlist_listing": 60,
+}
+
+
+# Containers larger than this are estimated from their first SIZE_SAMPLE items
+SIZE_SAMPLE = 8
+# Nesting below this depth counts as a fixed-size leaf
+SIZE_MAX_DEPTH = 12
+
+
+def _payload(value):
+    """What an entry's size is measured on: a model object's raw Spotify `data`"""
+    return getattr(value, "data", value)
+
+
+def _estimate(value, depth=0):
+    if value is None or isinstance(value, (bool, int, float)):
+        return 8
+    if isinstance(value, (str, bytes)):
+        return len(value) + 2
+    if depth >= SIZE_MAX_DEPTH:
+        return 64
+    if isinstance(value, dict):
+        # Key, quotes, colon and comma
+        sample = [len(str(k)) + 4 + _estimate(v, depth + 1)
+                  for k, v in islice(value.items(), SIZE_SAMPLE)]
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        sample = [_estimate(v, depth + 1) + 1 for v in islice(value, SIZE_SAMPLE)]
+    else:
+        return sys.getsizeof(value)
+    if not sample:
+        return 2
+    # Lists of Spotify items are uniform enough to extrapolate from a sample
+    return sum(sample) * len(value) // len(sample)
+
+
+def approx_size(value):
+    """
+    Rough payload size in bytes, about what its JSON would take. Model
+    objects are measured by their raw Spotify `data`; unloaded objects count
+    as 0 until their data arrives. Large containers are extrapolated from a
+    sample, so the cost does not grow with the number of items.
+    """
+    payload = _payload(value)
+    if payload is None:
+        return 0
+    return _estimate(payload)
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "size", "measured")
+
+    def __init__(self, value, expires_at, size, measured):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+        self.measured = measured
+
+
+class CommandCache:
+    """
+    Thread-safe LRU cache shared by all *Commands classes.
+
+    Entries live under a namespace ("album", "playlist", ...) with its own
+    TTL. The least recently used entries (across all namespaces) are evicted
+    once either max_entries or max_bytes is exceeded. Sizes are approximate
+    and re-measured whenever an entry's payload changes (models load their
+    data lazily, after they were cached); measuring happens outside the lock.
+    """
+
+    def __init__(self, max_entries=5000, max_bytes=256 * 1024 * 1024, ttls=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self._entries = OrderedDict()  # (namespace, key) -> _Entry
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._stats = {}
+
+    @classmethod
+    def from_env(cls):
+        ttls = {}
+        for namespace in DEFAULT_TTLS:
+            ttl = os.getenv(f"CACHE_TTL_{namespace.upper()}")
+            if ttl:
+                ttls[namespace] = int(ttl)
+        return cls(
+            max_entries=int(os.getenv("CACHE_MAX_ENTRIES", 5000)),
+            max_bytes=int(os.getenv("CACHE_MAX_BYTES", 256 * 1024 * 1024)),
+            ttls=ttls,
+        )
+
+    def namespace(self, name):
+        return CacheNamespace(self, name)
+
+    # ---------- Internals ----------
+    def _stat(self, namespace):
+        if namespace not in self._stats:
+            self._stats[namespace] = {"hits": 0, "misses": 0,
+                                      "evictions": 0, "expirations": 0}
+        return self._stats[namespace]
+
+    def _remove(self, full_key):
+        entry = self._entries.pop(full_key)
+        self._bytes -= entry.size
+        return entry
+
+    def _resize(self, entry, payload, size):
+        self._bytes += size - entry.size
+        entry.size = size
+        entry.measured = payload
+
+    def _enforce_limits(self, keep=None):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            full_key = next(iter(self._entries))
+            if full_key == keep:
+                # Never evict the entry being stored/read; a single oversized
+                # entry is allowed to stay until something newer displaces it
+                if len(self._entries) == 1:
+                    break
+                self._entries.move_to_end(full_key)
+                continue
+            self._remove(full_key)
+            self._stat(full_key[0])["evictions"] += 1
+
+    # ---------- Operations ----------
+    def get(self, namespace, key, default=None):
+        full_key = (namespace, key)
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry is None:
+                self._stat(namespace)["misses"] += 1
+                return default
+            if entry.expires_at is not None and entry.expires_at <= time.monotonic():
+                self._remove(full_key)
+                stats = self._stat(namespace)
+                stats["expirations"] += 1
+                stats["misses"] += 1
+                return default
+            self._entries.move_to_end(full_key)
+            self._stat(namespace)["hits"] += 1
+            payload = _payload(entry.value)
+            if entry.measured is payload:
+                return entry.value
+
+        # The model's data arrived after it was cached
+        size = approx_size(entry.value)
+        with self._lock:
+            if self._entries.get(full_key) is entry:
+                self._resize(entry, payload, size)
+                self._enforce_limits(keep=full_key)
+        return entry.value
+
+    def set(self, namespace, key, value, ttl=None):
+        full_key = (namespace, key)
+        ttl = self.ttls.get(namespace) if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        payload = _payload(value)
+        entry = _Entry(value, expires_at, 0, None)
+        size = approx_size(value)
+        with self._lock:
+            if full_key in self._entries:
+                self._remove(full_key)
+            self._resize(entry, payload, size)
+            self._entries[full_key] = entry
+            self._enforce_limits(keep=full_key)
+        return value
+
+    def pop(self, namespace, key, default=None):
+        with self._lock:
+            full_key = (namespace, key)
+            if full_key not in self._entries:
+                return default
+            return self._remove(full_key).value
+
+    def clear(self, namespace=None):
+        with self._lock:
+            if namespace is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            for full_key in [k for k in self._entries if k[0] == namespace]:
+                self._remove(full_key)
+
+    def discard(self, namespace, match):
+        """Remove every entry of the namespace whose key satisfies match(key)"""
+        with self._lock:
+            for full_key in [k for k in self._entries
+                             if k[0] == namespace and match(k[1])]:
+                self._remove(full_key)
+
+    def count(self, namespace=None):
+        with self._lock:
+            if namespace is None:
+                return len(self._entries)
+            return sum(1 for k in self._entries if k[0] == namespace)
+
+    def stats(self, namespace=None):
+        """Hit/miss/eviction counters plus current entries and bytes"""
+        with self._lock:
+            if namespace is not None:
+                entries = [e for k, e in self._entries.items()
+                           if k[0] == namespace]
+                return dict(self._stat(namespace),
+                            entries=len(entries),
+                            bytes=sum(e.size for e in entries))
+            namespaces = set(self._stats) | {k[0] for k in self._entries}
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "namespaces": {name: self.stats(name) for name in sorted(namespaces)},
+            }
+
+
+class CacheNamespace:
+    """View of one namespace of a CommandCache (e.g. AlbumCommands.album_cache)"""
+
+    def __init__(self, cache, name):
+        self.cache = cache
+        self.name = name
+
+    def get(self, key, default=None):
+        return self.cache.get(self.name, key, default)
+
+    def set(self, key, value, ttl=None):
+        return self.cache.set(self.name, key, value, ttl)
+
+    def pop(self, key, default=None):
+        return self.cache.pop(self.name, key, default)
+
+    def clear(self):
+        self.cache.clear(self.name)
+
+    def discard(self, match):
+        self.cache.discard(self.name, match)
+
+    def stats(self):
+        return self.cache.stats(self.name)
+
+    def __len__(self):
+        return self.cache.count(self.name)
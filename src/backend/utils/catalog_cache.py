@@ -0,0 +1,124 @@
+import base64
+import json
+import os
+import threading
+import time
+import zlib
+
+import redis
+
+from .utils import strip_available_markets
+
+# Seconds a catalog payload stays in Redis, per type. Override with CATALOG_TTL_<TYPE>.
+DEFAULT_CATALOG_TTLS = {
+    "album": 7 * 24 * 60 * 60,
+    "artist": 24 * 60 * 60,  # followers / popularity drift
+    "song": 7 * 24 * 60 * 60,
+    "user": 24 * 60 * 60,
+}
+
+# Payloads above this are zlib-compressed before being stored
+COMPRESS_THRESHOLD = 1024
+# After a Redis error, skip the shared tier for this long instead of failing every lookup
+RETRY_AFTER_ERROR = 30
+
+
+def encode_payload(payload):
+    raw = json.dumps(payload, separators=(",", ":"))
+    if len(raw) < COMPRESS_THRESHOLD:
+        return "j:" + raw
+    return "z:" + base64.b64encode(zlib.compress(raw.encode("utf-8"))).decode("ascii")
+
+
+def decode_payload(value):
+    kind, body = value[:2], value[2:]
+    if kind == "z:":
+        body = zlib.decompress(base64.b64decode(body)).decode("utf-8")
+    return json.loads(body)
+
+
+class CatalogCache:
+    """
+    Redis tier shared by every worker process for public catalog data
+    (albums, artists, tracks, users). Sits behind the in-process CommandCache:
+    commands read it on a local miss, models write to it after a fetch.
+    Redis being down only disables the tier; lookups fall through to Spotify.
+    Hits and misses are counted per type (a disabled tier counts misses).
+    """
+
+    def __init__(self, redis_client, ttls=None, prefix="catalog"):
+        self.redis_client = redis_client
+        self.ttls = dict(DEFAULT_CATALOG_TTLS, **(ttls or {}))
+        self.prefix = prefix
+        self._disabled_until = 0
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, redis_client):
+        ttls = {}
+        for kind in DEFAULT_CATALOG_TTLS:
+            ttl = os.getenv(f"CATALOG_TTL_{kind.upper()}")
+            if ttl:
+                ttls[kind] = int(ttl)
+        return cls(redis_client, ttls=ttls)
+
+    def _key(self, kind, item_id):
+        return f"{self.prefix}:{kind}:{item_id}"
+
+    def _available(self):
+        return time.monotonic() >= self._disabled_until
+
+    def _failed(self, e):
+        print(f"WARNING. Catalog cache unavailable: {e}")
+        self._disabled_until = time.monotonic() + RETRY_AFTER_ERROR
+
+    def _count(self, kind, result):
+        with self._lock:
+            stats = self._stats.setdefault(kind, {"hits": 0, "misses": 0})
+            stats[result] += 1
+
+    def get(self, kind, item_id):
+        """Cached raw payload, or None on a miss"""
+        payload = self._get(kind, item_id)
+        self._count(kind, "misses" if payload is None else "hits")
+        return payload
+
+    def _get(self, kind, item_id):
+        if not item_id or not self._available():
+            return None
+        try:
+            value = self.redis_client.get(self._key(kind, item_id))
+        except redis.RedisError as e:
+            self._failed(e)
+            return None
+        if value is None:
+            return None
+        try:
+            return decode_payload(value)
+        except (ValueError, zlib.error):
+            return None
+
+    def stats(self):
+        """{type: {"hits": n, "misses": n}}"""
+        with self._lock:
+            return {kind: dict(stats) for kind, stats in self._stats.items()}
+
+    def set(self, kind, item_id, payload):
+        if not item_id or payload is None or not self._available():
+            return
+        try:
+            self.redis_client.set(self._key(kind, item_id),
+                                  encode_payload(
+                                      strip_available_markets(payload)),
+                                  ex=self.ttls.get(kind))
+        except redis.RedisError as e:
+            self._failed(e)
+
+    def delete(self, kind, item_id):
+        if not self._available():
+            return
+        try:
+            self.redis_client.delete(self._key(kind, item_id))
+        except redis.RedisError as e:
+            self._failed(e)
@@ -0,0 +1,16 @@
+import contextvars
+from functools import wraps
+
+
+def in_caller_context(fn):
+    """
+    Wrap `fn` so that, on whatever thread it runs (e.g. a pool worker), it
+    sees the caller's context variables: request lane, user session.
+    """
+    context = contextvars.copy_context()
+
+    @wraps(fn)
+    def run(*args, **kwargs):
+        # A context can only be entered by one thread at a time
+        return context.copy().run(fn, *args, **kwargs)
+    return run
@@ -0,0 +1,69 @@
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Statuses retried by the HTTP adapter; 429s are left to the RequestScheduler
+SERVER_ERROR_STATUSES = (500, 502, 503, 504)
+
+
+class SharedSession(requests.Session):
+    """
+    requests.Session handed to every spotipy client and OAuth manager.
+    spotipy closes its session when a client is dropped (__del__), which
+    would throw away the pooled keep-alive connections on every login or
+    logout, so close() is a no-op here and shutdown() really closes it.
+
+    Every request is recorded in `metrics` if set (5xx retries made by the
+    adapter are part of the request they retry).
+    """
+
+    metrics = None
+
+    def request(self, method, url, *args, **kwargs):
+        if self.metrics is None:
+            return super().request(method, url, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except requests.RequestException:
+            self.metrics.record(method, url, "error", time.perf_counter() - start, 0)
+            raise
+        self.metrics.record(method, url, response.status_code,
+                            time.perf_counter() - start, len(response.content))
+        return response
+
+    def close(self):
+        pass
+
+    def shutdown(self):
+        super().close()
+
+
+def build_session(pool_size, retries=3, backoff_factor=0.3, metrics=None):
+    """
+    SharedSession keeping up to `pool_size` connections per host alive, so
+    every worker thread can hold one without opening a new TLS connection.
+    Connection errors and 5xx responses are retried with backoff.
+    """
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=False,
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=SERVER_ERROR_STATUSES,
+        allowed_methods=frozenset(["GET", "POST", "PUT", "DELETE"]),
+        raise_on_status=False,
+        # Otherwise urllib3 retries any 429 carrying Retry-After by itself,
+        # out of sight of the scheduler
+        respect_retry_after_header=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size,
+                          max_retries=retry)
+    session = SharedSession()
+    session.metrics = metrics
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
@@ -0,0 +1,175 @@
+import contextvars
+import threading
+import time
+from urllib.parse import urlparse
+
+# Upper bounds (seconds) of the upstream latency histogram buckets
+DURATION_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Path segments followed by an ID, which is replaced by {id} in endpoint labels
+_ID_PARENTS = {"albums", "artists", "audiobooks", "chapters", "episodes",
+               "playlists", "shows", "tracks", "users"}
+
+_request = contextvars.ContextVar("request_timing", default=None)
+
+
+def endpoint_label(method, url):
+    """Low-cardinality endpoint of a request: "GET /v1/playlists/{id}/items" """
+    parts = urlparse(url).path.rstrip("/").split("/")
+    label = [parts[0]] + ["{id}" if parts[i - 1] in _ID_PARENTS else parts[i]
+                          for i in range(1, len(parts))]
+    return f"{method.upper()} {'/'.join(label) or '/'}"
+
+
+class RequestTiming:
+    """
+    Spotify calls made while serving one API request. Shared by the request's
+    worker threads (utils.context.in_caller_context), so `seconds` is the
+    summed time of every call and can exceed the response time.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.calls = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self.calls += 1
+            self.seconds += seconds
+
+    def server_timing(self):
+        """Server-Timing header value"""
+        total = (time.perf_counter() - self.started) * 1000
+        return (f'upstream;dur={self.seconds * 1000:.1f};desc="{self.calls} calls", '
+                f"total;dur={total:.1f}")
+
+
+def start_request():
+    """Start counting Spotify calls for the request being served; returns a token for finish_request()"""
+    return _request.set(RequestTiming())
+
+
+def current_request():
+    return _request.get()
+
+
+def finish_request(token):
+    _request.reset(token)
+
+
+class UpstreamMetrics:
+    """
+    Per-process counters of Spotify requests, fed by the shared HTTP session
+    and the async client: requests by endpoint and status, a latency
+    histogram and response bytes per endpoint. Each request is also added
+    to the RequestTiming of the API request it was made for.
+    """
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self._requests = {}  # (endpoint, status) -> count
+        self._bytes = {}  # endpoint -> total response bytes
+        self._durations = {}  # endpoint -> [count per bucket..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def record(self, method, url, status, seconds, size, timing=None):
+        endpoint = endpoint_label(method, url)
+        with self._lock:
+            key = (endpoint, str(status))
+            self._requests[key] = self._requests.get(key, 0) + 1
+            self._bytes[endpoint] = self._bytes.get(endpoint, 0) + size
+            histogram = self._durations.get(endpoint)
+            if histogram is None:
+                histogram = self._durations[endpoint] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[i] += 1
+                    break
+            else:
+                histogram[len(self.buckets)] += 1
+            histogram[-1] += seconds
+        timing = timing or _request.get()
+        if timing is not None:
+            timing.add(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            return (dict(self._requests), dict(self._bytes),
+                    {endpoint: list(h) for endpoint, h in self._durations.items()})
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _sample(name, labels, value):
+    if labels:
+        rendered = ",".join(f'{key}="{_escape(v)}"' for key, v in labels.items())
+        return f"{name}{{{rendered}}} {value}"
+    return f"{name} {value}"
+
+
+def _family(lines, name, kind, help_text, samples):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    lines.extend(_sample(name, labels, value) for labels, value in samples)
+
+
+def prometheus_text(spotify_manager):
+    """Prometheus text exposition of this process's Spotify, cache and scheduler metrics"""
+    metrics = spotify_manager.metrics
+    requests, sizes, durations = metrics.snapshot()
+    lines = []
+
+    _family(lines, "spotify_upstream_requests_total", "counter",
+            "Spotify API requests by endpoint and HTTP status",
+            [({"endpoint": endpoint, "status": status}, count)
+             for (endpoint, status), count in sorted(requests.items())])
+    _family(lines, "spotify_upstream_response_bytes_total", "counter",
+            "Bytes received from the Spotify API by endpoint",
+            [({"endpoint": endpoint}, size) for endpoint, size in sorted(sizes.items())])
+
+    lines.append("# HELP spotify_upstream_request_duration_seconds Spotify API request latency")
+    lines.append("# TYPE spotify_upstream_request_duration_seconds histogram")
+    name = "spotify_upstream_request_duration_seconds"
+    for endpoint, histogram in sorted(durations.items()):
+        cumulative = 0
+        for bound, count in zip(metrics.buckets + ("+Inf",), histogram):
+            cumulative += count
+            lines.append(_sample(f"{name}_bucket", {"endpoint": endpoint, "le": bound}, cumulative))
+        lines.append(_sample(f"{name}_sum", {"endpoint": endpoint}, round(histogram[-1], 6)))
+        lines.append(_sample(f"{name}_count", {"endpoint": endpoint}, cumulative))
+
+    namespaces = spotify_manager.cache.stats()["namespaces"]
+    _family(lines, "spotifyhub_cache_requests_total", "counter",
+            "Command cache lookups by namespace and result",
+            [({"cache": cache, "result": result}, stats[key])
+             for cache, stats in namespaces.items()
+             for result, key in (("hit", "hits"), ("miss", "misses"))])
+    _family(lines, "spotifyhub_cache_evictions_total", "counter",
+            "Command cache entries evicted for space",
+            [({"cache": cache}, stats["evictions"]) for cache, stats in namespaces.items()])
+    _family(lines, "spotifyhub_cache_expirations_total", "counter",
+            "Command cache entries dropped when read after their TTL",
+            [({"cache": cache}, stats["expirations"]) for cache, stats in namespaces.items()])
+    _family(lines, "spotifyhub_cache_entries", "gauge", "Command cache entries by namespace",
+            [({"cache": cache}, stats["entries"]) for cache, stats in namespaces.items()])
+    _family(lines, "spotifyhub_cache_bytes", "gauge",
+            "Approximate command cache payload bytes by namespace",
+            [({"cache": cache}, stats["bytes"]) for cache, stats in namespaces.items()])
+    _family(lines, "spotifyhub_catalog_cache_requests_total", "counter",
+            "Redis catalog cache lookups by type and result",
+            [({"kind": kind, "result": result}, stats[key])
+             for kind, stats in sorted(spotify_manager.catalog_cache.stats().items())
+             for result, key in (("hit", "hits"), ("miss", "misses"))])
+
+    scheduler = spotify_manager.scheduler.stats()
+    _family(lines, "spotify_rate_limited_total", "counter",
+            "429 responses from the Spotify API", [({}, scheduler["rate_limited"])])
+    _family(lines, "spotify_requests_in_flight", "gauge",
+            "Spotify API requests running through the scheduler", [({}, scheduler["in_flight"])])
+    _family(lines, "spotify_concurrency_limit", "gauge",
+            "Current adaptive concurrency limit of the scheduler",
+            [({}, scheduler["concurrency_limit"])])
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,166 @@
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .context import in_caller_context
+
+
+def page_offsets(total, page_size, start=0):
+    """Every offset needed to cover `total` items in pages of `page_size`"""
+    return list(range(start, total, page_size))
+
+
+def _complete_page(fetch_page, offset, limit):
+    """
+    fetch_page(offset, limit), topped up with further requests if the server
+    answered with fewer items than asked (it may cap the page size below
+    ours), so the pages after it keep their positions. Only an empty answer,
+    the end of the collection, stops it early.
+    """
+    page = list(fetch_page(offset, limit) or [])
+    while page and len(page) < limit:
+        more = fetch_page(offset + len(page), limit - len(page)) or []
+        if not more:
+            break
+        page.extend(more)
+    return page
+
+
+async def _acomplete_page(afetch_page, offset, limit):
+    """_complete_page for a coroutine afetch_page(offset, limit)"""
+    page = list((await afetch_page(offset, limit)) or [])
+    while page and len(page) < limit:
+        more = (await afetch_page(offset + len(page), limit - len(page))) or []
+        if not more:
+            break
+        page.extend(more)
+    return page
+
+
+def _page_fetcher(fetch_page, total, page_size):
+    # Pool workers make their requests in the lane and session of the caller
+    @in_caller_context
+    def fetch(offset):
+        return _complete_page(fetch_page, offset, min(page_size, total - offset))
+    return fetch
+
+
+def fetch_pages(fetch_page, total, page_size, max_workers=1, start=0):
+    """
+    Fetch all pages of a paged Spotify endpoint and return the items in order.
+
+    Args:
+        fetch_page: callable(offset, limit) -> list of items for that page
+        total: number of items to fetch (exclusive end offset)
+        page_size: items per request (API maximum for the endpoint)
+        max_workers: max concurrent requests; 1 fetches sequentially
+        start: first offset to fetch (pages before it are already known)
+    """
+    offsets = page_offsets(total, page_size, start)
+    if not offsets:
+        return []
+
+    fetch = _page_fetcher(fetch_page, total, page_size)
+    workers = max(1, min(max_workers or 1, len(offsets)))
+    if workers == 1:
+        pages = [fetch(offset) for offset in offsets]
+    else:
+        # pool.map yields results in submission order, so pages stay ordered
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pages = list(pool.map(fetch, offsets))
+
+    items = []
+    for page in pages:
+        items.extend(page)
+    return items
+
+
+def iter_pages(fetch_page, total, page_size, max_workers=1, start=0):
+    """
+    Yield pages of a paged Spotify endpoint in order, as soon as each arrives.
+
+    Same arguments as fetch_pages. At most 2 * max_workers pages are in
+    flight or buffered at once, so memory stays flat however large `total` is.
+    """
+    offsets = iter(page_offsets(total, page_size, start))
+    fetch = _page_fetcher(fetch_page, total, page_size)
+    workers = max(1, max_workers or 1)
+
+    if workers == 1:
+        for offset in offsets:
+            yield fetch(offset)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        try:
+            for _ in range(2 * workers):
+                offset = next(offsets, None)
+                if offset is None:
+                    break
+                pending.append(pool.submit(fetch, offset))
+
+            while pending:
+                page = pending.popleft().result()
+                offset = next(offsets, None)
+                if offset is not None:
+                    pending.append(pool.submit(fetch, offset))
+                yield page
+        finally:
+            # Consumer stopped early (e.g. client disconnected): drop queued pages
+            for future in pending:
+                future.cancel()
+
+
+def fetch_collection(fetch, page_size, max_workers=1, total=None):
+    """
+    Fetch every item of a paged collection whose size is only known from the
+    first response (saved tracks, saved albums, playlists...).
+
+    The first page is requested alone to learn the total; the remaining pages
+    are then fetched in parallel. If `total` is given, only that many items
+    are fetched and all pages go out at once.
+
+    Args:
+        fetch: callable(offset, limit) -> Spotify paging object ({"items", "total"})
+    """
+    def fetch_page(offset, limit):
+        return (fetch(offset, limit) or {}).get("items", [])
+
+    if total is not None:
+        return fetch_pages(fetch_page, total, page_size, max_workers)
+
+    first = fetch(0, page_size) or {}
+    items = list(first.get("items", []))
+    total = first.get("total", len(items))
+    # A short first page may only mean the server pages in smaller steps
+    if not items or len(items) >= total:
+        return items
+    items.extend(fetch_pages(fetch_page, total, page_size,
+                             max_workers, start=len(items)))
+    return items
+
+
+async def afetch_pages(afetch_page, total, page_size, start=0):
+    """fetch_pages for a coroutine afetch_page(offset, limit): every page requested at once"""
+    offsets = range(start, total, page_size)
+    pages = await asyncio.gather(*(_acomplete_page(afetch_page, offset,
+                                                  min(page_size, total - offset))
+                                   for offset in offsets))
+    return [item for page in pages for item in page]
+
+
+async def afetch_collection(afetch, page_size, total=None):
+    """fetch_collection for a coroutine afetch(offset, limit) -> Spotify paging object"""
+    async def afetch_page(offset, limit):
+        return ((await afetch(offset, limit)) or {}).get("items", [])
+
+    if total is not None:
+        return await afetch_pages(afetch_page, total, page_size)
+
+    first = (await afetch(0, page_size)) or {}
+    items = list(first.get("items", []))
+    total = first.get("total", len(items))
+    if not items or len(items) >= total:
+        return items
+    return items + await afetch_pages(afetch_page, total, page_size, start=len(items))
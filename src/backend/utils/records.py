@@ -0,0 +1,158 @@
+import threading
+import weakref
+
+from flask.json.provider import DefaultJSONProvider
+
+from .utils import missing_file_url
+
+
+def _image_urls(images, default=missing_file_url):
+    """(large, medium, small) URLs from a Spotify images list"""
+    images = images or []
+    return tuple(images[i].get("url", default) if len(images) > i else default
+                 for i in range(3))
+
+
+class _Interner:
+    """
+    ID -> record registry so every track of the same album or artist shares
+    one object. Entries are weak: a record disappears once nothing holds it.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._records = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def get(self, payload):
+        record_id = payload.get("id")
+        if record_id is None:  # local files have no ID, nothing to share
+            return self.factory(payload)
+        with self._lock:
+            record = self._records.get(record_id)
+            if record is None:
+                record = self._records[record_id] = self.factory(payload)
+            return record
+
+    def __len__(self):
+        return len(self._records)
+
+
+class ArtistRecord:
+    __slots__ = ("id", "name", "__weakref__")
+
+    def __init__(self, payload):
+        self.id = payload.get("id")
+        self.name = payload.get("name", "Unknown Artist")
+
+    def to_dict(self):
+        return {"name": self.name, "id": self.id}
+
+
+class AlbumRecord:
+    __slots__ = ("id", "name", "large", "medium", "small", "__weakref__")
+
+    def __init__(self, payload):
+        self.id = payload.get("id")
+        self.name = payload.get("name", "Unknown Album")
+        self.large, self.medium, self.small = _image_urls(
+            payload.get("images"))
+
+    def images(self):
+        return {"large": self.large, "medium": self.medium, "small": self.small}
+
+    def to_dict(self):
+        return {"name": self.name, "id": self.id, "images": self.images()}
+
+
+artist_records = _Interner(ArtistRecord)
+album_records = _Interner(AlbumRecord)
+
+
+# JSON field -> value, for every track field any endpoint returns
+_TRACK_FIELDS = {
+    "id": lambda t: t.id,
+    "name": lambda t: t.name,
+    "artist_data": lambda t: [a.to_dict() for a in t.artists],
+    "album_data": lambda t: t.album.to_dict(),
+    "duration_ms": lambda t: t.duration_ms,
+    "duration": lambda t: t.duration_ms,
+    "position": lambda t: t.position,
+    "explicit": lambda t: t.explicit,
+    "popularity": lambda t: t.popularity,
+    "added_at": lambda t: t.added_at,
+    "added_by": lambda t: t.added_by,
+    "is_local": lambda t: t.is_local,
+    "url": lambda t: t.url,
+    "isSelected": lambda t: False,
+    # search results
+    "artists": lambda t: [{a.name: a.id} for a in t.artists],
+    "album": lambda t: t.album.name,
+    "images": lambda t: t.album.images(),
+    "href": lambda t: t.url,
+}
+
+# JSON shape of a track, per endpoint
+PLAYLIST_TRACK = ("id", "name", "artist_data", "album_data", "duration_ms", "position",
+                  "explicit", "popularity", "added_at", "added_by", "is_local", "url")
+SAVED_TRACK = ("id", "name", "artist_data", "album_data", "duration_ms",
+               "explicit", "popularity", "added_at", "url")
+TOP_TRACK = ("id", "name", "artist_data", "album_data", "duration_ms",
+             "explicit", "popularity", "url")
+ALBUM_TRACK = ("id", "name", "artist_data", "album_data", "duration", "position", "explicit",
+               "popularity", "added_at", "added_by", "is_local", "url", "isSelected")
+SEARCH_TRACK = ("id", "name", "artists", "album",
+                "images", "duration_ms", "href")
+
+
+class TrackRecord:
+    """
+    One track as returned by our endpoints. Album and artists are shared
+    interned records; `shape` is the tuple of JSON fields this endpoint
+    returns. Converted to a dict only when the response is serialized.
+    """
+    __slots__ = ("id", "name", "artists", "album", "duration_ms", "explicit", "popularity",
+                 "is_local", "url", "position", "added_at", "added_by", "shape")
+
+    def __init__(self, track, shape, album=None, position=None, added_at=None,
+                 added_by=None, is_local=None):
+        self.id = track.get("id")
+        self.name = track.get("name", "Unknown Track")
+        self.artists = tuple(artist_records.get(a)
+                             for a in track.get("artists") or [] if a)
+        self.album = album or album_records.get(track.get("album") or {})
+        self.duration_ms = track.get("duration_ms")
+        self.explicit = track.get("explicit", False)
+        self.popularity = track.get("popularity")
+        self.is_local = track.get(
+            "is_local", False) if is_local is None else is_local
+        self.url = (track.get("external_urls") or {}).get("spotify", "")
+        self.position = position
+        self.added_at = added_at
+        self.added_by = added_by
+        self.shape = shape
+
+    def __getitem__(self, field):
+        # Lets code written against the old dicts keep reading track["id"]
+        if field not in self.shape:
+            raise KeyError(field)
+        return _TRACK_FIELDS[field](self)
+
+    def get(self, field, default=None):
+        try:
+            return self[field]
+        except KeyError:
+            return default
+
+    def to_dict(self):
+        return {field: _TRACK_FIELDS[field](self) for field in self.shape}
+
+
+class RecordJSONProvider(DefaultJSONProvider):
+    """Serializes TrackRecords at the response boundary (jsonify / returned lists)"""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, (TrackRecord, AlbumRecord, ArtistRecord)):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
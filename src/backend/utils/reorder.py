@@ -0,0 +1,88 @@
+from bisect import bisect_left
+
+
+def apply_move(order, range_start, range_length, insert_before):
+    """
+    Apply one Spotify reorder call to a local list, with the API's semantics:
+    `insert_before` is an index into the list as it was before the move.
+    """
+    block = order[range_start:range_start + range_length]
+    rest = order[:range_start] + order[range_start + range_length:]
+    if insert_before > range_start:
+        insert_before -= range_length
+    return rest[:insert_before] + block + rest[insert_before:]
+
+
+def block_move_target(length, from_positions, to_position):
+    """
+    Target order (as current indices) for gathering `from_positions` into one
+    block, in playlist order, that is inserted before index `to_position` of
+    the playlist as it looks once the block has been gathered at the front.
+    """
+    selected = sorted({p for p in from_positions if 0 <= p < length})
+    chosen = set(selected)
+    rest = [i for i in range(length) if i not in chosen]
+    at = min(max(0, to_position - len(selected)), len(rest))
+    return rest[:at] + selected + rest[at:]
+
+
+def _longest_increasing(seq):
+    """Indices into `seq` of one longest strictly increasing subsequence"""
+    tails, tail_idx, prev = [], [], [None] * len(seq)
+    for i, value in enumerate(seq):
+        j = bisect_left(tails, value)
+        if j == len(tails):
+            tails.append(value)
+            tail_idx.append(i)
+        else:
+            tails[j] = value
+            tail_idx[j] = i
+        prev[i] = tail_idx[j - 1] if j else None
+    keep = []
+    i = tail_idx[-1] if tail_idx else None
+    while i is not None:
+        keep.append(i)
+        i = prev[i]
+    return keep[::-1]
+
+
+def plan_moves(target):
+    """
+    Reorder calls that turn range(len(target)) into `target`.
+
+    The longest run of tracks already in target relative order stays put.
+    Every other track is moved, and tracks that are next to each other in
+    both the current and the target order move together in a single call,
+    so gathering k scattered ranges costs about k calls, not one per track.
+
+    Returns:
+        list of (range_start, range_length, insert_before) tuples, to be
+        sent in order
+    """
+    length = len(target)
+    if sorted(target) != list(range(length)):
+        raise ValueError("target must be a permutation of the playlist indices")
+
+    stay = {target[i] for i in _longest_increasing(target)}
+    order = list(range(length))
+    moves = []
+    t = 0
+    while t < length:
+        if target[t] in stay:
+            t += 1
+            continue
+        start = order.index(target[t])
+        run = 1
+        while (t + run < length and target[t + run] not in stay
+               and start + run < length and order[start + run] == target[t + run]):
+            run += 1
+
+        # Everything before target[t] in target order is already placed
+        insert_before = order.index(target[t - 1]) + 1 if t else 0
+        if insert_before != start:
+            moves.append((start, run, insert_before))
+            order = apply_move(order, start, run, insert_before)
+        stay.update(target[t:t + run])
+        t += run
+
+    return moves
@@ -0,0 +1,323 @@
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+import redis
+from spotipy import SpotifyException
+
+from .errors import _extract_retry_after
+
+# Lanes by priority: a request only starts if no higher lane is waiting
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+LANES = (INTERACTIVE, BACKGROUND)
+
+DEFAULT_RATE = 25  # requests per second
+DEFAULT_BURST = 50
+DEFAULT_MAX_CONCURRENCY = 16
+# Retries of one call after a 429 before giving up
+MAX_RATE_LIMIT_RETRIES = 5
+# Never pause longer than this on a single Retry-After
+MAX_RETRY_AFTER = 60
+# After a Redis error, use the in-process bucket for this long
+RETRY_AFTER_ERROR = 30
+# Seconds a try_acquire caller waits before asking for a slot again
+SLOT_RETRY_INTERVAL = 0.01
+
+_lane = contextvars.ContextVar("spotify_lane", default=INTERACTIVE)
+
+
+def current_lane():
+    return _lane.get()
+
+
+@contextmanager
+def lane(name):
+    """
+    Run the Spotify calls made inside the block in lane `name` (carried into
+    pool workers by utils.context.in_caller_context)
+    """
+    token = _lane.set(name)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+class TokenBucket:
+    """In-process token bucket: `rate` tokens per second, at most `burst` saved up"""
+
+    # Whether take() and pause() do I/O; async callers then run them off the event loop
+    blocking = False
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self):
+        """Take a token. Returns 0, or the seconds to wait before trying again."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    def pause(self, seconds):
+        """
+        Stop handing out tokens to other processes for `seconds` after a 429.
+        Deliberately a no-op here: this process is already paused by
+        RequestScheduler.throttled, and only RedisTokenBucket has other
+        processes to tell.
+        """
+
+
+# KEYS: bucket hash, pause key. ARGV: rate, burst.
+# Returns milliseconds to wait (0 = token taken).
+_TAKE_SCRIPT = """
+local pause = redis.call('PTTL', KEYS[2])
+if pause > 0 then return pause end
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + (now - ts) * rate / 1000)
+local wait = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  wait = math.ceil((1 - tokens) * 1000 / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst * 1000 / rate) + 1000)
+return wait
+"""
+
+
+class RedisTokenBucket(TokenBucket):
+    """
+    Token bucket kept in Redis so every worker process shares one budget.
+    A 429 seen by any process pauses all of them. Redis being down falls
+    back to the in-process bucket.
+    """
+
+    blocking = True
+
+    def __init__(self, redis_client, rate, burst, prefix="spotify_rate"):
+        super().__init__(rate, burst)
+        self.redis_client = redis_client
+        self.bucket_key = f"{prefix}:bucket"
+        self.pause_key = f"{prefix}:pause"
+        self._script = redis_client.register_script(_TAKE_SCRIPT)
+        self._disabled_until = 0
+
+    def _available(self):
+        return time.monotonic() >= self._disabled_until
+
+    def _failed(self, e):
+        print(f"WARNING. Shared rate limit unavailable: {e}")
+        self._disabled_until = time.monotonic() + RETRY_AFTER_ERROR
+
+    def take(self):
+        if self._available():
+            try:
+                wait = self._script(keys=[self.bucket_key, self.pause_key],
+                                    args=[self.rate, self.burst])
+                return int(wait) / 1000
+            except redis.RedisError as e:
+                self._failed(e)
+        return super().take()
+
+    def pause(self, seconds):
+        if self._available():
+            try:
+                self.redis_client.set(self.pause_key, 1, px=int(seconds * 1000))
+            except redis.RedisError as e:
+                self._failed(e)
+
+
+class RequestScheduler:
+    """
+    Gate in front of every Spotify request:
+      - a token bucket caps the request rate (shared through Redis if enabled)
+      - a 429 pauses all requests for its Retry-After, then the call is retried
+      - the number of requests in flight adapts: halved on every 429, grown
+        by one after `limit` successes in a row, up to max_concurrency
+      - waiting requests start in lane order, so interactive reads are not
+        stuck behind a background crawl
+    """
+
+    def __init__(self, bucket, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 retries=MAX_RATE_LIMIT_RETRIES):
+        self.bucket = bucket
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.limit = max_concurrency
+        self.in_flight = 0
+        self.rate_limited = 0
+        self._successes = 0
+        self._paused_until = 0
+        self._waiting = {name: 0 for name in LANES}
+        self._cond = threading.Condition()
+
+    @classmethod
+    def from_env(cls, redis_client):
+        rate = float(os.getenv("SPOTIFY_RATE_LIMIT", DEFAULT_RATE))
+        burst = float(os.getenv("SPOTIFY_RATE_BURST", DEFAULT_BURST))
+        if os.getenv("SPOTIFY_RATE_LIMIT_SHARED", "").lower() in ("1", "true", "yes"):
+            bucket = RedisTokenBucket(redis_client, rate, burst)
+        else:
+            bucket = TokenBucket(rate, burst)
+        return cls(bucket,
+                   max_concurrency=int(os.getenv("SPOTIFY_MAX_CONCURRENCY",
+                                                 DEFAULT_MAX_CONCURRENCY)))
+
+    def wrap(self, client):
+        return ScheduledClient(client, self)
+
+    def _blocked(self, name):
+        if self.in_flight >= self.limit:
+            return True
+        return any(self._waiting[higher] for higher in LANES[:LANES.index(name)])
+
+    def _acquire(self, name):
+        with self._cond:
+            self._waiting[name] += 1
+            try:
+                while True:
+                    paused = self._paused_until - time.monotonic()
+                    if paused > 0:
+                        self._cond.wait(paused)
+                    elif self._blocked(name):
+                        self._cond.wait()
+                    else:
+                        break
+                self.in_flight += 1
+            finally:
+                self._waiting[name] -= 1
+
+    def try_acquire(self, name):
+        """
+        _acquire for callers that cannot block on the condition (the event
+        loop in utils.aio): takes a slot and returns 0, or returns the seconds
+        to wait before trying again. Retry inside `queued(name)` so lower
+        lanes keep giving way meanwhile.
+        """
+        with self._cond:
+            paused = self._paused_until - time.monotonic()
+            if paused > 0:
+                return paused
+            if self._blocked(name):
+                return SLOT_RETRY_INTERVAL
+            self.in_flight += 1
+            return 0
+
+    @contextmanager
+    def queued(self, name):
+        """Count the block as a request waiting in lane `name`"""
+        with self._cond:
+            self._waiting[name] += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._waiting[name] -= 1
+                self._cond.notify_all()
+
+    def release(self):
+        """Free the slot taken by _acquire / try_acquire"""
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def succeeded(self):
+        """Record a request that was not rate limited; grows the limit back"""
+        with self._cond:
+            self._successes += 1
+            if self._successes >= self.limit and self.limit < self.max_concurrency:
+                self.limit += 1
+                self._successes = 0
+                self._cond.notify_all()
+
+    def throttled(self, retry_after):
+        """Record a 429: pause every request for retry_after seconds and shrink the limit"""
+        with self._cond:
+            self.rate_limited += 1
+            now = time.monotonic()
+            # Requests already in flight when the first 429 came back do not shrink it again
+            if now >= self._paused_until:
+                self.limit = max(1, self.limit // 2)
+            self._successes = 0
+            self._paused_until = max(self._paused_until, now + retry_after)
+        self.bucket.pause(retry_after)
+
+    def call(self, fn, *args, **kwargs):
+        """Run one Spotify request through the scheduler; see the class docstring"""
+        name = current_lane()
+        for attempt in range(self.retries + 1):
+            self._acquire(name)
+            try:
+                wait = self.bucket.take()
+                while wait > 0:
+                    time.sleep(wait)
+                    wait = self.bucket.take()
+                result = fn(*args, **kwargs)
+            except SpotifyException as e:
+                if e.http_status != 429:
+                    raise
+                retry_after = min(_extract_retry_after(e, str(e).lower()) or 1,
+                                  MAX_RETRY_AFTER)
+                print(f"WARNING. Rate limited by Spotify, pausing requests for {retry_after}s")
+                self.throttled(retry_after)
+                if attempt == self.retries:
+                    raise
+                continue
+            finally:
+                self.release()
+            self.succeeded()
+            return result
+
+    def paused_for(self):
+        return max(0, self._paused_until - time.monotonic())
+
+    def stats(self):
+        with self._cond:
+            return {
+                "concurrency_limit": self.limit,
+                "in_flight": self.in_flight,
+                "waiting": dict(self._waiting),
+                "paused_for": max(0, self._paused_until - time.monotonic()),
+                "rate_limited": self.rate_limited,
+            }
+
+
+class ScheduledClient:
+    """
+    spotipy client whose public methods run through a RequestScheduler.
+    Everything else (attributes, private helpers) is passed through untouched.
+    """
+
+    def __init__(self, client, scheduler):
+        self._client = client
+        self._scheduler = scheduler
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        @wraps(attr)
+        def scheduled(*args, **kwargs):
+            return self._scheduler.call(attr, *args, **kwargs)
+        return scheduled
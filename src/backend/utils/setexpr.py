@@ -0,0 +1,104 @@
+import re
+
+# Operators by binding strength, as in Python: "-" before "&" before "|"
+_PRECEDENCE = {"|": 1, "&": 2, "-": 3}
+_TOKEN = re.compile(r"\s*(?:([A-Za-z0-9]+)|(.))")
+
+
+def _tokenize(expression):
+    tokens = []
+    for match in _TOKEN.finditer(expression):
+        name, symbol = match.groups()
+        if name:
+            tokens.append(("id", name))
+        elif symbol and not symbol.isspace():
+            if symbol not in _PRECEDENCE and symbol not in "()":
+                raise ValueError(f"Unexpected character {symbol!r} in expression")
+            tokens.append(("op", symbol))
+    return tokens
+
+
+def parse_set_expression(expression):
+    """
+    Parse a set expression over playlist IDs, e.g. "(A | B | C) - D & E".
+
+    Operators: "|" union, "&" intersection, "-" difference, with Python's
+    precedence ("-" binds tightest, then "&", then "|"), left-associative,
+    and parentheses for grouping.
+
+    Returns:
+        nested tuples: ("playlist", id) or (operator, left, right)
+
+    Raises:
+        ValueError: if the expression is empty or malformed
+    """
+    tokens = _tokenize(expression or "")
+    if not tokens:
+        raise ValueError("Expression is empty")
+    position = 0
+
+    def peek():
+        return tokens[position] if position < len(tokens) else (None, None)
+
+    def operand():
+        nonlocal position
+        kind, value = peek()
+        position += 1
+        if kind == "id":
+            return ("playlist", value)
+        if value == "(":
+            node = binary(1)
+            if peek()[1] != ")":
+                raise ValueError("Missing closing parenthesis")
+            position += 1
+            return node
+        raise ValueError(f"Expected a playlist ID, got {value!r}" if value
+                         else "Expression ends with an operator")
+
+    def binary(min_precedence):
+        nonlocal position
+        left = operand()
+        while True:
+            kind, value = peek()
+            if kind != "op" or value not in _PRECEDENCE or _PRECEDENCE[value] < min_precedence:
+                return left
+            position += 1
+            right = binary(_PRECEDENCE[value] + 1)
+            left = (value, left, right)
+
+    tree = binary(1)
+    if position != len(tokens):
+        raise ValueError(f"Unexpected {peek()[1]!r} in expression")
+    return tree
+
+
+def referenced_playlists(tree):
+    """Playlist IDs used by a parsed expression, in order of appearance"""
+    if tree[0] == "playlist":
+        return [tree[1]]
+    return list(dict.fromkeys(referenced_playlists(tree[1]) + referenced_playlists(tree[2])))
+
+
+def _evaluate(tree, track_ids):
+    # dicts double as ordered sets
+    op = tree[0]
+    if op == "playlist":
+        return dict.fromkeys(t for t in track_ids[tree[1]] if t)
+    left = _evaluate(tree[1], track_ids)
+    right = _evaluate(tree[2], track_ids)
+    if op == "|":
+        return {**left, **right}
+    if op == "&":
+        return {t: None for t in left if t in right}
+    return {t: None for t in left if t not in right}
+
+
+def evaluate_set_expression(tree, track_ids):
+    """
+    Track IDs selected by a parsed expression, without duplicates, in the
+    order they first appear: left operand first, then new tracks from the right.
+
+    Args:
+        track_ids: dict of playlist ID -> list of its track IDs
+    """
+    return list(_evaluate(tree, track_ids))
@@ -0,0 +1,107 @@
+from collections import defaultdict, deque
+
+from .batching import chunked
+from .reorder import plan_moves
+
+# Max items per add / replace / remove request
+SYNC_CHUNK = 100
+
+
+def _match(current, target):
+    """
+    Pair the k-th occurrence of each track in `current` with its k-th
+    occurrence in `target`. Returns {current index: target index}.
+    """
+    positions = defaultdict(deque)
+    for t, track_id in enumerate(target):
+        positions[track_id].append(t)
+    matched = {}
+    for c, track_id in enumerate(current):
+        if track_id is not None and positions[track_id]:
+            matched[c] = positions[track_id].popleft()
+    return matched
+
+
+def replace_plan(target):
+    """One replace call for the first chunk, then appends for the rest"""
+    chunks = chunked(list(target), SYNC_CHUNK) or [[]]
+    steps = [{"op": "replace", "track_ids": chunks[0]}]
+    steps += [{"op": "insert", "position": None, "track_ids": chunk}
+              for chunk in chunks[1:]]
+    return steps
+
+
+def diff_plan(current, target):
+    """
+    Edit script turning `current` into `target` (both lists of track IDs,
+    None for tracks that cannot be matched, e.g. local files).
+
+    Tracks common to both lists are matched occurrence by occurrence; the
+    ones outside the longest common subsequence of those matches are moved
+    with range reorders rather than removed and re-added, so they keep
+    their added_at date. Steps are in execution order:
+      - "remove": positions of unmatched tracks, highest first, so each
+        chunk is valid against the playlist as the previous one left it
+      - "move": range reorders of the kept tracks (see plan_moves)
+      - "insert": runs of missing tracks at their target position
+    """
+    matched = _match(current, target)
+
+    removed = sorted((c for c in range(len(current)) if c not in matched),
+                     reverse=True)
+    steps = [{"op": "remove", "positions": chunk}
+             for chunk in chunked(removed, SYNC_CHUNK)]
+
+    # Kept tracks, in current order, and the order they must end up in
+    kept = sorted(matched)
+    by_target = sorted(range(len(kept)), key=lambda k: matched[kept[k]])
+    steps += [{"op": "move", "range_start": start, "range_length": length,
+               "insert_before": insert_before}
+              for start, length, insert_before in plan_moves(by_target)]
+
+    present = set(matched.values())
+    t = 0
+    while t < len(target):
+        if t in present:
+            t += 1
+            continue
+        run_end = t
+        while run_end < len(target) and run_end not in present and run_end - t < SYNC_CHUNK:
+            run_end += 1
+        steps.append({"op": "insert", "position": t,
+                      "track_ids": list(target[t:run_end])})
+        t = run_end
+
+    return steps
+
+
+def plan_sync(current, target):
+    """
+    Cheapest way (in API calls) to make a playlist contain exactly `target`.
+
+    Returns:
+        dict with the chosen "strategy" ("diff" or "replace"), its "calls",
+        the other strategy's "alternative_calls", the diff's counts of
+        "kept", "removed", "moved" and "inserted" tracks, and the "steps"
+        to run
+    """
+    diff_steps = diff_plan(current, target)
+    replace_steps = replace_plan(target)
+    # On a tie keep the diff: untouched tracks keep their added_at date
+    use_diff = len(diff_steps) <= len(replace_steps)
+    steps = diff_steps if use_diff else replace_steps
+
+    removed = sum(len(s["positions"]) for s in diff_steps if s["op"] == "remove")
+    moved = sum(s["range_length"] for s in diff_steps if s["op"] == "move")
+    inserted = sum(len(s["track_ids"])
+                   for s in diff_steps if s["op"] == "insert")
+    return {
+        "strategy": "diff" if use_diff else "replace",
+        "calls": len(steps),
+        "alternative_calls": len(replace_steps if use_diff else diff_steps),
+        "kept": len(current) - removed,
+        "removed": removed,
+        "moved": moved,
+        "inserted": inserted,
+        "steps": steps,
+    }
@@ -0,0 +1,174 @@
+import os
+import threading
+import time
+
+from .errors import UnauthorizedError
+from .singleflight import SingleFlight
+
+# Refresh an access token this many seconds before it expires
+REFRESH_MARGIN = 5 * 60
+# How often the refresher re-reads tokens (picks up refreshes by other processes)
+CHECK_INTERVAL = 60
+# A refresh lock left by a crashed process expires after this long
+REFRESH_LOCK_TTL = 30
+
+
+class TokenStore:
+    """
+    OAuth tokens per user in Redis, one hash per user ("access_token",
+    "refresh_token", "expires_at"), plus which user each browser session
+    belongs to, so restoring a session is a direct GET rather than a KEYS
+    scan. The last token seen for each user is kept in memory so requests
+    never read Redis.
+    """
+
+    def __init__(self, redis_client, prefix="spotify_token", session_prefix="spotify_session"):
+        self.redis_client = redis_client
+        self.prefix = prefix
+        self.session_prefix = session_prefix
+        self._tokens = {}
+
+    def _key(self, user_id):
+        return f"{self.prefix}:{user_id}"
+
+    def save(self, user_id, token_info, refresh_token=None):
+        """Store a token response; refresh responses may omit the refresh token"""
+        token = {
+            "access_token": token_info["access_token"],
+            "refresh_token": token_info.get("refresh_token") or refresh_token,
+            "expires_at": int(token_info.get("expires_at")
+                              or time.time() + token_info.get("expires_in", 3600)),
+        }
+        self.redis_client.hset(self._key(user_id), mapping=token)
+        self._tokens[user_id] = token
+        return token
+
+    def load(self, user_id):
+        """Latest token from Redis (None if the user has none)"""
+        token = self.redis_client.hgetall(self._key(user_id))
+        if not token or not token.get("access_token"):
+            self._tokens.pop(user_id, None)
+            return None
+        token["expires_at"] = int(token.get("expires_at") or 0)
+        self._tokens[user_id] = token
+        return token
+
+    def get(self, user_id):
+        """Token from memory, falling back to Redis"""
+        return self._tokens.get(user_id) or self.load(user_id)
+
+    def delete(self, user_id):
+        self._tokens.pop(user_id, None)
+        self.redis_client.delete(self._key(user_id))
+
+    def lock(self, user_id):
+        """Claim the right to refresh user_id's token (one process at a time)"""
+        return bool(self.redis_client.set(f"{self._key(user_id)}:lock", 1,
+                                          nx=True, ex=REFRESH_LOCK_TTL))
+
+    def unlock(self, user_id):
+        self.redis_client.delete(f"{self._key(user_id)}:lock")
+
+    def bind_session(self, session_id, user_id, ttl):
+        self.redis_client.set(f"{self.session_prefix}:{session_id}", user_id, ex=ttl)
+
+    def session_user(self, session_id):
+        return self.redis_client.get(f"{self.session_prefix}:{session_id}")
+
+    def drop_session(self, session_id):
+        self.redis_client.delete(f"{self.session_prefix}:{session_id}")
+
+
+class TokenRefresher:
+    """
+    Background thread renewing tracked users' access tokens REFRESH_MARGIN
+    seconds before they expire, so requests always find a valid token in
+    memory. A request only refreshes by itself if the token already expired
+    (e.g. the process was asleep); concurrent callers share that refresh.
+    """
+
+    def __init__(self, store, refresh, margin=REFRESH_MARGIN, interval=CHECK_INTERVAL):
+        self.store = store
+        self.refresh = refresh  # callable(refresh_token) -> token_info
+        self.margin = margin
+        self.interval = interval
+        self._users = set()
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._inflight = SingleFlight()
+
+    @classmethod
+    def from_env(cls, store, refresh):
+        return cls(store, refresh,
+                   margin=int(os.getenv("SPOTIFY_TOKEN_REFRESH_MARGIN", REFRESH_MARGIN)))
+
+    def track(self, user_id):
+        with self._lock:
+            self._users.add(user_id)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="token-refresher", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def untrack(self, user_id):
+        with self._lock:
+            self._users.discard(user_id)
+
+    def _run(self):
+        while True:
+            self._wake.clear()
+            wait = self.interval
+            for user_id in list(self._users):
+                try:
+                    token = self._refresh_if_due(user_id)
+                except Exception as e:
+                    print(f"WARNING. Token refresh failed for {user_id}: {e}")
+                    continue
+                if token:
+                    due_in = token["expires_at"] - self.margin - time.time()
+                    wait = min(wait, max(1, due_in))
+            self._wake.wait(wait)
+
+    def _refresh_if_due(self, user_id, margin=None):
+        token = self.store.load(user_id)
+        if not token:
+            return None
+        if token["expires_at"] - time.time() > (self.margin if margin is None else margin):
+            return token
+        if not self.store.lock(user_id):
+            # Another process is refreshing; the background loop picks it up
+            # on its next load, a caller holding an expired token waits for it
+            deadline = time.time() + REFRESH_LOCK_TTL
+            while token["expires_at"] <= time.time() < deadline:
+                time.sleep(0.2)
+                token = self.store.load(user_id) or token
+            return token
+        try:
+            token_info = self.refresh(token["refresh_token"])
+            return self.store.save(user_id, token_info, token["refresh_token"])
+        finally:
+            self.store.unlock(user_id)
+
+    def token(self, user_id):
+        """A usable token for user_id, refreshing now only if it already expired"""
+        token = self.store.get(user_id)
+        if token and token["expires_at"] > time.time():
+            return token
+        return self._inflight.do(("refresh", user_id),
+                                 lambda: self._refresh_if_due(user_id, margin=0))
+
+
+class StoredTokenAuth:
+    """spotipy auth manager serving a user's token from a TokenRefresher"""
+
+    def __init__(self, refresher, user_id):
+        self.refresher = refresher
+        self.user_id = user_id
+
+    def get_access_token(self, as_dict=False):
+        token = self.refresher.token(self.user_id)
+        if token is None:
+            raise UnauthorizedError("User not logged in")
+        return token if as_dict else token["access_token"]
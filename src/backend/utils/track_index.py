@@ -0,0 +1,203 @@
+import os
+import threading
+import time
+
+import redis
+
+# Seconds an index survives without being rebuilt or read
+DEFAULT_INDEX_TTL = 30 * 24 * 60 * 60
+# After a Redis error, skip the shared tier for this long instead of failing every lookup
+RETRY_AFTER_ERROR = 30
+# Hash field holding the snapshot_id the index was built from (never a track ID)
+SNAPSHOT_FIELD = "__snapshot__"
+
+
+def build_positions(track_ids):
+    """track ID -> sorted list of its 0-based positions (local files skipped)"""
+    positions = {}
+    for position, track_id in enumerate(track_ids):
+        if track_id:
+            positions.setdefault(track_id, []).append(position)
+    return positions
+
+
+def build_artist_index(items):
+    """
+    artist ID -> {artist name: [(track name, track ID), ...]} over raw
+    playlist track items, in playlist order
+    """
+    index = {}
+    for item in items:
+        track = item.get("track") or {}
+        for artist in track.get("artists") or []:
+            index.setdefault(artist.get("id"), {}).setdefault(
+                artist.get("name"), []).append((track.get("name"), track.get("id")))
+    return index
+
+
+def _encode(positions):
+    return ",".join(map(str, positions))
+
+
+def _decode(value):
+    return [int(p) for p in value.split(",")] if value else []
+
+
+class PlaylistTrackIndex:
+    """
+    Redis index of which tracks sit where in each playlist, keyed by the
+    snapshot_id it was built from. One hash per playlist maps track ID to
+    its positions, plus the snapshot it reflects, so a single HMGET both
+    validates the snapshot and answers any number of membership checks.
+    Redis being down only disables the tier; callers rebuild from Spotify.
+    """
+
+    def __init__(self, redis_client, ttl=DEFAULT_INDEX_TTL, prefix="playlist_index"):
+        self.redis_client = redis_client
+        self.ttl = ttl
+        self.prefix = prefix
+        self._disabled_until = 0
+
+    @classmethod
+    def from_env(cls, redis_client):
+        return cls(redis_client,
+                   ttl=int(os.getenv("PLAYLIST_INDEX_TTL", DEFAULT_INDEX_TTL)))
+
+    def _key(self, playlist_id):
+        return f"{self.prefix}:{playlist_id}"
+
+    def _available(self):
+        return time.monotonic() >= self._disabled_until
+
+    def _failed(self, e):
+        print(f"WARNING. Playlist index unavailable: {e}")
+        self._disabled_until = time.monotonic() + RETRY_AFTER_ERROR
+
+    def lookup(self, playlist_id, snapshot_id, track_ids):
+        """
+        Positions of each of track_ids in the playlist (empty list if absent),
+        or None if there is no index for this snapshot.
+        """
+        if not snapshot_id or not self._available():
+            return None
+        track_ids = list(track_ids)
+        try:
+            values = self.redis_client.hmget(
+                self._key(playlist_id), [SNAPSHOT_FIELD] + track_ids)
+        except redis.RedisError as e:
+            self._failed(e)
+            return None
+        if values[0] != snapshot_id:
+            return None
+        return {track_id: _decode(value)
+                for track_id, value in zip(track_ids, values[1:])}
+
+    def load(self, playlist_id, snapshot_id):
+        """The whole index for this snapshot, or None"""
+        if not snapshot_id or not self._available():
+            return None
+        try:
+            values = self.redis_client.hgetall(self._key(playlist_id))
+        except redis.RedisError as e:
+            self._failed(e)
+            return None
+        if not values or values.pop(SNAPSHOT_FIELD, None) != snapshot_id:
+            return None
+        return {track_id: _decode(value) for track_id, value in values.items()}
+
+    def store(self, playlist_id, snapshot_id, positions):
+        """
+        Replace the playlist's index with `positions` (see build_positions).
+        Without a snapshot_id the index could never be validated, so it is
+        not stored.
+        """
+        if not snapshot_id or not self._available():
+            return
+        key = self._key(playlist_id)
+        mapping = {track_id: _encode(p) for track_id, p in positions.items()}
+        mapping[SNAPSHOT_FIELD] = snapshot_id
+        try:
+            pipe = self.redis_client.pipeline(transaction=True)
+            pipe.delete(key)
+            pipe.hset(key, mapping=mapping)
+            if self.ttl:
+                pipe.expire(key, self.ttl)
+            pipe.execute()
+        except redis.RedisError as e:
+            self._failed(e)
+
+    def delete(self, playlist_id):
+        if not self._available():
+            return
+        try:
+            self.redis_client.delete(self._key(playlist_id))
+        except redis.RedisError as e:
+            self._failed(e)
+
+
+class ReverseTrackIndex:
+    """
+    In-process track ID -> {playlist_id: positions} over a set of playlists
+    (a user's library). Each playlist is folded in with the snapshot_id it
+    was indexed at, so a refresh only has to re-read playlists whose
+    snapshot changed. Playlists that could not be read are remembered the
+    same way, with the reason, until their snapshot changes.
+    """
+
+    def __init__(self):
+        self._playlists = {}  # playlist_id -> (snapshot_id, positions)
+        self._tracks = {}  # track_id -> {playlist_id: positions}
+        self._failed = {}  # playlist_id -> (snapshot_id, reason)
+        self._lock = threading.Lock()
+
+    def snapshot(self, playlist_id):
+        entry = self._playlists.get(playlist_id) or self._failed.get(playlist_id)
+        return entry[0] if entry else None
+
+    def _drop(self, playlist_id):
+        _, positions = self._playlists.pop(playlist_id, (None, {}))
+        for track_id in positions:
+            locations = self._tracks.get(track_id)
+            if locations is not None:
+                locations.pop(playlist_id, None)
+                if not locations:
+                    del self._tracks[track_id]
+
+    def update(self, playlist_id, snapshot_id, positions):
+        with self._lock:
+            self._drop(playlist_id)
+            self._failed.pop(playlist_id, None)
+            self._playlists[playlist_id] = (snapshot_id, positions)
+            for track_id, p in positions.items():
+                self._tracks.setdefault(track_id, {})[playlist_id] = p
+
+    def fail(self, playlist_id, snapshot_id, reason):
+        """Record that the playlist could not be indexed at this snapshot"""
+        with self._lock:
+            self._drop(playlist_id)
+            self._failed[playlist_id] = (snapshot_id, reason)
+
+    def retain(self, playlist_ids):
+        """Forget every playlist not in playlist_ids (deleted or unfollowed)"""
+        with self._lock:
+            for playlist_id in set(self._playlists) - set(playlist_ids):
+                self._drop(playlist_id)
+            for playlist_id in set(self._failed) - set(playlist_ids):
+                del self._failed[playlist_id]
+
+    def failures(self):
+        """playlist_id -> reason, for every playlist left out of the index"""
+        with self._lock:
+            return {pid: reason for pid, (_, reason) in self._failed.items()}
+
+    def locations(self, track_id):
+        with self._lock:
+            return dict(self._tracks.get(track_id, {}))
+
+    @property
+    def data(self):
+        """The track map, which CommandCache measures like a model's data"""
+        return self._tracks
+
+    def __len__(self):
+        return len(self._playlists)
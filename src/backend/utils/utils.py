@@ -1 +1,18 @@
-missing_file_url = "https://static.thenounproject.com/png/3647578-200.png"
\ No newline at end of file
+missing_file_url = "https://static.thenounproject.com/png/3647578-200.png"
+
+
+def strip_available_markets(payload):
+    """
+    Remove `available_markets` arrays from a raw Spotify payload, in place.
+    Nothing reads them, and they are ~185 country codes per track and album.
+    """
+    if isinstance(payload, dict):
+        payload.pop("available_markets", None)
+        for value in payload.values():
+            if isinstance(value, (dict, list)):
+                strip_available_markets(value)
+    elif isinstance(payload, list):
+        for value in payload:
+            if isinstance(value, (dict, list)):
+                strip_available_markets(value)
+    return payload
@@ -0,0 +1,205 @@
+import random
+import threading
+
+import pytest
+
+from src.backend.utils import cache as cache_module
+from src.backend.utils.cache import CommandCache, approx_size
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class Model:
+    """Stands in for a model object whose `data` is loaded after caching"""
+
+    def __init__(self, data=None):
+        self.data = data
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(cache_module, "time", fake)
+    return fake
+
+
+def consistent(cache):
+    """Byte total matches the entries it is made of, and limits hold"""
+    with cache._lock:
+        assert cache._bytes == sum(e.size for e in cache._entries.values())
+        return len(cache._entries)
+
+
+# ---------- Size bound ----------
+def test_evicts_least_recently_used_over_max_entries():
+    cache = CommandCache(max_entries=3)
+    for key in "abc":
+        cache.set("album", key, key)
+    cache.get("album", "a")  # a is now the most recent
+    cache.set("album", "d", "d")
+    assert cache.get("album", "b") is None
+    assert [cache.get("album", k) for k in "acd"] == ["a", "c", "d"]
+    assert cache.stats("album")["evictions"] == 1
+
+
+def test_eviction_spans_namespaces():
+    cache = CommandCache(max_entries=2)
+    cache.set("album", "a", 1)
+    cache.set("artist", "b", 2)
+    cache.set("song", "c", 3)
+    assert cache.get("album", "a") is None
+    assert cache.count() == 2
+    assert cache.stats("album")["evictions"] == 1
+
+
+def test_evicts_over_max_bytes():
+    value = "x" * 98  # 100 bytes with its quotes
+    assert approx_size(value) == 100
+    cache = CommandCache(max_bytes=250)
+    for key in range(3):
+        cache.set("song", key, value)
+    assert cache.count("song") == 2
+    assert cache.stats()["bytes"] == 200
+    assert cache.get("song", 0) is None
+    consistent(cache)
+
+
+def test_oversized_entry_stays_until_displaced():
+    cache = CommandCache(max_bytes=50)
+    cache.set("song", "big", "x" * 200)
+    assert cache.get("song", "big") is not None
+    cache.set("song", "small", "y")
+    assert cache.get("song", "big") is None
+    assert cache.get("song", "small") == "y"
+
+
+def test_lazily_loaded_data_is_measured_on_read():
+    cache = CommandCache(max_bytes=300)
+    model = cache.set("album", "m", Model())
+    assert cache.stats("album")["bytes"] == 0
+    cache.set("album", "other", "x" * 98)
+    model.data = {"name": "y" * 250}
+    assert cache.get("album", "m") is model
+    # Its new size pushed the older entry out, not the one being read
+    assert cache.stats("album")["bytes"] == approx_size(model)
+    assert cache.get("album", "other") is None
+    consistent(cache)
+
+
+def test_replacing_a_key_does_not_leak_bytes():
+    cache = CommandCache()
+    cache.set("song", "k", "x" * 1000)
+    cache.set("song", "k", "y")
+    assert cache.stats()["bytes"] == approx_size("y")
+    assert cache.count() == 1
+
+
+# ---------- TTL ----------
+def test_namespace_ttl_expires_entries(clock):
+    cache = CommandCache(ttls={"album": 10, "artist": 100})
+    cache.set("album", "a", 1)
+    cache.set("artist", "b", 2)
+    clock.now += 9
+    assert cache.get("album", "a") == 1
+    clock.now += 1
+    assert cache.get("album", "a") is None
+    assert cache.get("artist", "b") == 2
+    stats = cache.stats("album")
+    assert stats["expirations"] == 1
+    assert stats["entries"] == 0
+    consistent(cache)
+
+
+def test_explicit_ttl_and_zero_ttl(clock):
+    cache = CommandCache(ttls={"album": 10, "playlist": 0})
+    cache.set("album", "short", 1, ttl=1)
+    cache.set("playlist", "forever", 2)
+    clock.now += 10 ** 6
+    assert cache.get("album", "short") is None
+    assert cache.get("playlist", "forever") == 2
+
+
+def test_ttls_from_env(monkeypatch, clock):
+    monkeypatch.setenv("CACHE_TTL_ALBUM", "5")
+    monkeypatch.setenv("CACHE_MAX_ENTRIES", "7")
+    cache = CommandCache.from_env()
+    assert cache.max_entries == 7
+    assert cache.ttls["album"] == 5
+    assert cache.ttls["artist"] == cache_module.DEFAULT_TTLS["artist"]
+    cache.set("album", "a", 1)
+    clock.now += 5
+    assert cache.get("album", "a") is None
+
+
+# ---------- Namespaces ----------
+def test_discard_count_and_clear():
+    cache = CommandCache()
+    playlists = cache.namespace("playlist")
+    tracks = cache.namespace("playlist_tracks")
+    for user in ("alice", "bob"):
+        for pid in ("p1", "p2"):
+            playlists.set((user, pid), pid)
+            tracks.set((user, pid), [pid])
+    assert len(playlists) == 4
+    assert cache.count() == 8
+
+    playlists.discard(lambda key: key[1] == "p1")
+    assert len(playlists) == 2
+    assert playlists.get(("alice", "p1")) is None
+    assert tracks.get(("alice", "p1")) == ["p1"]
+
+    assert tracks.pop(("bob", "p2")) == ["p2"]
+    assert tracks.pop(("bob", "p2"), "gone") == "gone"
+    tracks.clear()
+    assert len(tracks) == 0
+    assert len(playlists) == 2
+    consistent(cache)
+
+
+def test_stats_count_hits_and_misses():
+    cache = CommandCache()
+    songs = cache.namespace("song")
+    songs.set("a", 1)
+    songs.get("a")
+    songs.get("b")
+    stats = songs.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert cache.stats()["namespaces"]["song"]["hits"] == 1
+
+
+# ---------- Concurrency ----------
+def test_concurrent_get_and_set():
+    cache = CommandCache(max_entries=50, max_bytes=20_000)
+    errors = []
+
+    def worker(seed):
+        rng = random.Random(seed)
+        try:
+            for _ in range(2000):
+                namespace = rng.choice(("album", "song"))
+                key = rng.randrange(100)
+                if rng.random() < 0.5:
+                    cache.set(namespace, key, {"id": key, "name": "x" * rng.randrange(400)})
+                else:
+                    value = cache.get(namespace, key)
+                    assert value is None or value["id"] == key
+                if rng.random() < 0.01:
+                    cache.discard(namespace, lambda k: k % 10 == 0)
+        except Exception as e:  # surfaced below, not lost in the thread
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert consistent(cache) <= 50
+    assert cache.stats()["bytes"] <= 20_000
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from src.backend.utils.paging import (
+    afetch_collection, afetch_pages, fetch_collection, fetch_pages, iter_pages)
+
+
+class ShortPages:
+    """Paged collection whose server never returns more than `cap` items per request"""
+
+    def __init__(self, size, cap):
+        self.items = list(range(size))
+        self.cap = cap
+        self.requests = 0
+
+    def page(self, offset, limit):
+        self.requests += 1
+        return self.items[offset:offset + min(limit, self.cap)]
+
+    def paging(self, offset, limit):
+        return {"items": self.page(offset, limit), "total": len(self.items)}
+
+    async def apage(self, offset, limit):
+        return self.page(offset, limit)
+
+    async def apaging(self, offset, limit):
+        return self.paging(offset, limit)
+
+
+@pytest.mark.parametrize("size, cap", [(1000, 50), (1000, 100), (237, 30), (5, 1), (0, 50)])
+@pytest.mark.parametrize("workers", [1, 8])
+def test_fetch_pages_tops_up_short_pages(size, cap, workers):
+    api = ShortPages(size, cap)
+    assert fetch_pages(api.page, size, 100, max_workers=workers) == api.items
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_iter_pages_tops_up_short_pages(workers):
+    api = ShortPages(1000, 30)
+    pages = list(iter_pages(api.page, 1000, 100, max_workers=workers))
+    assert [len(p) for p in pages] == [100] * 10
+    assert [item for page in pages for item in page] == api.items
+
+
+def test_full_pages_cost_one_request_each():
+    api = ShortPages(1000, 100)
+    fetch_pages(api.page, 1000, 100, max_workers=4)
+    assert api.requests == 10
+
+
+def test_collection_shorter_than_total_stops_at_the_end():
+    api = ShortPages(250, 100)
+    # Only 250 items exist although 400 were expected (e.g. tracks removed meanwhile)
+    assert fetch_pages(api.page, 400, 100, max_workers=4) == api.items
+
+
+@pytest.mark.parametrize("size, cap", [(1000, 20), (49, 20), (50, 50), (0, 20)])
+def test_fetch_collection_continues_after_a_short_first_page(size, cap):
+    api = ShortPages(size, cap)
+    assert fetch_collection(api.paging, page_size=50, max_workers=4) == api.items
+
+
+def test_async_pages_top_up_short_pages():
+    api = ShortPages(1000, 30)
+    assert asyncio.run(afetch_pages(api.apage, 1000, 100)) == api.items
+    api = ShortPages(1000, 20)
+    assert asyncio.run(afetch_collection(api.apaging, page_size=50)) == api.items
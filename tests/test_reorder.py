@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+from src.backend.utils.reorder import apply_move, block_move_target, plan_moves
+
+
+def run_moves(items, moves):
+    for range_start, range_length, insert_before in moves:
+        items = apply_move(items, range_start, range_length, insert_before)
+    return items
+
+
+def test_apply_move_uses_indices_from_before_the_move():
+    assert apply_move(list("abcde"), 0, 2, 4) == list("cdabe")
+    assert apply_move(list("abcde"), 3, 2, 0) == list("deabc")
+    assert apply_move(list("abcde"), 1, 1, 5) == list("acdeb")
+
+
+def test_plan_moves_leaves_sorted_order_alone():
+    assert plan_moves([]) == []
+    assert plan_moves(list(range(10))) == []
+
+
+@pytest.mark.parametrize("target", [
+    [1, 0],
+    [4, 3, 2, 1, 0],
+    [3, 4, 5, 6, 0, 1, 2],
+    [0, 5, 6, 1, 2, 7, 3, 4],
+])
+def test_plan_moves_reaches_target(target):
+    assert run_moves(list(range(len(target))), plan_moves(target)) == target
+
+
+def test_plan_moves_random_permutations():
+    rng = random.Random(7)
+    for _ in range(500):
+        target = list(range(rng.randint(0, 40)))
+        rng.shuffle(target)
+        assert run_moves(list(range(len(target))), plan_moves(target)) == target
+
+
+def test_plan_moves_moves_adjacent_tracks_together():
+    # A rotation is a single range move, not one call per track
+    assert len(plan_moves([5, 6, 7, 8, 9, 0, 1, 2, 3, 4])) == 1
+
+
+def test_plan_moves_rejects_non_permutations():
+    with pytest.raises(ValueError):
+        plan_moves([0, 0, 1])
+    with pytest.raises(ValueError):
+        plan_moves([1, 2])
+
+
+def test_block_move_target_gathers_selection_in_playlist_order():
+    # to_position counts the gathered block as sitting at the front
+    assert block_move_target(8, [5, 1, 3], 0) == [1, 3, 5, 0, 2, 4, 6, 7]
+    assert block_move_target(8, [5, 1, 3], 5) == [0, 2, 1, 3, 5, 4, 6, 7]
+
+
+def test_block_move_target_ignores_duplicates_and_out_of_range_positions():
+    assert block_move_target(5, [1, 1, 9, -1], 0) == [1, 0, 2, 3, 4]
+    assert block_move_target(5, [], 3) == [0, 1, 2, 3, 4]
+
+
+def test_block_move_target_clamps_destination():
+    assert block_move_target(4, [0], 99) == [1, 2, 3, 0]
+
+
+def test_block_move_plan_is_few_calls():
+    rng = random.Random(3)
+    for _ in range(300):
+        length = rng.randint(1, 60)
+        selected = rng.sample(range(length), rng.randint(1, length))
+        target = block_move_target(length, selected, rng.randint(0, length))
+        moves = plan_moves(target)
+        assert run_moves(list(range(length)), moves) == target
+        assert len(moves) <= len(selected)
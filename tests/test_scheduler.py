@@ -0,0 +1,317 @@
+import threading
+import time
+
+import pytest
+from spotipy import SpotifyException
+
+from src.backend.utils import scheduler as scheduler_module
+from src.backend.utils.scheduler import (BACKGROUND, INTERACTIVE, MAX_RETRY_AFTER,
+                                         RequestScheduler, TokenBucket, current_lane, lane)
+
+
+class FakeTime:
+    """Clock that only moves when something sleeps or waits"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class FakeCondition:
+    """Single-threaded stand-in for the scheduler's Condition: waiting advances the clock"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self._lock = threading.RLock()
+
+    def __enter__(self):
+        return self._lock.__enter__()
+
+    def __exit__(self, *exc):
+        return self._lock.__exit__(*exc)
+
+    def wait(self, timeout=None):
+        assert timeout is not None, "would wait forever with no other thread running"
+        self.clock.sleep(timeout)
+
+    def notify_all(self):
+        pass
+
+
+class FakeClient:
+    """Answers each call with the next outcome: a value, or an exception to raise"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def fetch(self):
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if self.outcomes else "ok"
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def rate_limited(retry_after=None):
+    headers = {"Retry-After": str(retry_after)} if retry_after is not None else {}
+    return SpotifyException(429, -1, "too many requests", headers=headers)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(scheduler_module, "time", fake)
+    return fake
+
+
+@pytest.fixture
+def make_scheduler(clock):
+    def make(max_concurrency=16, rate=1000, burst=1000, retries=5):
+        scheduler = RequestScheduler(TokenBucket(rate, burst),
+                                     max_concurrency=max_concurrency, retries=retries)
+        scheduler._cond = FakeCondition(clock)
+        return scheduler
+    return make
+
+
+# ---------- Token bucket ----------
+def test_bucket_spends_burst_then_refills(clock):
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.take() == 0
+    assert bucket.take() == 0
+    assert bucket.take() == pytest.approx(0.1)
+    clock.now += 0.1
+    assert bucket.take() == 0
+    clock.now += 60
+    # Never saves up more than the burst
+    waits = [bucket.take() for _ in range(3)]
+    assert waits[:2] == [0, 0]
+    assert waits[2] > 0
+
+
+def test_call_sleeps_until_a_token_is_free(make_scheduler, clock):
+    scheduler = make_scheduler(rate=2, burst=1)
+    client = scheduler.wrap(FakeClient())
+    assert client.fetch() == "ok"
+    assert client.fetch() == "ok"
+    assert clock.slept == [pytest.approx(0.5)]
+
+
+# ---------- 429 handling ----------
+def test_429_pauses_for_retry_after_then_retries(make_scheduler, clock):
+    scheduler = make_scheduler()
+    fake = FakeClient(rate_limited(7), "done")
+    start = clock.now
+    assert scheduler.wrap(fake).fetch() == "done"
+    assert fake.calls == 2
+    assert clock.now - start == pytest.approx(7)
+    stats = scheduler.stats()
+    assert stats["rate_limited"] == 1
+    assert stats["in_flight"] == 0
+    assert stats["paused_for"] == 0
+
+
+def test_retry_after_is_capped(make_scheduler, clock):
+    scheduler = make_scheduler()
+    start = clock.now
+    scheduler.wrap(FakeClient(rate_limited(3600))).fetch()
+    assert clock.now - start == pytest.approx(MAX_RETRY_AFTER)
+
+
+def test_missing_retry_after_pauses_one_second(make_scheduler, clock):
+    scheduler = make_scheduler()
+    start = clock.now
+    scheduler.wrap(FakeClient(rate_limited())).fetch()
+    assert clock.now - start == pytest.approx(1)
+
+
+def test_gives_up_after_retries(make_scheduler):
+    scheduler = make_scheduler(retries=2)
+    fake = FakeClient(*[rate_limited(1)] * 5)
+    with pytest.raises(SpotifyException) as raised:
+        scheduler.wrap(fake).fetch()
+    assert raised.value.http_status == 429
+    assert fake.calls == 3
+    assert scheduler.stats()["in_flight"] == 0
+
+
+def test_other_errors_are_not_retried(make_scheduler):
+    scheduler = make_scheduler()
+    fake = FakeClient(SpotifyException(404, -1, "not found"))
+    with pytest.raises(SpotifyException):
+        scheduler.wrap(fake).fetch()
+    assert fake.calls == 1
+    assert scheduler.stats()["in_flight"] == 0
+    assert scheduler.limit == 16
+
+
+def test_pause_holds_back_other_requests(make_scheduler, clock):
+    scheduler = make_scheduler()
+    scheduler.throttled(5)
+    assert scheduler.try_acquire(INTERACTIVE) == pytest.approx(5)
+    start = clock.now
+    scheduler.wrap(FakeClient()).fetch()
+    assert clock.now - start == pytest.approx(5)
+
+
+# ---------- Adaptive concurrency ----------
+def test_429_halves_the_limit_once_per_pause(make_scheduler, clock):
+    scheduler = make_scheduler(max_concurrency=16)
+    scheduler.throttled(2)
+    # Requests already in flight report the same 429
+    scheduler.throttled(2)
+    assert scheduler.limit == 8
+    clock.now += 2
+    scheduler.throttled(2)
+    assert scheduler.limit == 4
+    for _ in range(10):
+        scheduler.throttled(60)
+        clock.now += 60
+    assert scheduler.limit == 1
+
+
+def test_limit_grows_back_after_successes(make_scheduler):
+    scheduler = make_scheduler(max_concurrency=4)
+    scheduler.throttled(0)
+    assert scheduler.limit == 2
+    client = scheduler.wrap(FakeClient())
+    client.fetch()
+    assert scheduler.limit == 2
+    client.fetch()
+    assert scheduler.limit == 3
+    for _ in range(3 + 4 + 10):
+        client.fetch()
+    assert scheduler.limit == 4
+
+
+def test_try_acquire_respects_the_limit(make_scheduler):
+    scheduler = make_scheduler(max_concurrency=2)
+    assert scheduler.try_acquire(INTERACTIVE) == 0
+    assert scheduler.try_acquire(INTERACTIVE) == 0
+    assert scheduler.try_acquire(INTERACTIVE) > 0
+    scheduler.release()
+    assert scheduler.try_acquire(INTERACTIVE) == 0
+    assert scheduler.stats()["in_flight"] == 2
+
+
+# ---------- Lanes ----------
+def test_background_gives_way_to_queued_interactive(make_scheduler):
+    scheduler = make_scheduler()
+    with scheduler.queued(INTERACTIVE):
+        assert scheduler.try_acquire(BACKGROUND) > 0
+        assert scheduler.try_acquire(INTERACTIVE) == 0
+    assert scheduler.try_acquire(BACKGROUND) == 0
+
+
+def test_lane_context_sets_current_lane():
+    assert current_lane() == INTERACTIVE
+    with lane(BACKGROUND):
+        assert current_lane() == BACKGROUND
+    assert current_lane() == INTERACTIVE
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def test_waiting_interactive_request_starts_before_background():
+    # Real threads and clock: one slot, held while both lanes queue up
+    scheduler = RequestScheduler(TokenBucket(1000, 1000), max_concurrency=1)
+    started = []
+    scheduler.try_acquire(INTERACTIVE)
+
+    def run(name):
+        with lane(name):
+            scheduler.call(started.append, name)
+
+    background = threading.Thread(target=run, args=(BACKGROUND,))
+    background.start()
+    wait_for(lambda: scheduler.stats()["waiting"][BACKGROUND] == 1)
+    interactive = threading.Thread(target=run, args=(INTERACTIVE,))
+    interactive.start()
+    wait_for(lambda: scheduler.stats()["waiting"][INTERACTIVE] == 1)
+
+    scheduler.release()
+    background.join(5)
+    interactive.join(5)
+    assert started == [INTERACTIVE, BACKGROUND]
+
+
+# ---------- ScheduledClient ----------
+def test_scheduled_client_only_schedules_public_methods(make_scheduler):
+    class Client:
+        prefix = "https://api.spotify.com/v1/"
+
+        def _auth_headers(self):
+            return {"Authorization": "Bearer t"}
+
+        def track(self, track_id):
+            return {"id": track_id}
+
+    scheduler = make_scheduler()
+    client = scheduler.wrap(Client())
+    assert client.prefix == Client.prefix
+    assert client._auth_headers() == {"Authorization": "Bearer t"}
+    assert client.track("t1") == {"id": "t1"}
+    # Only track() went through the limiter
+    assert scheduler._successes == 1
+
+
+# ---------- AsyncSpotify ----------
+class FakeResponse:
+    def __init__(self, status, retry_after=None):
+        self.status_code = status
+        self.headers = {"Retry-After": str(retry_after)} if retry_after is not None else {}
+        self.content = b"{}"
+        self.text = "{}"
+        self.url = "https://api.spotify.com/v1/fake"
+
+    def json(self):
+        return {}
+
+
+def test_async_requests_share_the_scheduler_limit():
+    pytest.importorskip("httpx")
+    import asyncio
+    from src.backend.utils.aio import AsyncSpotify
+
+    scheduler = RequestScheduler(TokenBucket(1000, 1000), max_concurrency=4)
+    aio = AsyncSpotify(scheduler)
+    aio._start()
+    peak, sent = [0], []
+
+    async def request(method, url, **kwargs):
+        sent.append(url)
+        number = len(sent)
+        peak[0] = max(peak[0], scheduler.in_flight)
+        await asyncio.sleep(0.005)
+        # One 429 among the first requests
+        return FakeResponse(429, retry_after=0) if number == 3 else FakeResponse(200)
+    aio._http.request = request
+
+    async def crawl():
+        await asyncio.gather(*(aio.request("GET", "u", None, None, {})
+                               for _ in range(30)))
+    # Sync requests go through the same slots meanwhile
+    sync = threading.Thread(target=lambda: [scheduler.call(time.sleep, 0.005)
+                                            for _ in range(10)])
+    sync.start()
+    aio.run(crawl())
+    sync.join(5)
+
+    assert peak[0] <= 4
+    assert len(sent) == 31
+    stats = scheduler.stats()
+    assert stats["rate_limited"] == 1
+    assert stats["in_flight"] == 0
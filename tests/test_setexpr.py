@@ -0,0 +1,69 @@
+import re
+
+import pytest
+
+from src.backend.utils.setexpr import (
+    evaluate_set_expression, parse_set_expression, referenced_playlists)
+
+A, B, C = ("playlist", "A"), ("playlist", "B"), ("playlist", "C")
+
+
+@pytest.mark.parametrize("expression, tree", [
+    ("A", A),
+    ("A | B & C", ("|", A, ("&", B, C))),
+    ("A & B | C", ("|", ("&", A, B), C)),
+    ("A - B & C", ("&", ("-", A, B), C)),
+    ("A & B - C", ("&", A, ("-", B, C))),
+    ("A - B - C", ("-", ("-", A, B), C)),
+    ("A - (B - C)", ("-", A, ("-", B, C))),
+    ("(A | B) & C", ("&", ("|", A, B), C)),
+    ("  ((A))  ", A),
+])
+def test_precedence_and_grouping(expression, tree):
+    assert parse_set_expression(expression) == tree
+
+
+@pytest.mark.parametrize("expression, message", [
+    ("", "empty"),
+    ("   ", "empty"),
+    (None, "empty"),
+    ("A |", "ends with an operator"),
+    ("| A", "Expected a playlist ID"),
+    ("(A | B", "Missing closing parenthesis"),
+    ("A | B)", "Unexpected ')'"),
+    ("A B", "Unexpected 'B'"),
+    ("A + B", "Unexpected character '+'"),
+    ("()", "Expected a playlist ID"),
+])
+def test_malformed_expressions(expression, message):
+    with pytest.raises(ValueError, match=re.escape(message)):
+        parse_set_expression(expression)
+
+
+def test_referenced_playlists_in_order_without_repeats():
+    tree = parse_set_expression("(B | A) - B & C")
+    assert referenced_playlists(tree) == ["B", "A", "C"]
+
+
+TRACKS = {
+    "A": ["a1", "shared", "a2", "a1", None],
+    "B": ["shared", "b1", None, "b1"],
+    "C": ["a2", "b1", "c1"],
+    "E": [],
+}
+
+
+@pytest.mark.parametrize("expression, result", [
+    ("A", ["a1", "shared", "a2"]),
+    ("A | B", ["a1", "shared", "a2", "b1"]),
+    ("B | A", ["shared", "b1", "a1", "a2"]),
+    ("A & B", ["shared"]),
+    ("A - B", ["a1", "a2"]),
+    ("A | B & C", ["a1", "shared", "a2", "b1"]),
+    ("(A | B) & C", ["a2", "b1"]),
+    ("A - B & C", ["a2"]),
+    ("A & E", []),
+    ("E | E", []),
+])
+def test_evaluation_is_ordered_deduplicated_and_skips_local_files(expression, result):
+    assert evaluate_set_expression(parse_set_expression(expression), TRACKS) == result
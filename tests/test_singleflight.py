@@ -0,0 +1,150 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.backend.utils import singleflight as singleflight_module
+from src.backend.utils.singleflight import SingleFlight
+
+FOLLOWERS = 8
+TIMEOUT = 5
+
+
+class CountingEvent(threading.Event):
+    """threading.Event that knows how many threads are blocked in wait()"""
+
+    def __init__(self):
+        super().__init__()
+        self.waiters = 0
+        self._count_lock = threading.Lock()
+
+    def wait(self, timeout=None):
+        with self._count_lock:
+            self.waiters += 1
+        return super().wait(timeout)
+
+
+@pytest.fixture
+def events(monkeypatch):
+    """Every _Call's done event, in creation order"""
+    created = []
+
+    def make():
+        event = CountingEvent()
+        created.append(event)
+        return event
+    monkeypatch.setattr(singleflight_module, "threading",
+                        SimpleNamespace(Lock=threading.Lock, Event=make))
+    return created
+
+
+def run_concurrently(flight, key, fn, events):
+    """
+    One leader runs fn; FOLLOWERS more callers join while it is blocked.
+    fn is released only once every follower waits on the leader's call.
+    Returns each caller's outcome: ("ok", result) or ("error", exception).
+    """
+    started, release = threading.Event(), threading.Event()
+    outcomes = []
+    lock = threading.Lock()
+
+    def leader_fn():
+        started.set()
+        assert release.wait(TIMEOUT)
+        return fn()
+
+    def caller(fn):
+        try:
+            outcome = ("ok", flight.do(key, fn))
+        except Exception as e:
+            outcome = ("error", e)
+        with lock:
+            outcomes.append(outcome)
+
+    leader = threading.Thread(target=caller, args=(leader_fn,))
+    leader.start()
+    assert started.wait(TIMEOUT)
+    followers = [threading.Thread(target=caller, args=(fn,)) for _ in range(FOLLOWERS)]
+    for thread in followers:
+        thread.start()
+
+    done = events[-1]
+    deadline = time.monotonic() + TIMEOUT
+    while done.waiters < FOLLOWERS:
+        assert time.monotonic() < deadline, "followers never joined the call"
+        time.sleep(0.001)
+    release.set()
+
+    for thread in [leader] + followers:
+        thread.join(TIMEOUT)
+    assert flight.in_flight() == 0
+    return outcomes
+
+
+def test_concurrent_callers_share_one_call(events):
+    flight = SingleFlight()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return {"tracks": [1, 2, 3]}
+
+    outcomes = run_concurrently(flight, ("tracks", "p1"), fetch, events)
+    assert len(calls) == 1
+    assert len(outcomes) == FOLLOWERS + 1
+    results = [result for kind, result in outcomes]
+    assert all(kind == "ok" for kind, _ in outcomes)
+    # The very same object, not equal copies
+    assert all(result is results[0] for result in results)
+
+
+def test_leader_exception_reaches_every_follower(events):
+    flight = SingleFlight()
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise RuntimeError("upstream down")
+
+    outcomes = run_concurrently(flight, "key", fail, events)
+    assert len(calls) == 1
+    assert len(outcomes) == FOLLOWERS + 1
+    errors = [error for kind, error in outcomes]
+    assert all(kind == "error" for kind, _ in outcomes)
+    assert all(error is errors[0] for error in errors)
+    assert str(errors[0]) == "upstream down"
+
+
+def test_finished_calls_are_not_remembered():
+    flight = SingleFlight()
+    calls = []
+    for _ in range(3):
+        flight.do("key", lambda: calls.append(1))
+    assert len(calls) == 3
+
+    with pytest.raises(ValueError):
+        flight.do("key", lambda: int("x"))
+    # A failure is not cached either
+    assert flight.do("key", lambda: "recovered") == "recovered"
+    assert flight.in_flight() == 0
+
+
+def test_different_keys_run_independently():
+    flight = SingleFlight()
+    both_running = threading.Barrier(2, timeout=TIMEOUT)
+    results = {}
+
+    def run(key):
+        def fn():
+            # Deadlocks (and times out) if the second key waited on the first
+            both_running.wait()
+            return key
+        results[key] = flight.do(key, fn)
+
+    threads = [threading.Thread(target=run, args=(key,)) for key in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(TIMEOUT)
+    assert results == {"a": "a", "b": "b"}
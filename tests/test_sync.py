@@ -0,0 +1,97 @@
+import random
+
+import pytest
+
+from src.backend.utils.reorder import apply_move
+from src.backend.utils.sync import SYNC_CHUNK, diff_plan, plan_sync, replace_plan
+
+
+def run_steps(tracks, steps):
+    """Apply a plan to a local list the way Playlist.sync_tracks sends it"""
+    tracks = list(tracks)
+    for step in steps:
+        if step["op"] == "replace":
+            tracks = list(step["track_ids"])
+        elif step["op"] == "remove":
+            # Highest first, so earlier chunks never shift these positions
+            assert step["positions"] == sorted(step["positions"], reverse=True)
+            assert all(p < len(tracks) for p in step["positions"])
+            removed = set(step["positions"])
+            tracks = [t for i, t in enumerate(tracks) if i not in removed]
+        elif step["op"] == "move":
+            tracks = apply_move(tracks, step["range_start"],
+                                step["range_length"], step["insert_before"])
+        else:
+            position = len(tracks) if step["position"] is None else step["position"]
+            tracks[position:position] = step["track_ids"]
+        assert len(step.get("track_ids", step.get("positions", []))) <= SYNC_CHUNK
+    return tracks
+
+
+@pytest.mark.parametrize("current, target", [
+    ([], []),
+    ([], ["a", "b"]),
+    (["a", "b", "c"], []),
+    (["a", "b", "c"], ["a", "b", "c"]),
+    (["a", "b", "c"], ["c", "a", "b"]),
+    (["a", "a", "b", "a"], ["b", "a", "a"]),
+    (["a", "b"], ["a", "a", "b", "b"]),
+    ([None, "a", None, "b"], ["b", "a"]),
+])
+def test_plans_reach_target(current, target):
+    assert run_steps(current, diff_plan(current, target)) == target
+    assert run_steps(current, plan_sync(current, target)["steps"]) == target
+
+
+def test_unchanged_playlist_needs_no_calls():
+    plan = plan_sync(["a", "b", "a"], ["a", "b", "a"])
+    assert plan["strategy"] == "diff"
+    assert plan["calls"] == 0
+    assert plan["kept"] == 3
+
+
+def test_local_tracks_are_never_matched():
+    # None stands for a local file, which cannot be re-added by ID
+    plan = plan_sync([None, "a"], ["a"])
+    assert plan["removed"] == 1
+    assert plan["kept"] == 1
+
+
+def test_reordered_tracks_are_moved_not_readded():
+    plan = plan_sync(list("abcdefgh"), list("efghabcd"))
+    assert plan["strategy"] == "diff"
+    assert plan["moved"] == 4
+    assert plan["removed"] == plan["inserted"] == 0
+    assert plan["calls"] == 1
+
+
+def test_large_changes_are_chunked():
+    current = [f"old{i}" for i in range(250)]
+    target = [f"new{i}" for i in range(250)]
+    steps = diff_plan(current, target)
+    assert [s["op"] for s in steps] == ["remove"] * 3 + ["insert"] * 3
+    assert run_steps(current, steps) == target
+
+
+def test_replace_is_chosen_when_cheaper():
+    current = [f"old{i}" for i in range(250)]
+    target = ["a", "b"]
+    plan = plan_sync(current, target)
+    assert plan["strategy"] == "replace"
+    assert plan["calls"] == 1
+    assert plan["alternative_calls"] == 4
+    assert run_steps(current, plan["steps"]) == target
+
+
+def test_replace_plan_of_empty_target_clears_the_playlist():
+    assert replace_plan([]) == [{"op": "replace", "track_ids": []}]
+
+
+def test_random_plans_reach_target():
+    rng = random.Random(11)
+    for _ in range(1000):
+        current = [rng.choice("abcdefgh" + "\0") for _ in range(rng.randint(0, 40))]
+        current = [None if t == "\0" else t for t in current]
+        target = [rng.choice("abcdefghij") for _ in range(rng.randint(0, 40))]
+        assert run_steps(current, diff_plan(current, target)) == target
+        assert run_steps(current, plan_sync(current, target)["steps"]) == target
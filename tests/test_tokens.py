@@ -0,0 +1,253 @@
+import threading
+import time
+
+import pytest
+
+from src.backend.utils import tokens as tokens_module
+from src.backend.utils.errors import UnauthorizedError
+from src.backend.utils.tokens import (REFRESH_LOCK_TTL, StoredTokenAuth, TokenRefresher,
+                                      TokenStore)
+
+NOW = 1_700_000_000
+
+
+class FakeTime:
+    """time.time/time.sleep; sleeping runs on_sleep (another process acting meanwhile)"""
+
+    def __init__(self):
+        self.now = NOW
+        self.on_sleep = None
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+        if self.on_sleep:
+            self.on_sleep()
+
+
+class FakeRedis:
+    """The commands TokenStore uses, with values stored as strings like decode_responses"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.hashes = {}
+        self.values = {}  # key -> (value, expires_at or None)
+        self.reads = 0
+
+    def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update({k: str(v) for k, v in mapping.items()})
+
+    def hgetall(self, key):
+        self.reads += 1
+        return dict(self.hashes.get(key, {}))
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and self.get(key) is not None:
+            return None
+        self.values[key] = (str(value), self.clock.now + ex if ex else None)
+        return True
+
+    def get(self, key):
+        value, expires_at = self.values.get(key, (None, None))
+        if expires_at is not None and expires_at <= self.clock.now:
+            del self.values[key]
+            return None
+        return value
+
+    def delete(self, key):
+        self.hashes.pop(key, None)
+        self.values.pop(key, None)
+
+
+class FakeOAuth:
+    """refresh_access_token stand-in: hands out numbered tokens, or raises `error`"""
+
+    def __init__(self, clock, expires_in=3600):
+        self.clock = clock
+        self.expires_in = expires_in
+        self.calls = []
+        self.error = None
+
+    def refresh(self, refresh_token):
+        self.calls.append(refresh_token)
+        if self.error is not None:
+            raise self.error
+        return {"access_token": f"access-{len(self.calls)}",
+                "expires_at": self.clock.now + self.expires_in}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(tokens_module, "time", fake)
+    return fake
+
+
+@pytest.fixture
+def store(clock):
+    return TokenStore(FakeRedis(clock))
+
+
+@pytest.fixture
+def oauth(clock):
+    return FakeOAuth(clock)
+
+
+@pytest.fixture
+def refresher(store, oauth):
+    return TokenRefresher(store, oauth.refresh, margin=300)
+
+
+def login(store, expires_in, user_id="alice"):
+    return store.save(user_id, {"access_token": "access-0", "refresh_token": "refresh-0",
+                                "expires_in": expires_in})
+
+
+def lock_key(store, user_id="alice"):
+    return f"{store._key(user_id)}:lock"
+
+
+# ---------- TokenStore ----------
+def test_save_and_load_round_trip(store):
+    saved = login(store, 3600)
+    assert saved["expires_at"] == NOW + 3600
+    assert store.load("alice") == saved
+    # Refresh responses may leave the refresh token out
+    store.save("alice", {"access_token": "new", "expires_in": 60}, "refresh-0")
+    assert store.load("alice")["refresh_token"] == "refresh-0"
+    store.delete("alice")
+    assert store.get("alice") is None
+
+
+# ---------- Refresh before expiry ----------
+def test_valid_token_is_served_from_memory(store, refresher, oauth):
+    login(store, 3600)
+    reads = store.redis_client.reads
+    assert refresher.token("alice")["access_token"] == "access-0"
+    assert store.redis_client.reads == reads
+    assert oauth.calls == []
+
+
+def test_refreshes_within_margin_of_expiry(store, refresher, oauth, clock):
+    login(store, 3600)
+    clock.now += 3600 - 301
+    assert refresher._refresh_if_due("alice")["access_token"] == "access-0"
+    clock.now += 2
+    token = refresher._refresh_if_due("alice")
+    assert oauth.calls == ["refresh-0"]
+    assert token["access_token"] == "access-1"
+    assert token["refresh_token"] == "refresh-0"
+    assert store.load("alice") == token
+    # The lock is given back for the next refresh
+    assert store.redis_client.get(lock_key(store)) is None
+
+
+def test_expired_token_is_refreshed_on_request(store, refresher, oauth, clock):
+    login(store, 3600)
+    clock.now += 3600
+    assert refresher.token("alice")["access_token"] == "access-1"
+    assert refresher.token("alice")["access_token"] == "access-1"
+    assert len(oauth.calls) == 1
+
+
+def test_background_thread_refreshes_tracked_users(store, oauth, clock):
+    refresher = TokenRefresher(store, oauth.refresh, margin=300, interval=0.01)
+    login(store, 60)  # already inside the margin
+    refresher.track("alice")
+    try:
+        deadline = time.monotonic() + 5
+        while not oauth.calls:
+            assert time.monotonic() < deadline, "token was never refreshed"
+            time.sleep(0.001)
+    finally:
+        refresher.untrack("alice")
+    assert store.get("alice")["access_token"] == "access-1"
+
+
+def test_concurrent_expired_callers_share_one_refresh(store, refresher, oauth, clock):
+    login(store, 3600)
+    clock.now += 3600
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(refresher.token("alice")))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert len(oauth.calls) == 1
+    assert {token["access_token"] for token in results} == {"access-1"}
+
+
+# ---------- Redis NX lock ----------
+def test_lock_is_exclusive_and_expires(store, clock):
+    assert store.lock("alice")
+    assert not store.lock("alice")
+    clock.now += REFRESH_LOCK_TTL
+    assert store.lock("alice")
+    store.unlock("alice")
+    assert store.lock("alice")
+
+
+def test_waits_for_another_process_holding_the_lock(store, refresher, oauth, clock):
+    login(store, 3600)
+    clock.now += 3600
+    # Another process claimed the refresh and saves its result a little later
+    assert store.lock("alice")
+    other = TokenStore(store.redis_client)
+    sleeps = []
+
+    def other_process_finishes():
+        sleeps.append(clock.now)
+        if len(sleeps) == 3:
+            other.save("alice", {"access_token": "from-other", "expires_in": 3600},
+                       "refresh-0")
+    clock.on_sleep = other_process_finishes
+
+    assert refresher.token("alice")["access_token"] == "from-other"
+    assert oauth.calls == []
+    assert len(sleeps) == 3
+
+
+# ---------- Failure path ----------
+def test_failed_refresh_raises_and_releases_the_lock(store, refresher, oauth, clock):
+    login(store, 3600)
+    clock.now += 3600
+    oauth.error = RuntimeError("invalid_grant")
+    with pytest.raises(RuntimeError, match="invalid_grant"):
+        refresher.token("alice")
+    assert store.redis_client.get(lock_key(store)) is None
+    assert store.load("alice")["access_token"] == "access-0"
+
+    # The next request tries again
+    oauth.error = None
+    assert refresher.token("alice")["access_token"] == "access-2"
+
+
+def test_background_loop_survives_a_failed_refresh(store, oauth, clock, capsys):
+    refresher = TokenRefresher(store, oauth.refresh, margin=300, interval=0.01)
+    login(store, 60, "alice")
+    login(store, 60, "bob")
+    oauth.error = RuntimeError("invalid_grant")
+    refresher.track("alice")
+    refresher.track("bob")
+    try:
+        deadline = time.monotonic() + 5
+        while len(oauth.calls) < 4:
+            assert time.monotonic() < deadline, "refresher stopped after a failure"
+            time.sleep(0.001)
+    finally:
+        refresher.untrack("alice")
+        refresher.untrack("bob")
+    assert "Token refresh failed" in capsys.readouterr().out
+
+
+# ---------- StoredTokenAuth ----------
+def test_stored_token_auth(store, refresher):
+    login(store, 3600)
+    auth = StoredTokenAuth(refresher, "alice")
+    assert auth.get_access_token() == "access-0"
+    assert auth.get_access_token(as_dict=True)["refresh_token"] == "refresh-0"
+    with pytest.raises(UnauthorizedError):
+        StoredTokenAuth(refresher, "nobody").get_access_token()
@@ -0,0 +1,88 @@
+import redis
+
+from src.backend.utils.track_index import PlaylistTrackIndex, ReverseTrackIndex
+
+
+class FakeRedis:
+    """Hashes only; like redis-py, refuses None values"""
+
+    def __init__(self):
+        self.hashes = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def hmget(self, key, fields):
+        values = self.hashes.get(key, {})
+        return [values.get(f) for f in fields]
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def delete(self, key):
+        self.hashes.pop(key, None)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.ops = []
+
+    def delete(self, key):
+        self.ops.append(lambda: self.client.delete(key))
+
+    def hset(self, key, mapping):
+        if any(v is None for v in mapping.values()):
+            raise redis.DataError("Invalid input of type: 'NoneType'")
+        self.ops.append(lambda: self.client.hashes.setdefault(key, {}).update(mapping))
+
+    def expire(self, key, ttl):
+        pass
+
+    def execute(self):
+        for op in self.ops:
+            op()
+
+
+def test_store_and_lookup_by_snapshot():
+    index = PlaylistTrackIndex(FakeRedis())
+    index.store("p", "s1", {"a": [0, 2], "b": [1]})
+    assert index.lookup("p", "s1", ["a", "c"]) == {"a": [0, 2], "c": []}
+    assert index.lookup("p", "s2", ["a"]) is None
+    assert index.load("p", "s1") == {"a": [0, 2], "b": [1]}
+
+
+def test_missing_snapshot_is_not_stored_and_keeps_tier_enabled():
+    client = FakeRedis()
+    index = PlaylistTrackIndex(client)
+    index.store("p", None, {"a": [0]})
+    assert client.hashes == {}
+    assert index.lookup("p", None, ["a"]) is None
+    assert index.load("p", None) is None
+    # A None snapshot_id must not disable the tier for other playlists
+    index.store("q", "s1", {"a": [0]})
+    assert index.lookup("q", "s1", ["a"]) == {"a": [0]}
+
+
+def test_reverse_index_failures_until_snapshot_changes():
+    index = ReverseTrackIndex()
+    index.update("p1", "s1", {"a": [0]})
+    index.update("p2", "s1", {"a": [3]})
+    index.fail("p2", "s2", "forbidden")
+    assert index.locations("a") == {"p1": [0]}
+    assert index.snapshot("p2") == "s2"
+    assert index.failures() == {"p2": "forbidden"}
+
+    index.update("p2", "s3", {"a": [1]})
+    assert index.failures() == {}
+    assert index.locations("a") == {"p1": [0], "p2": [1]}
+
+
+def test_reverse_index_retain_forgets_failures():
+    index = ReverseTrackIndex()
+    index.update("p1", "s1", {"a": [0]})
+    index.fail("p2", "s1", "not found")
+    index.retain(["p1"])
+    assert index.failures() == {}
+    assert index.snapshot("p2") is None
+    assert len(index) == 1
@@ -0,0 +1,93 @@
+import redis
+
+from src.backend.functions.usersessions import UserSessionPool, active_context
+
+
+class FakeTokens:
+    def __init__(self, sessions, tokens, down=False):
+        self.sessions = sessions
+        self.tokens = tokens
+        self.down = down
+
+    def session_user(self, session_id):
+        if self.down:
+            raise redis.ConnectionError("Connection refused")
+        return self.sessions.get(session_id)
+
+    def get(self, user_id):
+        return self.tokens.get(user_id)
+
+
+class FakeRefresher:
+    def __init__(self):
+        self.tracked = set()
+
+    def track(self, user_id):
+        self.tracked.add(user_id)
+
+    def untrack(self, user_id):
+        self.tracked.discard(user_id)
+
+
+class FakeScheduler:
+    def wrap(self, client):
+        return client
+
+
+class FakeManager:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.scheduler = FakeScheduler()
+        self.token_refresher = FakeRefresher()
+
+    def user_client(self, user_id):
+        return f"client:{user_id}"
+
+
+def request(pool, session_id):
+    """What one request does: activate its cookie, resolve, deactivate"""
+    token = pool.activate(session_id)
+    try:
+        return pool.resolve(active_context())
+    finally:
+        pool.deactivate(token)
+
+
+def test_stored_session_is_pooled_and_restored():
+    manager = FakeManager(FakeTokens({"s1": "alice"}, {"alice": {"t": 1}}))
+    pool = UserSessionPool(manager, max_size=2)
+    assert request(pool, "s1") == "alice"
+    assert len(pool) == 1
+    assert manager.token_refresher.tracked == {"alice"}
+    # Served from the pool without asking Redis again
+    manager.tokens.down = True
+    assert request(pool, "s1") == "alice"
+
+
+def test_unknown_cookies_do_not_evict_real_sessions():
+    manager = FakeManager(FakeTokens({"s1": "alice", "s2": "bob"},
+                                     {"alice": {"t": 1}, "bob": {"t": 1}}))
+    pool = UserSessionPool(manager, max_size=2)
+    request(pool, "s1")
+    request(pool, "s2")
+    for i in range(10):
+        assert request(pool, f"random-{i}") is None
+    assert len(pool) == 2
+    assert manager.token_refresher.tracked == {"alice", "bob"}
+
+
+def test_session_without_token_is_not_pooled():
+    manager = FakeManager(FakeTokens({"s1": "alice"}, {}))
+    pool = UserSessionPool(manager)
+    assert request(pool, "s1") is None
+    assert len(pool) == 0
+
+
+def test_redis_outage_serves_anonymous():
+    manager = FakeManager(FakeTokens({"s1": "alice"}, {"alice": {"t": 1}}, down=True))
+    pool = UserSessionPool(manager)
+    assert request(pool, "s1") is None
+    assert len(pool) == 0
+    # Recovers on the next request once Redis is back
+    manager.tokens.down = False
+    assert request(pool, "s1") == "alice"